@@ -0,0 +1,69 @@
+"""
+Benchmark: ColumnSetIndex lookups vs a pairwise Jaccard scan of the registry.
+
+    python benchmarks/bench_column_index.py [layouts] [queries]
+
+Registers synthetic 10-column layouts for one vendor, then looks up a layout
+with one column renamed and one added, through the index and by scoring every
+registered layout with jaccard(). Checks both find the same nearest layouts
+and prints the time per lookup.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.column_index import ColumnSetIndex, header_tokens, jaccard  # noqa: E402
+
+WORDS = ["service", "date", "language", "minutes", "charge", "total", "rate", "client", "site", "call",
+         "id", "start", "end", "interpreter", "type", "department", "cost", "center", "account", "region"]
+
+
+def build_layouts(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return {
+        f"VendorA::{i}": [f"{rng.choice(WORDS)} {rng.choice(WORDS)} f{i}x{j}" for j in range(10)]
+        for i in range(n)
+    }
+
+
+def pairwise(layouts, query, min_similarity):
+    tokens = header_tokens(query)
+    scored = [(key, jaccard(tokens, header_tokens(cols))) for key, cols in layouts.items()]
+    return sorted((item for item in scored if item[1] >= min_similarity), key=lambda item: -item[1])
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    layouts = build_layouts(n)
+    index = ColumnSetIndex()
+    for key, cols in layouts.items():
+        index.add(key, "VendorA", cols)
+
+    target = f"VendorA::{n // 2}"
+    query = layouts[target][:9] + ["Renamed Column", "Extra"]
+    found, per_index = timed(lambda: index.query("VendorA", query, min_similarity=0.6), repeats)
+    expected, per_scan = timed(lambda: pairwise(layouts, query, 0.6), max(1, repeats // 10))
+    assert found[0][0] == target
+    assert found == expected, "index and pairwise scan disagree"
+
+    print(f"{n:,} layouts, nearest {found[0][0]} at {found[0][1]:.2f}")
+    print(f"  index:          {per_index * 1000:8.3f} ms/lookup")
+    print(f"  pairwise scan:  {per_scan * 1000:8.3f} ms/lookup")
+    print(f"  speedup:        {per_scan / per_index:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: vectorized minutes/charge parsing vs the per-cell parser.
+
+    python benchmarks/bench_numeric_parse.py [rows]
+
+Parses 1M-row columns shaped like vendor exports with Series.apply(_parse_float)
+and with _parse_floats, checks the results are identical and prints the timings.
+
+- "excel numeric": a float64 column, as read_excel returns clean numbers
+- "durations": "M:SS" / "H:MM:SS" strings with blanks and junk
+- "charges": "$1,234.50" strings priced off a rate card
+- "mixed cells": Python ints/floats with a few strings, as Excel gives messy columns
+- "all distinct": every cell a different string (worst case)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from agents.standardizer_agent import StandardizerAgent  # noqa: E402
+
+
+def build_columns(rows: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    minutes = rng.integers(0, 180, rows)
+    seconds = rng.integers(0, 60, rows)
+    junk = rng.integers(0, 50, rows) == 0
+
+    durations = np.array([f"{m}:{s:02d}" if m < 60 else f"{m // 60}:{m % 60:02d}:{s:02d}" for m, s in zip(minutes, seconds)], dtype=object)
+    durations[junk] = rng.choice(np.array(["", "N/A", None, "TBD"], dtype=object), junk.sum())
+
+    rates = np.array([0.75, 0.95, 1.10, 1.25, 1.50, 1.95, 2.25, 3.00])
+    amounts = rates[rng.integers(0, len(rates), rows)] * minutes
+    charges = np.array([f"${a:,.2f}" for a in amounts], dtype=object)
+    charges[junk] = None
+
+    mixed = np.array([int(m) if m % 3 else m + s / 60 for m, s in zip(minutes, seconds)], dtype=object)
+    mixed[junk] = "5:30"
+
+    distinct = rng.permutation(rows) / 100
+    all_distinct = np.array([f"${a:,.2f}" for a in distinct], dtype=object)
+
+    return {
+        "excel numeric": pd.Series(minutes + seconds / 60.0),
+        "durations": pd.Series(durations),
+        "charges": pd.Series(charges),
+        "mixed cells": pd.Series(mixed),
+        "all distinct": pd.Series(all_distinct),
+    }
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    agent = StandardizerAgent()
+    print(f"rows: {rows:,}")
+    print(f"{'column':<15}{'row-wise':>10}{'vectorized':>12}{'speedup':>10}  identical")
+    ok = True
+    for name, column in build_columns(rows).items():
+        start = time.perf_counter()
+        expected = column.apply(agent._parse_float).to_numpy(dtype="float64")
+        rowwise = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed = agent._parse_floats(column)
+        vectorized = time.perf_counter() - start
+
+        identical = np.array_equal(expected, parsed, equal_nan=True)
+        ok &= identical
+        print(f"{name:<15}{rowwise:>9.2f}s{vectorized:>11.3f}s{rowwise / vectorized:>9.1f}x  {identical}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,9 @@ from multi_agent_system.src.agents.analyst_agent import AnalystAgent
 from multi_agent_system.src.agents.report_generator_agent import ReportGeneratorAgent
 from multi_agent_system.src.agents.simulator_agent import SimulatorAgent
 from core.memory_store import load_json, save_json
+from core.sheet_cache import SheetCache
+from core.ai_client import AIClient
+from core.run_index import find_run, read_manifest, run_fingerprint
 from multi_agent_system.src.core.activity_logger_enhanced import (
     EnhancedActivityLogger, Finding, AgentMessage, ImpactMetric
 )
@@ -269,6 +272,8 @@ if 'enhanced_logger' not in st.session_state:
     st.session_state.enhanced_logger = EnhancedActivityLogger()
 if 'recon_results' not in st.session_state:
     st.session_state.recon_results = {}
+if 'source_lookup' not in st.session_state:
+    st.session_state.source_lookup = None
 if 'signoff_data' not in st.session_state:
     st.session_state.signoff_data = {"reviewer": "", "status": "Pending", "notes": "", "date": None}
 
@@ -1106,6 +1111,82 @@ def render_audit_trail(logger: EnhancedActivityLogger, audit_logs: Dict):
     else:
         st.info("No intake diagnostics available.")
 
+    # Source Row Lookup
+    st.markdown("---")
+    st.markdown("### Source Row Lookup")
+    render_source_lookup(st.session_state.get("source_lookup"))
+
+
+def render_source_lookup(source_lookup: Optional[Dict[str, str]]):
+    """Raw source values behind selected transactions of a pipeline run, read through the sheet cache."""
+    if not source_lookup or not os.path.exists(source_lookup["transactions"]):
+        st.info("Source lookup is available for pipeline runs loaded from out/.")
+        return
+    transactions = pd.read_csv(source_lookup["transactions"], dtype={"source_row": "Int64", "source_sheet_row": "Int64"})
+    st.caption(f"Each transaction points to its row in the input files under `{source_lookup['input_dir']}`.")
+    files = sorted(transactions["source_file"].dropna().unique())
+    if not files:
+        st.info("No transactions with source lineage.")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        source_file = st.selectbox("Source File", files, key="lookup_file")
+    subset = transactions[transactions["source_file"] == source_file]
+    with col2:
+        sheet_rows = st.multiselect(
+            "Sheet Rows", subset["source_sheet_row"].dropna().astype(int).tolist(), key="lookup_rows"
+        )
+    if not sheet_rows:
+        return
+    selected = subset[subset["source_sheet_row"].isin(sheet_rows)]
+    intake = IntakeAgent(source_lookup["input_dir"], sheet_cache=SheetCache.from_config())
+    raw = intake.raw_rows(selected)
+    for (_, row), values in zip(selected.iterrows(), raw):
+        label = f"{row['source_file']} / {row['source_sheet']} / row {row['source_sheet_row']}"
+        with st.expander(label):
+            if values is None:
+                st.warning("Source file, sheet or row no longer available.")
+            else:
+                st.json({str(k): (None if pd.isna(v) else str(v)) for k, v in values.items()})
+
+
+def load_pipeline_run(run_dir: Path) -> Dict[str, Any]:
+    """Fill the session from a completed pipeline run's artifacts; returns its manifest."""
+    manifest = read_manifest(run_dir)
+    outputs = manifest["outputs"]
+    baseline_df = pd.read_csv(run_dir / outputs["baseline"])
+
+    reporter = ReportGeneratorAgent()
+    reporter.baseline = baseline_df
+    st.session_state.baseline_data = baseline_df
+    st.session_state.baseline_report_text = reporter.generate_full_report()
+
+    with open(run_dir / outputs["audit_logs"], "r") as f:
+        loaded_logs = json.load(f)
+    st.session_state.audit_logs = {
+        'intake': loaded_logs.get('intake', {}),
+        'schema': pd.DataFrame(loaded_logs.get('schema', [])),
+        'standardizer': pd.DataFrame(loaded_logs.get('standardizer', []))
+    }
+    # Transactions point back into the run's input files (see render_source_lookup)
+    if "transactions" in outputs and manifest.get("input_dir"):
+        st.session_state.source_lookup = {
+            "transactions": str(run_dir / outputs["transactions"]),
+            "input_dir": manifest["input_dir"]
+        }
+
+    metrics = manifest.get("metrics", {})
+    st.session_state.pipeline_summary = {
+        "run_timestamp": datetime.strptime(manifest["timestamp"], "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M"),
+        "files_processed": len(manifest.get("files_processed", [])),
+        "records_clean": metrics.get("total_records", 0),
+        "baseline_rows": len(baseline_df),
+        "total_spend": float(metrics.get("total_spend", 0.0)),
+        "reused_from": f"{manifest.get('client')}/{run_dir.name}"
+    }
+    st.session_state.processing_complete = True
+    return manifest
+
 
 # ============================================================================
 # SIDEBAR
@@ -1159,6 +1240,12 @@ with st.sidebar:
         help="Process files already stored on the server"
     )
 
+    reuse_runs = st.checkbox(
+        "Reuse matching pipeline runs",
+        value=True,
+        help="Load the outputs of a completed pipeline run with the same files, config, code and agent memory instead of processing again"
+    )
+
     run_btn = st.button(
         "🚀 Run Agent Pipeline",
         type="primary",
@@ -1371,6 +1458,7 @@ if run_btn:
     st.session_state.impact_metrics = {}
     st.session_state.enhanced_logger = EnhancedActivityLogger()
     st.session_state.recon_results = {}
+    st.session_state.source_lookup = None
     elogger = st.session_state.enhanced_logger
 
     # Setup Temp Dir
@@ -1435,6 +1523,25 @@ if run_btn:
                 st.error("No files found! Please upload or check 'data_files'.")
                 st.stop()
 
+            # Same fingerprint as a completed `baseline run` (batch mode): load its outputs
+            if reuse_runs:
+                fingerprint = run_fingerprint(
+                    file_paths, {"stream": False, "incremental": False, "ai": AIClient().enabled}
+                )
+                previous_run = find_run(Path(BASE_DIR) / "out", fingerprint)
+                if previous_run is not None:
+                    load_pipeline_run(previous_run)
+                    add_agent_message(
+                        "intake",
+                        f"These files match pipeline run **{previous_run.parent.name}/{previous_run.name}** "
+                        f"(same config, code and agent memory). Loaded its outputs instead of processing again.",
+                        "success"
+                    )
+                    status.update(label="✅ Stage 1 Complete: Reused Pipeline Run", state="complete")
+                    main_progress.progress(100, text="✅ Pipeline Complete (reused run)")
+                    time.sleep(1)
+                    st.rerun()
+
             # Log intake results
             elogger.add_conversation_exchange(
                 "intake", "schema",
@@ -1906,8 +2013,9 @@ if run_btn:
                 to_agent="analyst"
             )
 
+            cube = aggregator.build_cube(baseline_df)
             analyst = AnalystAgent()
-            variance_results = analyst.analyze_variance(baseline_df)
+            variance_results = analyst.analyze_variance(baseline_df, cube)
 
             # Extract key variance findings
             for period, data in variance_results.items():
@@ -1946,7 +2054,7 @@ if run_btn:
             )
 
             simulator = SimulatorAgent()
-            sim_res = simulator.run_scenarios(baseline_df)
+            sim_res = simulator.run_scenarios(baseline_df, cube)
             savings_found = sum(s['annual_impact'] for s in sim_res['scenarios'].values() if 'annual_impact' in s)
 
             elogger.add_conversation_exchange(
@@ -1994,6 +2102,7 @@ if run_btn:
 
             reporter = ReportGeneratorAgent()
             reporter.baseline = baseline_df
+            reporter.cube = cube
             report_text = reporter.generate_full_report()
 
             elogger.add_message("reporter", "Executive Baseline Report generated. Ready for consultant review.", "success")
@@ -2060,8 +2169,9 @@ if run_btn:
 
 if st.session_state.processing_complete and st.session_state.baseline_data is not None:
     df = st.session_state.baseline_data
+    cube = AggregatorAgent().build_cube(df)
     sim_def = SimulatorAgent()
-    res_def = sim_def.run_scenarios(df)
+    res_def = sim_def.run_scenarios(df, cube)
     total_sav = sum(s['annual_impact'] for s in res_def['scenarios'].values() if 'annual_impact' in s)
 
     # Detailed Tabs
@@ -2478,7 +2588,7 @@ if st.session_state.processing_complete and st.session_state.baseline_data is no
             # Story summary
             what_changed = "Not enough monthly history to compare yet."
             if "Month" in df.columns and "Cost" in df.columns:
-                monthly = df.groupby("Month")["Cost"].sum().sort_index()
+                monthly = cube.rollup("Month").set_index("Month")["Cost"]
                 if len(monthly) >= 2:
                     latest_month = monthly.index[-1]
                     prev_month = monthly.index[-2]
@@ -2500,7 +2610,7 @@ if st.session_state.processing_complete and st.session_state.baseline_data is no
 
             where_spend = "No spend breakdown available."
             if "Vendor" in df.columns and total_spend:
-                vendor_totals = df.groupby("Vendor")["Cost"].sum().sort_values(ascending=False)
+                vendor_totals = cube.rollup("Vendor").set_index("Vendor")["Cost"].sort_values(ascending=False)
                 if len(vendor_totals) > 0:
                     top_vendor = vendor_totals.index[0]
                     top_vendor_cost = vendor_totals.iloc[0]
@@ -2513,7 +2623,7 @@ if st.session_state.processing_complete and st.session_state.baseline_data is no
                         where_spend += f" Next: {second_vendor} at ${second_vendor_cost:,.0f} ({second_vendor_pct:.1f}%)."
 
             if "Modality" in df.columns and total_spend:
-                modality_totals = df.groupby("Modality")["Cost"].sum().sort_values(ascending=False)
+                modality_totals = cube.rollup("Modality").set_index("Modality")["Cost"].sort_values(ascending=False)
                 if len(modality_totals) > 0:
                     top_modality = modality_totals.index[0]
                     top_modality_cost = modality_totals.iloc[0]
@@ -2621,7 +2731,7 @@ if st.session_state.processing_complete and st.session_state.baseline_data is no
 
             c1, c2 = st.columns([2, 1])
             with c1:
-                trend_data = df.groupby(['Month', 'Vendor'])['Cost'].sum().reset_index()
+                trend_data = cube.rollup('Month', 'Vendor')[['Month', 'Vendor', 'Cost']]
                 fig = px.bar(
                     trend_data, x='Month', y='Cost', color='Vendor',
                     title='Monthly Spend Trend by Vendor',
@@ -2634,7 +2744,7 @@ if st.session_state.processing_complete and st.session_state.baseline_data is no
                 st.plotly_chart(fig, use_container_width=True)
 
             with c2:
-                mod_data = df.groupby('Modality')['Cost'].sum().reset_index()
+                mod_data = cube.rollup('Modality')[['Modality', 'Cost']]
                 fig2 = px.pie(
                     mod_data, values='Cost', names='Modality', hole=0.4,
                     title='Spend by Service Type',
@@ -5,6 +5,13 @@ import datetime
 from pathlib import Path
 import json
 import subprocess
+import contextlib
+import itertools
+import collections
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -35,10 +42,207 @@ from agents.simulator_agent import SimulatorAgent
 from agents.aggregator_agent import AggregatorAgent
 from core.activity_logger import reset_logger, get_logger
 from core.ai_client import AIClient
+from core.ai_cache import response_cache_stats
+from core.sheet_cache import SheetCache
+from core.canonical_schema import CanonicalBatch
+from core.batch_spool import BatchSpool
+from core.aggregate_store import AggregateStore, source_key
+from core.run_index import RunIndex, reuse_run, run_fingerprint
+from agents.qa_agent import RunningMoments
 
 # Update base_dir to project root for data access
 BASE_DIR = PROJECT_ROOT
 
+# Per-process agents for --workers pools, built once by _init_worker()
+_WORKER = {}
+
+
+def _read_file(intake, reconciler, sheet_cache, filepath):
+    """
+    Parse one file: reconciliation totals (candidates, invoice number) plus cleaned sheets.
+    One parse per workbook is shared by both; on a warm sheet cache neither
+    step opens the workbook at all.
+    """
+    with intake.open_workbook(filepath) as session:
+        totals = sheet_cache.get_totals(session.content_hash) if sheet_cache else None
+        if totals is None:
+            recon_sheets = intake.load_all_sheets_for_reconciliation(filepath, session=session)
+            totals = reconciler.find_file_totals(recon_sheets)
+            del recon_sheets
+            if sheet_cache:
+                sheet_cache.put_totals(session.content_hash, totals)
+        sheets = intake.load_clean_sheet(filepath, session=session)
+    return totals, sheets
+
+
+def _publish(src: Path, dst: Path) -> None:
+    """
+    Copy a run output over the shared copy in the project root via a temp file
+    and rename, so concurrent runs and the dashboard never see a partial file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=".tmp-", suffix=dst.suffix)
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def _init_worker(data_dir, no_cache):
+    # The parent already reported AI mode; keep worker start-up quiet
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        _WORKER["sheet_cache"] = SheetCache.from_config(disabled=no_cache)
+        _WORKER["intake"] = IntakeAgent(data_dir, sheet_cache=_WORKER["sheet_cache"], persist_classifications=False)
+    _WORKER["reconciler"] = ReconciliationAgent()
+    _WORKER["standardizer"] = StandardizerAgent()
+
+
+def _intake_worker(filepath):
+    """Pool task: read one file. Shared state goes back to the parent to merge."""
+    intake, sheet_cache = _WORKER["intake"], _WORKER["sheet_cache"]
+    hits, misses = (sheet_cache.hits, sheet_cache.misses) if sheet_cache else (0, 0)
+    totals, sheets = _read_file(intake, _WORKER["reconciler"], sheet_cache, filepath)
+    return {
+        "totals": totals,
+        "sheets": sheets,
+        "diagnostics": intake.file_diagnostics.pop(filepath, None),
+        "classifications": intake.take_new_classifications(),
+        "cache_hits": sheet_cache.hits - hits if sheet_cache else 0,
+        "cache_misses": sheet_cache.misses - misses if sheet_cache else 0,
+    }
+
+
+def _standardize_worker(df, mapping, filename, vendor, sheet_name, filepath, date_format, header_row):
+    """Pool task: standardize one mapped sheet."""
+    return _WORKER["standardizer"].process_dataframe_batch(
+        df, mapping, filename, vendor, sheet_name, filepath, date_format=date_format, header_row=header_row
+    )
+
+
+def _largest_first(files, window):
+    """
+    ``files`` in consecutive windows of ``window``, largest first within each.
+    Submitting ``window`` reads ahead and one more per file consumed in file
+    order always covers the file that is needed next.
+    """
+    for start in range(0, len(files), window):
+        yield from sorted(files[start:start + window], key=os.path.getsize, reverse=True)
+
+
+def _header_rows(diagnostics):
+    """Sheet name -> header row the intake read it below, from a file's diagnostics."""
+    return {s["sheet"]: s.get("header_row") for s in (diagnostics or {}).get("sheets_analyzed", [])}
+
+
+def _record_extraction(collect, new_records, log_details, audit_row, score):
+    """Fill in the extraction log/audit entries for a sheet once its records exist."""
+    log_details["records"] = len(new_records)
+    audit_row["Extracted Records"] = len(new_records)
+    audit_row["Dropped Rows"] = audit_row["Input Rows"] - len(new_records)
+    print(f"    {audit_row['File']}: {len(new_records):,} records (confidence: {score:.0%})")
+    collect(new_records)
+
+
+def _merge_stats(total, stats):
+    """Fold one chunk's agent stats into running totals (counts add, lists/dicts union)."""
+    for key, value in stats.items():
+        if key not in total:
+            total[key] = list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+        elif isinstance(value, list):
+            total[key].extend(v for v in value if v not in total[key])
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                total[key][k] = total[key].get(k, 0) + v
+        elif isinstance(value, (int, float)):
+            total[key] += value
+    return total
+
+
+def _fold_contributions(contributions, batch, aggregator, qa_agent):
+    """
+    --incremental: fold a clean batch into per-file contributions for the
+    aggregate store, i.e. group totals and duplicate-key hashes keyed by source_key().
+    """
+    names = batch.frame["source_file"].astype(str).str.strip().str.lower().to_numpy()
+    codes, uniques = pd.factorize(names)
+    for i, name in enumerate(uniques):
+        part = batch.take(codes == i)
+        totals, keys = contributions.get(name, (None, []))
+        contributions[name] = (aggregator.accumulate_batch(part, totals), keys + [qa_agent.duplicate_keys(part)])
+
+
+class _StreamPass:
+    """
+    --stream: run the per-record agents one sheet at a time so memory is bounded
+    by the largest input file rather than the whole run.
+
+    Pass 1 (add, as sheets are extracted): rate card and modality, plus the
+    rate moments QA needs for z-scores; the batch is then spooled to disk.
+    Pass 2 (finish, at the QA stage): replay the spool in order through QA with
+    the run-wide rate mean/std, fold reconciliation and aggregation totals and
+    append the clean rows to the transactions CSV.
+    """
+
+    def __init__(self, output_base):
+        self.spool = BatchSpool(output_base)
+        self.rate_card = RateCardAgent()
+        self.modality_agent = ModalityRefinementAgent()
+        self.qa_agent = QAgent()
+        self.rate_moments = RunningMoments()
+        self.imputation_stats = {}
+        self.modality_stats = {"OPI": 0, "VRI": 0, "OnSite": 0, "Translation": 0, "Unknown": 0}
+        self.sources = []  # normalized source file of each spooled batch
+
+    def add(self, batch):
+        if len(batch) == 0:
+            return
+        batch, stats = self.rate_card.validate_batch(batch)
+        _merge_stats(self.imputation_stats, stats)
+        _merge_stats(self.modality_stats, self.modality_agent.refine_batch(batch))
+        self.qa_agent.rate_moments(batch, self.rate_moments)
+        self.sources.append(str(batch.frame["source_file"].iloc[0]).strip().lower())
+        self.spool.append(batch)
+
+    def finish(self, reconciler, aggregator, trans_path, on_clean=None):
+        """
+        Pass 2. Returns (qa_stats, per-vendor reconciliation totals, baseline group totals, clean rows).
+        on_clean, if given, is called with each clean batch.
+        """
+        # Duplicate keys include the source file, so each file's seen-set can go after its last batch
+        last_batch = {name: i for i, name in enumerate(self.sources)}
+        seen = {}
+        qa_stats = {}
+        vendor_data = {}
+        totals = None
+        clean_count = 0
+        with open(trans_path, "w", newline="") as out:
+            for i, batch in enumerate(tqdm(self.spool.drain(), total=len(self.spool), desc="Second pass", unit="sheet")):
+                name = self.sources[i]
+                clean, stats = self.qa_agent.process_batch(batch, self.rate_moments, seen.setdefault(name, set()))
+                if last_batch[name] == i:
+                    del seen[name]
+                _merge_stats(qa_stats, stats)
+                reconciler.accumulate_batch(clean, vendor_data)
+                totals = aggregator.accumulate_batch(clean, totals)
+                if on_clean:
+                    on_clean(clean)
+                clean.to_frame().to_csv(out, header=(i == 0), index=False)
+                clean_count += len(clean)
+            if not self.sources:
+                CanonicalBatch.empty().to_frame().to_csv(out, index=False)
+        self.spool.close()
+
+        if qa_stats:
+            qa_stats["mean_rate_detected"] = float(self.rate_moments.mean)
+            qa_stats["std_rate_detected"] = float(self.rate_moments.std)
+        else:
+            _, qa_stats = self.qa_agent.process_batch(CanonicalBatch.empty())
+        return qa_stats, vendor_data, totals, clean_count
+
+
 def main():
     base_dir = BASE_DIR
     
@@ -46,22 +250,32 @@ def main():
     client_name = os.getenv("CLIENT_NAME", "default")
     input_dir = os.getenv("INPUT_DIR", str(base_dir / "data_files" / "Language Services"))
     data_dir = Path(input_dir)
+    # Runs go to <output_dir>/out/<client>/; the latest outputs are also published to <output_dir>
+    output_dir = Path(os.getenv("PIPELINE_OUTPUT_DIR") or base_dir)
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_base = base_dir / "out" / client_name / timestamp
-    output_base.mkdir(parents=True, exist_ok=True)
+    # A reused run can finish within the second: never share a run directory
+    for n in itertools.count(1):
+        output_base = output_dir / "out" / client_name / (timestamp if n == 1 else f"{timestamp}_{n}")
+        try:
+            output_base.mkdir(parents=True)
+            break
+        except FileExistsError:
+            continue
 
     # Initialize activity logger
     logger = reset_logger()
     
-    # Ensure output directory exists in project root or multi_agent_system?
-    # Let's write output to project root for visibility
-    output_dir = base_dir
-    
     ai_status = "ENABLED" if AIClient().enabled else "DISABLED"
     print(f"AI MODE: {ai_status}")
     logger.log("Orchestrator", "AI mode", {"status": ai_status})
     
+    stream = os.getenv("PIPELINE_STREAM", "").strip().lower() in {"1", "true", "yes", "on"}
+    if stream:
+        logger.log("Orchestrator", "Streaming mode", {"spool": str(output_base)})
+    incremental = os.getenv("PIPELINE_INCREMENTAL", "").strip().lower() in {"1", "true", "yes", "on"}
+    force = os.getenv("PIPELINE_FORCE", "").strip().lower() in {"1", "true", "yes", "on"}
+    
     print("=" * 60)
     print("BASELINE FACTORY - MULTI-AGENT SYSTEM")
     print("=" * 60)
@@ -72,7 +286,18 @@ def main():
     print("\n[1/9] INTAKE AGENT - Scanning for files...")
     logger.log("Intake Agent", "Started scanning", {"directory": str(data_dir)})
     
-    intake = IntakeAgent(str(data_dir))
+    no_cache = os.getenv("PIPELINE_NO_CACHE", "").strip().lower() in {"1", "true", "yes", "on"}
+    try:
+        workers = int(os.getenv("PIPELINE_WORKERS", "1"))
+    except ValueError:
+        workers = 1
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    sheet_cache = SheetCache.from_config(disabled=no_cache)
+    logger.log("Intake Agent", "Sheet cache", {"status": "ENABLED" if sheet_cache else "DISABLED"})
+    logger.log("Intake Agent", "Worker processes", {"count": workers})
+    
+    intake = IntakeAgent(str(data_dir), sheet_cache=sheet_cache)
     files = intake.scan_files()
     
     logger.log("Intake Agent", "Files discovered", {"count": len(files)})
@@ -81,19 +306,60 @@ def main():
     
     print(f"    Found {len(files)} files")
     
+    store = AggregateStore.for_client(client_name) if incremental else None
+    
+    # Same inputs, config, code and memory as an earlier complete run: reuse its outputs
+    run_options = {"stream": stream, "incremental": incremental, "ai": ai_status == "ENABLED"}
+    if store is not None:
+        run_options["aggregate_store"] = store.manifest
+    fingerprint = run_fingerprint(files, run_options)
+    run_index = RunIndex(output_base.parent)
+    previous = None if (force or no_cache) else run_index.lookup(fingerprint)
+    logger.log("Orchestrator", "Run fingerprint", {
+        "fingerprint": fingerprint,
+        "reused_from": previous.name if previous else None
+    })
+    if previous is not None:
+        manifest = reuse_run(previous, output_base, client=client_name, timestamp=timestamp,
+                             input_dir=str(data_dir), fingerprint=fingerprint)
+        _publish(output_base / manifest["outputs"]["baseline"], output_dir / "baseline_v1_output.csv")
+        _publish(output_base / manifest["outputs"]["transactions"], output_dir / "baseline_transactions.csv")
+        print(f"    Unchanged since run {previous.name} (fingerprint {fingerprint[:12]}); reusing its outputs")
+        print(f"  Outputs linked into: {output_base}")
+        print("\n" + "=" * 60)
+        print("PIPELINE COMPLETE (REUSED)")
+        print("=" * 60)
+        return
+    
+    # Incremental runs only process files the client's aggregate store does not have yet
+    unchanged_files = []
+    if incremental:
+        files, unchanged_files = store.changed_files(files)
+        logger.log("Intake Agent", "Incremental mode", {
+            "stored_files": len(store),
+            "new_or_changed": len(files),
+            "unchanged": len(unchanged_files)
+        })
+        print(f"    Incremental: {len(files)} new or changed, {len(unchanged_files)} unchanged (kept in the aggregate store)")
+    
     logger.set_summary("Intake Agent", {
         "key_metric": f"{len(files)} files found",
         "status": "OK",
         "issues": []
     })
     
-    records = []
+    batches = []  # one CanonicalBatch per standardized sheet
     schema_detective = SchemaAgent()
     standardizer = StandardizerAgent()
     reconciler = ReconciliationAgent()
     
+    streamer = _StreamPass(output_base) if stream else None
+    collect = streamer.add if streamer else batches.append
+    
     files_with_issues = []
     schema_audit_log = []
+    # One mapping per (vendor, column layout) for the whole run; see below
+    format_mappings = {}
     std_audit_log = []
     
     # =========================================================================
@@ -102,88 +368,187 @@ def main():
     print("\n[2/9] SCHEMA AGENT - Mapping columns...")
     print("[3/9] STANDARDIZER AGENT - Extracting records...")
     
-    for filepath in tqdm(files, desc="Processing files", unit="file"):
-        filename = os.path.basename(filepath)
-        vendor = filename.split(" ")[0].split("-")[0].replace("_", "")
+    # With --workers N, files are read and sheets standardized in a process pool.
+    # Schema mapping stays here, in file order, so the mapping registry has a
+    # single writer and results come out exactly as in a serial run.
+    pool = None
+    pending_files = {}
+    extractions = []
+    try:
+        if workers > 1 and len(files) > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(data_dir), no_cache))
+            # Parsed files wait in the parent until the file-order loop reaches them,
+            # so reads run at most a window ahead: two per worker, largest first
+            # within the window so one big workbook does not become the tail.
+            # Streaming runs read ahead in file order, only as far as the pool is wide.
+            read_ahead = workers if stream else 2 * workers
+            intake_queue = iter(files) if stream else _largest_first(files, read_ahead)
+            for filepath in itertools.islice(intake_queue, read_ahead):
+                pending_files[filepath] = pool.submit(_intake_worker, filepath)
+    
+        for filepath in tqdm(files, desc="Processing files", unit="file"):
+            filename = os.path.basename(filepath)
+            vendor = filename.split(" ")[0].split("-")[0].replace("_", "")
         
-        logger.log("Schema Agent", f"Processing file", {"file": filename, "vendor": vendor})
+            logger.log("Schema Agent", f"Processing file", {"file": filename, "vendor": vendor})
         
-        recon_sheets = intake.load_all_sheets_for_reconciliation(filepath)
-        reconciler.extract_totals_from_sheets(recon_sheets, vendor)
-        sheets = intake.load_clean_sheet(filepath)
+            if pool:
+                result = pending_files.pop(filepath).result()
+                for queued in itertools.islice(intake_queue, 1):
+                    pending_files[queued] = pool.submit(_intake_worker, queued)
+                totals, sheets = result["totals"], result["sheets"]
+                if result["diagnostics"] is not None:
+                    intake.file_diagnostics[filepath] = result["diagnostics"]
+                intake.merge_classifications(result["classifications"])
+                if sheet_cache:
+                    sheet_cache.hits += result["cache_hits"]
+                    sheet_cache.misses += result["cache_misses"]
+            else:
+                totals, sheets = _read_file(intake, reconciler, sheet_cache, filepath)
+            reconciler.apply_file_totals(totals, vendor, filename)
+            header_rows = _header_rows(intake.file_diagnostics.get(filepath))
         
-        for sheet_name, df in sheets.items():
-            cols = list(df.columns)
-            mapping = schema_detective.infer_mapping(
-                cols,
-                df.iloc[0] if len(df) > 0 else None,
-                vendor=vendor,
-                df=df
-            )
-            conf = schema_detective.assess_mapping(df, mapping)
-            score = conf["final_confidence"]
-            min_final = schema_detective.min_final_confidence
-            source = schema_detective.get_last_source()
+            # Sheets sharing a layout are mapped and validated once, on rows pooled
+            # across them; later sheets and files of that layout reuse the result
+            layouts = {}
+            for sheet_name, df in sheets.items():
+                layouts.setdefault(schema_detective.format_key(list(df.columns), vendor), []).append(df)
+        
+            for sheet_name, df in sheets.items():
+                cols = list(df.columns)
+                layout_key = schema_detective.format_key(cols, vendor)
+                layout = format_mappings.get(layout_key)
+                mapping = None
+                if layout is not None:
+                    # Same layout up to header case and spacing: use this sheet's own header names
+                    mapping = schema_detective.layout_mapping(layout["mapping"], layout["columns"], cols)
+                if mapping is None:
+                    # This sheet leads the pool, so the sample carries its header names
+                    sample = schema_detective.pooled_sample([df] + [f for f in layouts[layout_key] if f is not df])
+                    mapping = schema_detective.infer_mapping(
+                        cols,
+                        sample.iloc[0] if len(sample) > 0 else None,
+                        vendor=vendor,
+                        df=sample
+                    )
+                    layout = {
+                        "mapping": mapping,
+                        "columns": cols,
+                        "conf": schema_detective.assess_mapping(sample, mapping),
+                        "source": schema_detective.get_last_source(),
+                        "ai_reasoning": schema_detective.get_last_ai_reasoning(),
+                        "first_use": True
+                    }
+                    format_mappings[layout_key] = layout
+                else:
+                    layout["first_use"] = False
+                conf = layout["conf"]
+                score = conf["final_confidence"]
+                min_final = schema_detective.min_final_confidence
+                source = layout["source"] if layout["first_use"] else "format_group"
             
-            logger.log("Schema Agent", "Column mapping", {
-                "sheet": sheet_name,
-                "confidence": f"{score:.0%}",
-                "field_confidence": f"{conf['field_confidence']:.0%}",
-                "data_confidence": f"{conf['data_confidence']:.0%}",
-                "source": source,
-                "mapped_fields": list(mapping.keys())
-            })
+                logger.log("Schema Agent", "Column mapping", {
+                    "sheet": sheet_name,
+                    "confidence": f"{score:.0%}",
+                    "field_confidence": f"{conf['field_confidence']:.0%}",
+                    "data_confidence": f"{conf['data_confidence']:.0%}",
+                    "source": source,
+                    "mapped_fields": list(mapping.keys())
+                })
             
-            schema_audit_log.append({
-                "File": filename,
-                "Sheet": sheet_name,
-                "Confidence": f"{score:.1%}",
-                "Field Confidence": f"{conf['field_confidence']:.1%}",
-                "Data Confidence": f"{conf['data_confidence']:.1%}",
-                "Source": source,
-                "AI Reasoning": schema_detective.get_last_ai_reasoning(),
-                "Status": "Success" if score >= min_final else "Skipped (Low Confidence)",
-                "Columns Mapped": len(mapping),
-                "Mapping": str(mapping) if score < 0.5 else None,
-                "Date Col": mapping.get('date', 'MISSING'),
-                "Lang Col": mapping.get('language', 'MISSING'),
-                "Mins Col": mapping.get('minutes', 'MISSING'),
-                "Cost Col": mapping.get('charge', mapping.get('cost', 'MISSING'))
-            })
+                schema_audit_log.append({
+                    "File": filename,
+                    "Sheet": sheet_name,
+                    "Confidence": f"{score:.1%}",
+                    "Field Confidence": f"{conf['field_confidence']:.1%}",
+                    "Data Confidence": f"{conf['data_confidence']:.1%}",
+                    "Source": source,
+                    "AI Reasoning": layout["ai_reasoning"],
+                    "Status": "Success" if score >= min_final else "Skipped (Low Confidence)",
+                    "Columns Mapped": len(mapping),
+                    "Mapping": str(mapping) if score < 0.5 else None,
+                    "Date Col": mapping.get('date', 'MISSING'),
+                    "Lang Col": mapping.get('language', 'MISSING'),
+                    "Mins Col": mapping.get('minutes', 'MISSING'),
+                    "Cost Col": mapping.get('charge', mapping.get('cost', 'MISSING'))
+                })
             
-            if score < min_final:
-                logger.log("Schema Agent", "SKIPPED - Low confidence", {"sheet": sheet_name})
-                files_with_issues.append(f"{filename}/{sheet_name}: Low mapping confidence ({score:.0%})")
-                continue
-
-            schema_detective.confirm_mapping(
-                source_columns=cols,
-                mapping=mapping,
-                vendor=vendor,
-                data_confidence=conf["data_confidence"],
-                field_confidence=conf["field_confidence"]
-            )
+                if score < min_final:
+                    logger.log("Schema Agent", "SKIPPED - Low confidence", {"sheet": sheet_name})
+                    files_with_issues.append(f"{filename}/{sheet_name}: Low mapping confidence ({score:.0%})")
+                    continue
+
+                if layout["first_use"]:
+                    schema_detective.confirm_mapping(
+                        source_columns=cols,
+                        mapping=mapping,
+                        vendor=vendor,
+                        data_confidence=conf["data_confidence"],
+                        field_confidence=conf["field_confidence"]
+                    )
             
-            # Standardize
-            new_records = standardizer.process_dataframe(df, mapping, filename, vendor)
+                # Date format is detected once per layout and kept with the mapping
+                if "date_format" not in layout:
+                    date_format = schema_detective.get_date_format(cols, vendor)
+                    if date_format is None and mapping.get("date") in df.columns:
+                        date_format = standardizer.detect_date_format(df[mapping["date"]])
+                        schema_detective.remember_date_format(cols, vendor, date_format)
+                    layout["date_format"] = date_format
+                date_format = layout["date_format"]
             
-            logger.log("Standardizer Agent", "Records extracted", {
-                "file": filename,
-                "sheet": sheet_name,
-                "records": len(new_records)
-            })
+                # Standardize. Log and audit entries are placed now and completed once
+                # the records exist, so pooled runs keep the serial ordering.
+                log_details = {"file": filename, "sheet": sheet_name, "records": None}
+                logger.log("Standardizer Agent", "Records extracted", log_details)
             
-            std_audit_log.append({
-                "File": filename,
-                "Sheet": sheet_name,
-                "Input Rows": len(df),
-                "Extracted Records": len(new_records),
-                "Dropped Rows": len(df) - len(new_records),
-                "Status": "Success"
-            })
+                audit_row = {
+                    "File": filename,
+                    "Sheet": sheet_name,
+                    "Input Rows": len(df),
+                    "Extracted Records": None,
+                    "Dropped Rows": None,
+                    "Status": "Success"
+                }
+                std_audit_log.append(audit_row)
             
-            print(f"    {filename}: {len(new_records):,} records (confidence: {score:.0%})")
-            records.extend(new_records)
+                if pool:
+                    job = pool.submit(
+                        _standardize_worker, df, mapping, filename, vendor, sheet_name, filepath, date_format,
+                        header_rows.get(sheet_name)
+                    )
+                    extractions.append((job, log_details, audit_row, score))
+                else:
+                    new_records = standardizer.process_dataframe_batch(
+                        df, mapping, filename, vendor, sheet_name, filepath, date_format=date_format,
+                        header_row=header_rows.get(sheet_name)
+                    )
+                    _record_extraction(collect, new_records, log_details, audit_row, score)
+        
+            if pool and stream:
+                # Finish this file's sheets before the next file is held in memory
+                for job, log_details, audit_row, score in extractions:
+                    _record_extraction(collect, job.result(), log_details, audit_row, score)
+                extractions = []
+    
+        if pool:
+            for job, log_details, audit_row, score in extractions:
+                _record_extraction(collect, job.result(), log_details, audit_row, score)
+    finally:
+        if pool:
+            # After an error, queued reads and extractions are dropped, not run
+            pool.shutdown(cancel_futures=True)
+    
+    if stream:
+        records = None
+        record_count = streamer.spool.record_count
+    else:
+        records = CanonicalBatch.concat(batches)
+        record_count = len(records)
+    del batches
+    
+    if sheet_cache:
+        logger.log("Intake Agent", "Sheet cache usage", {"hits": sheet_cache.hits, "misses": sheet_cache.misses})
+        print(f"    Sheet cache: {sheet_cache.hits} hits, {sheet_cache.misses} misses")
     
     logger.set_summary("Schema Agent", {
         "key_metric": f"{len(files)} files mapped",
@@ -192,7 +557,7 @@ def main():
     })
     
     logger.set_summary("Standardizer Agent", {
-        "key_metric": f"{len(records):,} total records extracted",
+        "key_metric": f"{record_count:,} total records extracted",
         "status": "OK",
         "issues": []
     })
@@ -201,10 +566,13 @@ def main():
     # AGENT 4: RATE CARD
     # =========================================================================
     print(f"\n[4/9] RATE CARD AGENT - Validating costs...")
-    logger.log("Rate Card Agent", "Started validation", {"input_records": len(records)})
+    logger.log("Rate Card Agent", "Started validation", {"input_records": record_count})
     
-    rate_card = RateCardAgent()
-    records, imputation_stats = rate_card.batch_impute(records)
+    if stream:
+        imputation_stats = streamer.imputation_stats
+    else:
+        rate_card = RateCardAgent()
+        records, imputation_stats = rate_card.validate_batch(records)
     
     records_with_cost = imputation_stats.get('records_with_cost', 0)
     records_missing_cost = imputation_stats.get('records_missing_cost', 0)
@@ -234,10 +602,13 @@ def main():
     # AGENT 5: MODALITY
     # =========================================================================
     print(f"\n[5/9] MODALITY AGENT - Refining service types...")
-    logger.log("Modality Agent", "Started refinement", {"input_records": len(records)})
+    logger.log("Modality Agent", "Started refinement", {"input_records": record_count})
     
-    modality_agent = ModalityRefinementAgent()
-    m_stats = modality_agent.refine_records(records)
+    if stream:
+        m_stats = streamer.modality_stats
+    else:
+        modality_agent = ModalityRefinementAgent()
+        m_stats = modality_agent.refine_batch(records)
     
     logger.log("Modality Agent", "Distribution", {
         "OPI": m_stats['OPI'],
@@ -263,10 +634,21 @@ def main():
     # AGENT 6: QA
     # =========================================================================
     print(f"\n[6/9] QA AGENT - Finding duplicates and outliers...")
-    logger.log("QA Agent", "Started validation", {"input_records": len(records)})
+    logger.log("QA Agent", "Started validation", {"input_records": record_count})
     
-    qa_agent = QAgent()
-    records, qa_stats = qa_agent.process_records(records)
+    aggregator = AggregatorAgent()
+    trans_path = output_base / "baseline_transactions.csv"
+    contributions = {}
+    if stream:
+        # Second pass also folds reconciliation/aggregation totals and writes transactions
+        on_clean = (lambda clean: _fold_contributions(contributions, clean, aggregator, streamer.qa_agent)) if store is not None else None
+        qa_stats, vendor_data, baseline_totals, record_count = streamer.finish(reconciler, aggregator, trans_path, on_clean)
+    else:
+        qa_agent = QAgent()
+        records, qa_stats = qa_agent.process_batch(records)
+        record_count = len(records)
+        if store is not None:
+            _fold_contributions(contributions, records, aggregator, qa_agent)
     
     logger.log("QA Agent", "Duplicate detection", {
         "duplicates_removed": qa_stats['duplicates_removed']
@@ -299,9 +681,12 @@ def main():
     # AGENT 7: RECONCILIATION
     # =========================================================================
     print(f"\n[7/9] RECONCILIATION AGENT - Matching invoice totals...")
-    logger.log("Reconciliation Agent", "Started reconciliation", {"input_records": len(records)})
+    logger.log("Reconciliation Agent", "Started reconciliation", {"input_records": record_count})
     
-    recon_results = reconciler.run_reconciliation(records)
+    if stream:
+        recon_results = reconciler.reconcile_totals(vendor_data)
+    else:
+        recon_results = reconciler.run_reconciliation_batch(records)
     overall_status = recon_results.get("overall_status", "UNKNOWN")
     total_variance = recon_results.get("total_variance", 0.0)
     
@@ -310,9 +695,17 @@ def main():
         "total_variance": f"${total_variance:,.2f}",
         "vendors": len(recon_results.get("vendors", {}))
     })
+    invoices = recon_results.get("invoices", [])
+    invoice_statuses = collections.Counter(inv["status"] for inv in invoices)
+    logger.log("Reconciliation Agent", "Invoice reconciliation", {
+        "invoices": len(invoices),
+        **{status.lower(): count for status, count in sorted(invoice_statuses.items())}
+    })
     
     print(f"    Overall status: {overall_status}")
     print(f"    Total variance: ${total_variance:,.2f}")
+    print(f"    Invoice periods: {len(invoices)} "
+          f"({invoice_statuses['MATCH']} match, {invoice_statuses['DISCREPANCY']} discrepancy)")
     
     recon_issues = []
     for vendor, stats in recon_results.get("vendors", {}).items():
@@ -320,6 +713,10 @@ def main():
             recon_issues.append(
                 f"{vendor}: {stats.get('status')} (variance {stats.get('variance_pct', 0):.2f}%)"
             )
+    for inv in invoices:
+        if inv["status"] == "DISCREPANCY":
+            label = " ".join(part for part in (inv["month"], inv["invoice"] and f"#{inv['invoice']}") if part)
+            recon_issues.append(f"{inv['vendor']} {label}: DISCREPANCY (variance {inv['variance_pct']:.2f}%)")
     
     logger.set_summary("Reconciliation Agent", {
         "key_metric": f"{overall_status} | ${total_variance:,.2f} variance",
@@ -331,10 +728,31 @@ def main():
     # AGENT 8: AGGREGATOR
     # =========================================================================
     print(f"\n[8/9] AGGREGATOR AGENT - Creating baseline...")
-    logger.log("Aggregator Agent", "Started aggregation", {"input_records": len(records)})
-    
-    aggregator = AggregatorAgent()
-    baseline_table = aggregator.create_baseline(records)
+    logger.log("Aggregator Agent", "Started aggregation", {"input_records": record_count})
+    
+    if store is not None:
+        # Replace the stored contributions of this run's files; the baseline covers the whole store
+        for filepath in files:
+            totals, keys = contributions.get(source_key(filepath), (None, []))
+            store.stage(filepath, totals, np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64))
+        store_changes = store.commit()
+        logger.log("Aggregator Agent", "Aggregate store updated", {
+            "files_added": len(store_changes["added"]),
+            "files_replaced": len(store_changes["replaced"]),
+            "records_added": store_changes["records_added"],
+            "records_retracted": store_changes["records_retracted"],
+            "rows_carried_over": store_changes["rows_carried_over"],
+            "stored_files": len(store)
+        })
+        print(f"    Aggregate store: {len(store_changes['added'])} files added, "
+              f"{len(store_changes['replaced'])} replaced ({store_changes['records_retracted']:,} records retracted), "
+              f"{len(store)} files in baseline")
+        baseline_table = aggregator.finalize_baseline(store.totals())
+    elif stream:
+        baseline_table = aggregator.finalize_baseline(baseline_totals)
+    else:
+        baseline_table = aggregator.create_baseline_batch(records)
+    cube = aggregator.build_cube(baseline_table)
     
     # Handle empty baseline
     if baseline_table.empty:
@@ -358,11 +776,13 @@ def main():
     print(f"    Total minutes:  {total_minutes:,.0f}")
 
     # Sanity Checks
-    if total_cost == 0 and len(records) > 0:
+    if total_cost == 0 and record_count > 0:
         print("  ⚠️ WARNING: Total cost is $0 despite having records. Check rate card/mapping.")
         logger.log("Orchestrator", "Sanity Check Warning", {"message": "Total cost is $0"})
 
-    if len(records) == 0:
+    if record_count == 0 and store is not None and len(store):
+        print("    No new records this run; baseline rebuilt from the aggregate store.")
+    elif record_count == 0:
         print("  ❌ ERROR: No records processed. Check input files and schema mappings.")
         logger.log("Orchestrator", "Sanity Check Error", {"message": "No records processed"})
     
@@ -379,7 +799,7 @@ def main():
     
     # Analyst
     analyst = AnalystAgent()
-    analysis_results = analyst.analyze_variance(baseline_table)
+    analysis_results = analyst.analyze_variance(baseline_table, cube)
     if isinstance(analysis_results, dict) and "status" not in analysis_results:
         analyst.print_summary(analysis_results)
         latest_period = list(analysis_results.keys())[-1] if analysis_results else None
@@ -400,7 +820,7 @@ def main():
     
     # Simulator
     simulator = SimulatorAgent()
-    sim_results = simulator.run_scenarios(baseline_table)
+    sim_results = simulator.run_scenarios(baseline_table, cube)
     simulator.print_opportunity_register(sim_results)
     total_savings = sum(
         s.get("annual_impact", 0) for s in sim_results.get("scenarios", {}).values()
@@ -424,19 +844,31 @@ def main():
     v1_path = output_base / "baseline_v1_output.csv"
     baseline_table.to_csv(v1_path, index=False)
     # Also save to root for backward compatibility if needed, but prefer out/
-    baseline_table.to_csv(base_dir / "baseline_v1_output.csv", index=False)
+    _publish(v1_path, output_dir / "baseline_v1_output.csv")
     print(f"  Baseline saved to: {v1_path}")
-    
-    # Save transactions
-    transactions_df = pd.DataFrame([r.model_dump() for r in records])
-    if 'date' in transactions_df.columns:
-        transactions_df['date'] = transactions_df['date'].astype(str)
-    trans_path = output_base / "baseline_transactions.csv"
-    transactions_df.to_csv(trans_path, index=False)
+
+    # Save the grouping-sets cube next to it
+    cube_path = output_base / "baseline_cube.parquet"
+    try:
+        cube.to_parquet(cube_path)
+        print(f"  Baseline cube saved to: {cube_path}")
+    except ImportError:
+        cube_path = None
+        print("  Baseline cube not saved: pyarrow is not installed")
+    
+    # Save transactions (a streaming run has already written them chunk by chunk)
+    if not stream:
+        records.to_frame().to_csv(trans_path, index=False)
     # Also save to root
-    transactions_df.to_csv(base_dir / "baseline_transactions.csv", index=False)
+    _publish(trans_path, output_dir / "baseline_transactions.csv")
     print(f"  Transactions saved to: {trans_path}")
     
+    ai_cache_stats = response_cache_stats()
+    if ai_cache_stats:
+        logger.log("Orchestrator", "AI response cache usage", ai_cache_stats)
+        print(f"  AI response cache ({ai_cache_stats['mode']}): "
+              f"{ai_cache_stats['hits']} hits, {ai_cache_stats['misses']} misses")
+
     # Save Activity Log
     log_path = output_base / "AGENT_ACTIVITY_LOG.md"
     logger.save_report(log_path)
@@ -446,7 +878,8 @@ def main():
     audit_data = {
         'intake': intake.file_diagnostics,
         'schema': schema_audit_log,
-        'standardizer': std_audit_log
+        'standardizer': std_audit_log,
+        'reconciliation': recon_results.get("invoices", [])
     }
     
     audit_path = output_base / "audit_logs.json"
@@ -454,20 +887,30 @@ def main():
         json.dump(audit_data, f, indent=2)
     print(f"  Agent audit logs saved to: {audit_path}")
 
+    # The same inputs against the memory (and aggregate store) as this run leaves
+    # them: what an identical next run computes, so it is indexed here as well
+    if store is not None:
+        run_options["aggregate_store"] = store.manifest
+    final_fingerprint = run_fingerprint(files + unchanged_files, run_options)
+
     # Generate Manifest
     manifest = {
         "client": client_name,
         "timestamp": timestamp,
         "input_dir": str(data_dir),
+        "fingerprint": fingerprint,
+        "final_fingerprint": final_fingerprint,
         "files_processed": [os.path.basename(f) for f in files],
+        **({"files_unchanged": [os.path.basename(f) for f in unchanged_files]} if store is not None else {}),
         "outputs": {
             "baseline": "baseline_v1_output.csv",
             "transactions": "baseline_transactions.csv",
             "activity_log": "AGENT_ACTIVITY_LOG.md",
-            "audit_logs": "audit_logs.json"
+            "audit_logs": "audit_logs.json",
+            **({"cube": cube_path.name} if cube_path else {})
         },
         "metrics": {
-            "total_records": len(records),
+            "total_records": record_count,
             "total_spend": float(total_cost),
             "total_minutes": float(total_minutes)
         },
@@ -517,6 +960,11 @@ def main():
     else:
         print("  Validation script not found; skipping post-run validation.")
     
+    # Only a validated run is offered for reuse
+    run_index.record(fingerprint, output_base)
+    if final_fingerprint != fingerprint:
+        run_index.record(final_fingerprint, output_base)
+    
     print("\n" + "=" * 60)
     print("PIPELINE COMPLETE")
     print("=" * 60)
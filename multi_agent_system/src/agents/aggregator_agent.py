@@ -1,58 +1,80 @@
 
+import numpy as np
 import pandas as pd
-from typing import List
-from core.canonical_schema import CanonicalRecord
+from typing import List, Optional
+from core.baseline_cube import BaselineCube, add_rates
+from core.canonical_schema import CanonicalBatch, CanonicalRecord
+
+BASELINE_COLUMNS = ["Month", "Vendor", "Language", "Modality", "Minutes", "Cost", "Calls", "CPM", "Avg_Call_Length"]
 
 class AggregatorAgent:
     """
-    Consumes CanonicalRecords and produces the Baseline Table (v1).
+    Consumes CanonicalRecords (or a CanonicalBatch) and produces the Baseline Table (v1)
+    and its grouping-sets cube.
     """
 
     def create_baseline(self, records: List[CanonicalRecord]) -> pd.DataFrame:
-        if not records:
-            return pd.DataFrame(columns=["Month", "Vendor", "Language", "Modality", "Minutes", "Cost", "Calls", "CPM", "Avg_Call_Length"])
-            
-        # Convert to DataFrame
-        data = [
-            {
-                "Month": r.date.strftime("%Y-%m"), # Bucket by Month
-                "Vendor": r.vendor,
-                "Language": r.language,
-                "Modality": r.modality,
-                "Minutes": r.minutes_billed,
-                "Cost": r.total_charge,
-                "Calls": 1
-            }
-            for r in records
-        ]
-        
-        df = pd.DataFrame(data)
+        return self.create_baseline_batch(CanonicalBatch.from_records(records))
+
+    def create_baseline_batch(self, batch: CanonicalBatch) -> pd.DataFrame:
+        if len(batch) == 0:
+            return pd.DataFrame(columns=BASELINE_COLUMNS)
+        return self.finalize_baseline(self.group_totals(batch))
+
+    def accumulate_batch(self, batch: CanonicalBatch, totals: Optional[pd.DataFrame] = None) -> Optional[pd.DataFrame]:
+        """
+        Streaming mode: fold a batch into running group totals and return them.
+        The sums are additive, so finalize_baseline() on the result equals
+        create_baseline_batch() on all batches at once up to float rounding
+        in the last digits (sums are re-associated chunk by chunk).
+        """
+        if len(batch) == 0:
+            return totals
+        partial = self.group_totals(batch)
+        if totals is None:
+            return partial
+        keys = ["Month", "Vendor", "Language", "Modality"]
+        return pd.concat([totals, partial], ignore_index=True).groupby(keys).sum().reset_index()
+
+    def group_totals(self, batch: CanonicalBatch) -> pd.DataFrame:
+        """Minutes / Cost / Calls summed per Month, Vendor, Language, Modality."""
+        # Plain string keys: grouping on the categoricals would order by category
+        df = pd.DataFrame({
+            "Month": batch.months().astype(object), # Bucket by Month
+            "Vendor": batch.frame["vendor"].to_numpy(),
+            "Language": batch.frame["language"].to_numpy(),
+            "Modality": batch.frame["modality"].to_numpy(),
+            "Minutes": batch.frame["minutes_billed"].to_numpy(),
+            "Cost": batch.frame["total_charge"].to_numpy(),
+            "Calls": np.ones(len(batch), dtype="int64")
+        })
         
         # Aggregate
         # Group by Month, Vendor, Language, Modality
         # Sum Minutes, Cost, Calls
         
-        baseline = df.groupby(["Month", "Vendor", "Language", "Modality"]).agg({
+        return df.groupby(["Month", "Vendor", "Language", "Modality"]).agg({
             "Minutes": "sum",
             "Cost": "sum",
             "Calls": "sum"
         }).reset_index()
-        
+
+    def finalize_baseline(self, totals: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """Derive CPM / Avg_Call_Length from group totals and sort the baseline table."""
+        if totals is None or totals.empty:
+            return pd.DataFrame(columns=BASELINE_COLUMNS)
         # Calculate derived metrics
-        baseline["CPM"] = (
-            baseline["Cost"]
-            .div(baseline["Minutes"])
-            .replace([float("inf"), -float("inf")], 0.0)
-            .fillna(0.0)
-        )
-        baseline["Avg_Call_Length"] = (
-            baseline["Minutes"]
-            .div(baseline["Calls"])
-            .replace([float("inf"), -float("inf")], 0.0)
-            .fillna(0.0)
-        )
+        baseline = add_rates(totals.copy())
         
         # Sort
         baseline = baseline.sort_values(["Month", "Cost"], ascending=[True, False])
         
         return baseline
+
+    def build_cube(self, baseline: pd.DataFrame) -> BaselineCube:
+        """
+        Every rollup of the baseline table (by month, vendor, language, modality
+        and each combination, plus the grand total) for downstream agents to
+        query instead of re-grouping the baseline.
+        """
+        return BaselineCube.from_baseline(baseline)
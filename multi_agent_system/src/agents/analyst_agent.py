@@ -1,6 +1,7 @@
 
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from core.baseline_cube import DIMENSIONS, BaselineCube
 
 class AnalystAgent:
     """
@@ -16,9 +17,11 @@ class AnalystAgent:
         except ImportError:
             self.ai = None
 
-    def analyze_variance(self, baseline_df: pd.DataFrame) -> Dict[str, Any]:
+    def analyze_variance(self, baseline_df: pd.DataFrame, cube: Optional[BaselineCube] = None) -> Dict[str, Any]:
         """
         Calculates Price-Volume-Mix (PVM) effects between consecutive months.
+        The months and the per-month detail are read from the baseline's cube
+        (built here when not given).
         
         Formulae used:
         - Price Effect: (Rate_new - Rate_old) * Volume_new
@@ -28,11 +31,17 @@ class AnalystAgent:
         if baseline_df.empty or "Month" not in baseline_df.columns:
             return {"status": "Insufficient data"}
 
+        if cube is None:
+            cube = BaselineCube.from_baseline(baseline_df)
+
         # Get sorted list of months
-        months = sorted(baseline_df["Month"].unique())
+        months = cube.rollup("Month")["Month"].tolist()
         if len(months) < 2:
             return {"status": "Need at least 2 consecutive months for variance analysis"}
 
+        # Finest grouping set, split by month once
+        by_month = dict(list(cube.rollup(*DIMENSIONS).groupby("Month", sort=False)))
+
         analysis_report = {}
         
         for i in range(1, len(months)):
@@ -40,8 +49,8 @@ class AnalystAgent:
             curr_m = months[i]
             
             # Filter periods
-            p_df = baseline_df[baseline_df["Month"] == prior_m].copy()
-            c_df = baseline_df[baseline_df["Month"] == curr_m].copy()
+            p_df = by_month[prior_m]
+            c_df = by_month[curr_m]
             
             # Key for joining: Vendor, Language, Modality
             join_cols = ["Vendor", "Language", "Modality"]
@@ -1,10 +1,11 @@
 
 import os
 import hashlib
-from contextlib import contextmanager
 import pandas as pd
-from typing import List, Dict, Any
-from core.memory_store import ensure_memory_dir, load_json, save_json
+from typing import List, Dict, Any, Optional
+from core.memory_store import ensure_memory_dir, load_json, merge_json
+from core.sheet_cache import SheetCache
+from core.workbook import CSV_SHEET, WorkbookSession, open_excel_file
 
 class IntakeAgent:
     """
@@ -15,14 +16,24 @@ class IntakeAgent:
     - Scan ALL sheets and score them for transaction data
     - Handle invoice formats by finding detail sheets
     - Detect header rows intelligently
+    - Parse each workbook once (WorkbookSession) and share it with reconciliation
     """
     
-    def __init__(self, data_dir: str):
+    def __init__(
+        self,
+        data_dir: str,
+        sheet_cache: Optional[SheetCache] = None,
+        persist_classifications: bool = True
+    ):
         self.data_dir = data_dir
+        self.sheet_cache = sheet_cache  # Reuse parsed sheets when file bytes are unchanged
         self.file_diagnostics = {}  # Store diagnostics for each file
         mem_dir = ensure_memory_dir()
         self._classify_path = mem_dir / "intake_classifications.json"
         self._classify_cache = load_json(self._classify_path, {})
+        # Pool workers leave persistence to the parent (see merge_classifications)
+        self._persist_classifications = persist_classifications
+        self._new_classifications: Dict[str, Dict[str, Any]] = {}
         try:
             from core.ai_client import AIClient
             self.ai = AIClient()
@@ -38,21 +49,20 @@ class IntakeAgent:
                     files_found.append(os.path.join(root, file))
         return files_found
 
-    @contextmanager
     def _open_excel_file(self, filepath: str):
         """
         Open Excel files with engine settings that suppress noisy legacy .xls logs.
         """
-        ext = os.path.splitext(filepath)[1].lower()
-        if ext == ".xls":
-            with open(os.devnull, "w", encoding="utf-8") as sink:
-                with pd.ExcelFile(filepath, engine="xlrd", engine_kwargs={"logfile": sink}) as xls:
-                    yield xls
-            return
-        with pd.ExcelFile(filepath) as xls:
-            yield xls
+        return open_excel_file(filepath)
+
+    def open_workbook(self, filepath: str) -> WorkbookSession:
+        """
+        Open a single-pass session for a file. Pass it to load_clean_sheet() and
+        load_all_sheets_for_reconciliation() so each sheet is parsed only once.
+        """
+        return WorkbookSession(filepath)
 
-    def load_clean_sheet(self, filepath: str) -> Dict[str, pd.DataFrame]:
+    def load_clean_sheet(self, filepath: str, session: Optional[WorkbookSession] = None) -> Dict[str, pd.DataFrame]:
         """
         Intelligently loads an Excel file. 
         It looks for the 'header' row by finding the row with the most text columns or specific keywords.
@@ -60,15 +70,27 @@ class IntakeAgent:
         
         Enhanced: Now scans ALL sheets and picks the best one(s) with transaction data.
         """
+        if session is None:
+            with self.open_workbook(filepath) as own_session:
+                return self.load_clean_sheet(filepath, session=own_session)
+
+        if self.sheet_cache is not None:
+            cached = self.sheet_cache.get_sheets(session.content_hash)
+            if cached is not None:
+                dfs, diagnostics = cached
+                diagnostics['file'] = os.path.basename(filepath)
+                self.file_diagnostics[filepath] = diagnostics
+                return dfs
+
         dfs = {}
+        header_rows = {}
         diagnostics = {'file': os.path.basename(filepath), 'sheets_analyzed': [], 'best_sheet': None}
-        ext = os.path.splitext(filepath)[1].lower()
 
         # CSV path: treat as a single logical sheet
-        if ext == ".csv":
+        if session.is_csv:
             try:
-                preview = pd.read_csv(filepath, nrows=100, header=None)
-                sheet_name = "csv"
+                sheet_name = CSV_SHEET
+                preview = session.preview(sheet_name, nrows=100)
                 sheet_score = self._score_sheet_for_transactions(preview)
                 header_row_idx = self._detect_header_row(preview)
                 classification = self._classify_sheet(preview, filepath, sheet_name, sheet_score)
@@ -83,106 +105,141 @@ class IntakeAgent:
                 is_transaction = classification.get('type') == 'transaction' and classification.get('confidence', 0) >= 0.6
                 strong_heuristic = sheet_score >= 3
                 if (strong_heuristic or is_transaction) and header_row_idx is not None:
-                    full_df = pd.read_csv(filepath, header=header_row_idx)
+                    full_df = session.frame(sheet_name, header_row_idx)
                     full_df = full_df.dropna(how='all')
                     if len(full_df) >= 5:
                         dfs[sheet_name] = full_df
+                        header_rows[sheet_name] = header_row_idx
                         diagnostics['best_sheet'] = sheet_name
             except Exception as e:
                 diagnostics['error'] = str(e)
                 print(f"Error loading {filepath}: {e}")
 
-            self.file_diagnostics[filepath] = diagnostics
+            self._finish_load(filepath, session, dfs, header_rows, diagnostics)
             return dfs
         
         try:
-            with self._open_excel_file(filepath) as xls:
-                sheet_scores = []
-                    
-                for sheet in xls.sheet_names:
-                    try:
-                        # Read first ~100 rows to find the header
-                        preview = pd.read_excel(xls, sheet_name=sheet, nrows=100, header=None)
-                        
-                        # Score this sheet for transaction data
-                        sheet_score = self._score_sheet_for_transactions(preview)
-                        header_row_idx = self._detect_header_row(preview)
-                        classification = self._classify_sheet(preview, filepath, sheet, sheet_score)
-                        
-                        sheet_scores.append({
-                            'sheet': sheet,
-                            'score': sheet_score,
-                            'header_row': header_row_idx,
-                            'classification': classification
-                        })
-                        
-                        diagnostics['sheets_analyzed'].append({
-                            'sheet': sheet,
-                            'score': sheet_score,
-                            'header_row': header_row_idx,
-                            'classification': classification
-                        })
-                        
-                    except Exception as e:
-                        diagnostics['sheets_analyzed'].append({
-                            'sheet': sheet,
-                            'score': None,
-                            'header_row': None,
-                            'error': str(e)
-                        })
-                        continue
-                
-                # Sort by score and pick the best sheet(s)
-                sheet_scores.sort(key=lambda x: x['score'], reverse=True)
+            sheet_scores = []
                 
-                # Load sheets with score >= 3 (likely have transaction data)
-                for sheet_info in sheet_scores:
-                    classification = sheet_info.get('classification', {})
-                    is_transaction = classification.get('type') == 'transaction' and classification.get('confidence', 0) >= 0.6
-                    strong_heuristic = sheet_info['score'] >= 3
-                    if (strong_heuristic or is_transaction) and sheet_info['header_row'] is not None:
-                        sheet = sheet_info['sheet']
-                        header_row_idx = sheet_info['header_row']
-                        
-                        full_df = pd.read_excel(xls, sheet_name=sheet, header=header_row_idx)
-                        full_df = full_df.dropna(how='all')
-                        
-                        # Additional filter: must have at least 5 data rows
-                        if len(full_df) >= 5:
-                            dfs[sheet] = full_df
-                            if diagnostics['best_sheet'] is None:
-                                diagnostics['best_sheet'] = sheet
+            for sheet in session.sheet_names:
+                try:
+                    # First ~100 rows of the cached grid are enough to find the header
+                    preview = session.preview(sheet, nrows=100)
+                    
+                    # Score this sheet for transaction data
+                    sheet_score = self._score_sheet_for_transactions(preview)
+                    header_row_idx = self._detect_header_row(preview)
+                    classification = self._classify_sheet(preview, filepath, sheet, sheet_score)
+                    
+                    sheet_scores.append({
+                        'sheet': sheet,
+                        'score': sheet_score,
+                        'header_row': header_row_idx,
+                        'classification': classification
+                    })
+                    
+                    diagnostics['sheets_analyzed'].append({
+                        'sheet': sheet,
+                        'score': sheet_score,
+                        'header_row': header_row_idx,
+                        'classification': classification
+                    })
+                    
+                except Exception as e:
+                    diagnostics['sheets_analyzed'].append({
+                        'sheet': sheet,
+                        'score': None,
+                        'header_row': None,
+                        'error': str(e)
+                    })
+                    continue
+            
+            # Sort by score and pick the best sheet(s)
+            sheet_scores.sort(key=lambda x: x['score'], reverse=True)
+            
+            # Load sheets with score >= 3 (likely have transaction data)
+            for sheet_info in sheet_scores:
+                classification = sheet_info.get('classification', {})
+                is_transaction = classification.get('type') == 'transaction' and classification.get('confidence', 0) >= 0.6
+                strong_heuristic = sheet_info['score'] >= 3
+                if (strong_heuristic or is_transaction) and sheet_info['header_row'] is not None:
+                    sheet = sheet_info['sheet']
+                    header_row_idx = sheet_info['header_row']
+                    
+                    # Re-header the already parsed grid instead of reading the sheet again
+                    full_df = session.frame(sheet, header_row_idx)
+                    full_df = full_df.dropna(how='all')
+                    
+                    # Additional filter: must have at least 5 data rows
+                    if len(full_df) >= 5:
+                        dfs[sheet] = full_df
+                        header_rows[sheet] = header_row_idx
+                        if diagnostics['best_sheet'] is None:
+                            diagnostics['best_sheet'] = sheet
                     
         except Exception as e:
             diagnostics['error'] = str(e)
             print(f"Error loading {filepath}: {e}")
         
-        self.file_diagnostics[filepath] = diagnostics
+        self._finish_load(filepath, session, dfs, header_rows, diagnostics)
         return dfs
 
-    def load_all_sheets_for_reconciliation(self, filepath: str) -> Dict[str, pd.DataFrame]:
+    def _finish_load(
+        self,
+        filepath: str,
+        session: WorkbookSession,
+        dfs: Dict[str, pd.DataFrame],
+        header_rows: Dict[str, int],
+        diagnostics: Dict[str, Any]
+    ) -> None:
+        self.file_diagnostics[filepath] = diagnostics
+        # Failed loads are not cached so a transient error is retried next run
+        if self.sheet_cache is not None and 'error' not in diagnostics:
+            try:
+                self.sheet_cache.put_sheets(session.content_hash, dfs, header_rows, diagnostics)
+            except Exception as e:
+                print(f"Warning: Could not cache sheets for {filepath}: {e}")
+
+    def load_all_sheets_for_reconciliation(self, filepath: str, session: Optional[WorkbookSession] = None) -> Dict[str, pd.DataFrame]:
         """
         Load broad/raw sheet data for reconciliation scans.
         Unlike load_clean_sheet(), this does not filter for transaction-only sheets.
         """
-        sheets = {}
-        ext = os.path.splitext(filepath)[1].lower()
+        if session is None:
+            with self.open_workbook(filepath) as own_session:
+                return self.load_all_sheets_for_reconciliation(filepath, session=own_session)
 
         try:
-            if ext == ".csv":
-                sheets["csv_raw"] = pd.read_csv(filepath, header=None)
-                return sheets
-
-            with self._open_excel_file(filepath) as xls:
-                for sheet in xls.sheet_names:
-                    try:
-                        sheets[sheet] = pd.read_excel(xls, sheet_name=sheet, header=None)
-                    except Exception:
-                        continue
+            if session.is_csv:
+                return {"csv_raw": session.grid(CSV_SHEET)}
+            return session.all_grids()
         except Exception:
             return {}
 
-        return sheets
+    def raw_rows(self, transactions: pd.DataFrame) -> List[Optional[Dict[str, Any]]]:
+        """
+        Raw source values of exported transactions (baseline_transactions.csv rows),
+        resolved through their lineage: source_file is looked up under data_dir and
+        source_row indexes sheet source_sheet as load_clean_sheet() returns it,
+        served from the parsed-sheet cache when the file is unchanged. Each file is
+        loaded once. None where the file, sheet or row is gone.
+        """
+        paths = {os.path.basename(p): p for p in self.scan_files()}
+        loaded: Dict[str, Dict[str, pd.DataFrame]] = {}
+        out: List[Optional[Dict[str, Any]]] = []
+        for source_file, sheet, row in zip(
+            transactions["source_file"], transactions["source_sheet"], transactions["source_row"]
+        ):
+            path = paths.get(source_file)
+            if path is None or pd.isna(row):
+                out.append(None)
+                continue
+            if path not in loaded:
+                loaded[path] = self.load_clean_sheet(path)
+            df = loaded[path].get(sheet)
+            row = int(row)
+            out.append(df.iloc[row].to_dict() if df is not None and 0 <= row < len(df) else None)
+        return out
 
     def _score_sheet_for_transactions(self, df_preview: pd.DataFrame) -> int:
         """
@@ -313,7 +370,22 @@ class IntakeAgent:
 
     def _cache_classification(self, signature: str, result: Dict[str, Any]) -> None:
         self._classify_cache[signature] = result
-        save_json(self._classify_path, self._classify_cache)
+        if self._persist_classifications:
+            merge_json(self._classify_path, {signature: result})
+        else:
+            self._new_classifications[signature] = result
+
+    def take_new_classifications(self) -> Dict[str, Dict[str, Any]]:
+        """Return and clear classifications made since the last call (worker side)."""
+        new, self._new_classifications = self._new_classifications, {}
+        return new
+
+    def merge_classifications(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Adopt classifications made by a worker process and persist them once."""
+        if not entries:
+            return
+        self._classify_cache.update(entries)
+        merge_json(self._classify_path, entries)
     
     def get_file_compatibility_report(self) -> str:
         """Generate a report of file compatibility based on diagnostics."""
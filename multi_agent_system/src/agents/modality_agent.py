@@ -1,7 +1,11 @@
 
 import re
-from typing import List, Dict
-from core.canonical_schema import CanonicalRecord
+import json
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+from core.canonical_schema import CanonicalBatch, CanonicalRecord
+from core.memory_store import ensure_memory_dir, load_json, merge_json
 
 class ModalityRefinementAgent:
     """
@@ -11,8 +15,15 @@ class ModalityRefinementAgent:
     Uses Hybrid Approach:
     1. Fast Regex Rules (covers 95% of cases)
     2. AI Fallback (handles novel/ambiguous terms)
+
+    Each distinct raw string is classified once per batch; strings no rule
+    matches are sent to the AI together and the answers are kept in
+    agent_memory/modality_labels.json.
     """
 
+    MODALITIES = ("OPI", "VRI", "OnSite", "Translation")
+    AI_CHUNK_SIZE = 200
+
     def __init__(self, config_path: str = None):
         if config_path is None:
              config_path = "config/agent_config.json"
@@ -42,6 +53,7 @@ class ModalityRefinementAgent:
             ("Translation", [r"translation", r"document", r"written", r"localization", r"proofread"]),
             ("OPI", [r"opi", r"phone", r"audio", r"telephonic", r"voice", r"interpretation services"])
         ]
+        self._rule_regex = self._compile_rules(self.rules)
         
         # AI Setup
         try:
@@ -50,67 +62,116 @@ class ModalityRefinementAgent:
         except ImportError:
             self.ai = None
             
-        # Cache for AI decisions to avoid repeated API calls for same string
-        self.ai_cache = {}  
+        # AI decisions by lowercased service string, kept across runs
+        self._labels_path = ensure_memory_dir() / "modality_labels.json"
+        self.ai_cache = load_json(self._labels_path, {})
+
+    @staticmethod
+    def _compile_rules(rules) -> "re.Pattern":
+        """
+        One regex for all rules. Each alternative is a lookahead over the whole
+        string, tried in rule order, so the first rule with any keyword wins
+        (rule priority, not match position) and `lastgroup` names it.
+        """
+        alternatives = [
+            f"(?=.*?(?:{'|'.join(patterns)}))(?P<{name}>)"
+            for name, patterns in rules
+        ]
+        return re.compile("(?s)" + "|".join(alternatives))
 
     def refine_records(self, records: List[CanonicalRecord]) -> Dict[str, int]:
         """
         Updates the modality field of CanonicalRecords in-place.
         Returns a summary of distribution.
         """
+        batch = CanonicalBatch.from_records(records)
+        stats = self.refine_batch(batch)
+        for rec, modality in zip(records, batch.frame["modality"].to_numpy()):
+            rec.modality = modality
+        return stats
+
+    def refine_batch(self, batch: CanonicalBatch) -> Dict[str, int]:
+        """
+        Updates the modality column of a batch in place, classifying each distinct
+        raw service string once. Returns a summary of distribution.
+        """
         stats = {"OPI": 0, "VRI": 0, "OnSite": 0, "Translation": 0, "Unknown": 0}
+        modality = batch.frame["modality"]
+        if len(modality) == 0:
+            return stats
 
-        for rec in records:
-            raw_val = str(rec.modality).strip()
-            raw_lower = raw_val.lower()
-            
-            # 1. Try Fast Regex First
-            found = False
-            for canonical_name, patterns in self.rules:
-                if any(re.search(p, raw_lower) for p in patterns):
-                    rec.modality = canonical_name
-                    stats[canonical_name] += 1
-                    found = True
-                    break
-            
-            if found:
-                continue
-
-            # 2. Try AI Fallback
-            if self.ai and self.ai.enabled:
-                # Check Cache
-                if raw_lower in self.ai_cache:
-                    classification = self.ai_cache[raw_lower]
-                else:
-                    # Ask AI
-                    classification = self._ask_ai_to_classify(raw_val)
-                    self.ai_cache[raw_lower] = classification
-                
-                # Apply if valid
-                if classification in ["OPI", "VRI", "OnSite", "Translation"]:
-                    rec.modality = classification
-                    stats[classification] += 1
-                    found = True
-            
-            # 3. Last Resort
-            if not found:
-                rec.modality = "UNKNOWN"
-                stats["Unknown"] += 1
+        codes = modality.cat.codes.to_numpy()
+        categories = modality.cat.categories
+        present, first_seen = np.unique(codes, return_index=True)
+        order = present[np.argsort(first_seen)]
+        raw = {code: str(categories[code]).strip() for code in order}
+
+        # 1. Regex rules, then labels from earlier runs
+        resolved: Dict[int, str] = {}
+        unresolved: Dict[str, str] = {}
+        for code in order:
+            label = self._match_rules(raw[code])
+            if label is None:
+                label = self.ai_cache.get(raw[code].lower())
+            if label is None:
+                unresolved.setdefault(raw[code].lower(), raw[code])
+            else:
+                resolved[code] = label
+
+        # 2. Everything still unknown goes to the AI in one batched request
+        if unresolved and self.ai and self.ai.enabled:
+            self._ask_ai_to_classify(list(unresolved.values()))
 
+        for code in order:
+            if code not in resolved:
+                resolved[code] = self.ai_cache.get(raw[code].lower(), "UNKNOWN")
+            if resolved[code] not in self.MODALITIES:
+                resolved[code] = "UNKNOWN"
+
+        counts = np.bincount(codes, minlength=len(categories))
+        for code in present:
+            key = "Unknown" if resolved[code] == "UNKNOWN" else resolved[code]
+            stats[key] += int(counts[code])
+
+        # 3. Broadcast: one label per category, mapped onto the codes
+        labels = sorted({resolved[code] for code in present})
+        remap = np.full(len(categories), -1, dtype="int64")
+        for code in present:
+            remap[code] = labels.index(resolved[code])
+        batch.frame["modality"] = pd.Categorical.from_codes(remap[codes], categories=labels)
         return stats
 
-    def _ask_ai_to_classify(self, service_string: str) -> str:
-        """Uses LLM to classify an ambiguous service string."""
-        sys_prompt = "You are a classifier for Language Services. Categories: OPI, VRI, OnSite, Translation. Return ONLY the category name."
-        user_prompt = f"Classify this service description: '{service_string}'"
-        
-        try:
-            # We expect a single word response
-            resp = self.ai.complete_text(sys_prompt, user_prompt)
-            if resp:
-                clean_resp = resp.strip().replace('"', '').replace('.', '')
-                if clean_resp in ["OPI", "VRI", "OnSite", "Translation"]:
-                    return clean_resp
-        except:
-            pass
-        return "Unknown"
+    def _match_rules(self, raw_val: str) -> Optional[str]:
+        """Canonical modality from the keyword rules, None if no rule applies."""
+        match = self._rule_regex.match(raw_val.lower())
+        return match.lastgroup if match else None
+
+    def _ask_ai_to_classify(self, service_strings: List[str]) -> None:
+        """
+        Classifies ambiguous service strings with the LLM, AI_CHUNK_SIZE per prompt
+        (chunks are sent concurrently), and remembers the answers.
+        """
+        sys_prompt = (
+            "You are a classifier for Language Services. Categories: OPI, VRI, OnSite, Translation. "
+            "Classify every service description in the list. "
+            "Return JSON: {\"labels\": {\"<description>\": \"OPI|VRI|OnSite|Translation|Unknown\"}}"
+        )
+        chunks = [
+            service_strings[i:i + self.AI_CHUNK_SIZE]
+            for i in range(0, len(service_strings), self.AI_CHUNK_SIZE)
+        ]
+        prompts = [
+            (sys_prompt, f"Classify these service descriptions: {json.dumps(chunk, ensure_ascii=False)}")
+            for chunk in chunks
+        ]
+        learned = {}
+        for chunk, resp in zip(chunks, self.ai.complete_json_many(prompts)):
+            answers = resp.get("labels") if isinstance(resp, dict) else None
+            if not isinstance(answers, dict):
+                continue  # failed request: leave these to the next run
+            for value in chunk:
+                label = str(answers.get(value, "")).strip().replace('"', '').replace('.', '')
+                learned[value.lower()] = label if label in self.MODALITIES else "UNKNOWN"
+        if learned:
+            self.ai_cache.update(learned)
+            merge_json(self._labels_path, learned)
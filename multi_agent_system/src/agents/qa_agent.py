@@ -3,14 +3,67 @@ import pandas as pd
 import numpy as np
 import datetime
 from typing import List, Dict, Tuple, Any, Optional
-from core.canonical_schema import CanonicalRecord
+from core.canonical_schema import CanonicalBatch, CanonicalRecord, row_identity
+
+
+class RunningMoments:
+    """
+    Online count / mean / variance of per-minute rates (Welford, merged chunk-wise
+    with Chan's update), so rate z-scores can be computed without holding every
+    record. A single chunk gives exactly the pandas mean() / std() of that chunk.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.sum() / n
+        m2 = ((mean - values) ** 2).sum()
+        if self.count == 0:
+            self.count, self.mean, self.m2 = n, mean, m2
+            return
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), NaN for a single value."""
+        if self.count == 0:
+            return 0.0
+        if self.count == 1:
+            return float("nan")
+        return float(np.sqrt(self.m2 / (self.count - 1)))
 
 class QAgent:
     """
     Scans CanonicalRecords for anomalies, duplicates, and data quality issues.
     Delivers the "v4 QA" layer of the baseline.
+
+    Checks run column-wise over a CanonicalBatch. Each flagged row gets a
+    qa_flags bitmask of the issue bits below; the readable qa_issues messages
+    are only built for rows that have an issue.
     """
 
+    # Issue bits, in the order their messages are listed
+    ZERO_DURATION = 1
+    EXCESSIVE_DURATION = 2
+    RATE_OUTLIER = 4
+    RATE_LOW = 8
+    RATE_HIGH = 16
+    MISSING_LANGUAGE = 32
+    MISSING_DATE = 64
+    MISSING_COST = 128
+    QUARANTINE_FLAGS = MISSING_LANGUAGE | MISSING_DATE | MISSING_COST
+
     def __init__(self, config_path: str = None):
         if config_path is None:
              # Default to standardized location
@@ -44,8 +97,57 @@ class QAgent:
         Runs full QA suite on a list of records.
         Returns (Processed Records, QA Summary Stats)
         """
-        if not records:
-            return [], {
+        records = list(records)
+        batch = CanonicalBatch.from_records(records)
+        keep, qa_stats = self._run_checks(batch)
+        if keep is None:
+            return [], qa_stats
+
+        # Annotate the caller's records in place and return them, as before
+        flagged = batch.frame[batch.frame['qa_issues'].notna()]
+        for i, issues, status, conf in zip(flagged.index, flagged['qa_issues'], flagged['qa_status'].astype(object), flagged['confidence_score']):
+            rec = records[i]
+            rec.confidence_score = conf
+            if rec.raw_columns is None: rec.raw_columns = {}
+            rec.raw_columns["_qa_issues"] = issues
+            rec.raw_columns["_qa_status"] = status
+        return [rec for rec, kept in zip(records, keep) if kept], qa_stats
+
+    def process_batch(self, batch: CanonicalBatch, rate_stats: Optional[RunningMoments] = None,
+                      seen_keys: Optional[set] = None) -> Tuple[CanonicalBatch, Dict[str, Any]]:
+        """
+        Runs full QA suite on a CanonicalBatch. Issues are recorded on the batch
+        (qa_flags / qa_issues / qa_status / confidence_score); duplicates and
+        quarantined rows are dropped from the returned batch.
+
+        Streaming mode checks one chunk at a time: rate_stats supplies the rate
+        mean/std of the whole run (see rate_moments()) and seen_keys carries the
+        64-bit duplicate-key hashes of earlier chunks.
+        Returns (Clean Batch, QA Summary Stats)
+        """
+        keep, qa_stats = self._run_checks(batch, rate_stats, seen_keys)
+        if keep is None:
+            return batch, qa_stats
+        return batch.take(keep), qa_stats
+
+    def rate_moments(self, batch: CanonicalBatch, rate_stats: RunningMoments) -> None:
+        """Fold the z-score population of a batch (rows with cost and minutes) into rate_stats."""
+        rate_stats.add(self._valid_rates(batch.frame))
+
+    @staticmethod
+    def _valid_rates(frame: pd.DataFrame) -> np.ndarray:
+        minutes = frame['minutes_billed'].to_numpy()
+        charge = frame['total_charge'].to_numpy()
+        return frame['rate_per_minute'].to_numpy()[(minutes > 0) & (charge > 0)]
+
+    def _run_checks(self, batch: CanonicalBatch, rate_stats: Optional[RunningMoments] = None,
+                    seen_keys: Optional[set] = None) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Apply every QA check to a batch, recording issues on it in place.
+        Returns (mask of rows to keep, QA Summary Stats); the mask is None for an empty batch.
+        """
+        if len(batch) == 0:
+            return None, {
                 "status": "Empty input",
                 "total_records_input": 0,
                 "duplicates_removed": 0,
@@ -55,27 +157,23 @@ class QAgent:
                 "issue_counts": {}
             }
 
-        # 1. Convert to temporary DataFrame for statistical analysis
-        df_records = []
-        for r in records:
-            d = vars(r).copy()
-            # Handle date for DF
-            if isinstance(d['date'], (datetime.date, datetime.datetime)):
-                d['date_str'] = str(d['date'])
-            df_records.append(d)
-            
-        df = pd.DataFrame(df_records)
-        
-        # 2. Statistical Analysis (Z-Scores for Rates)
+        frame = batch.frame
+        minutes = frame['minutes_billed'].to_numpy()
+        charge = frame['total_charge'].to_numpy()
+        rate = frame['rate_per_minute'].to_numpy()
+
+        # 1. Statistical Analysis (Z-Scores for Rates)
         # Only calculate for records that have both cost and minutes
-        valid_mask = (df['minutes_billed'] > 0) & (df['total_charge'] > 0)
-        valid_rates = df[valid_mask]['rate_per_minute']
-        
-        mean_rate = valid_rates.mean() if not valid_rates.empty else 0
-        std_rate = valid_rates.std() if not valid_rates.empty else 0
+        if rate_stats is not None:
+            mean_rate, std_rate = rate_stats.mean, rate_stats.std
+        else:
+            valid_rates = pd.Series(self._valid_rates(frame))
+
+            mean_rate = valid_rates.mean() if not valid_rates.empty else 0
+            std_rate = valid_rates.std() if not valid_rates.empty else 0
 
         qa_stats = {
-            "total_records_input": len(records),
+            "total_records_input": len(batch),
             "duplicates_removed": 0,
             "outliers_flagged": 0,
             "critical_errors_quarantined": 0,
@@ -84,115 +182,133 @@ class QAgent:
             "issue_counts": {}
         }
 
-        clean_records = []
-        
-        # Track seen records for duplicate detection
-        seen_keys = set()
-
-        for rec in records:
-            issues = []
-            status = "CLEAN"
-
-            # --- CHECK 1: Duplicates ---
-            # Unique signature includes source metadata to avoid false-positive collapses
-            # when distinct sessions happen to share the same business values.
-            dup_key = self._build_duplicate_key(rec)
-            if dup_key in seen_keys:
-                qa_stats["duplicates_removed"] += 1
-                continue # Skip duplicates
-            seen_keys.add(dup_key)
-
-            # --- CHECK 2: Sanity Thresholds ---
-            if rec.minutes_billed <= 0:
-                issues.append("Zero/Negative Duration")
-                status = "FLAGGED"
-            
-            if rec.minutes_billed > self.max_duration:
-                issues.append(f"Excessive Duration (> {self.max_duration} min)")
-                status = "FLAGGED"
-
-            # --- CHECK 3: Rate Outliers ---
-            if rec.minutes_billed > 0 and rec.total_charge > 0:
-                # Statistical check
-                if std_rate > 0:
-                    z_score = abs(rec.rate_per_minute - mean_rate) / std_rate
-                    if z_score > self.rate_threshold:
-                        issues.append(f"Statistical Rate Outlier (Z={z_score:.1f})")
-                        status = "FLAGGED"
-                
-                # Logical threshold check
-                if rec.rate_per_minute < self.min_rate:
-                    issues.append(f"Rate suspiciously low (${rec.rate_per_minute:.2f}/min)")
-                    status = "FLAGGED"
-                elif rec.rate_per_minute > self.max_rate and "onsite" not in rec.modality.lower():
-                    issues.append(f"Rate suspiciously high (${rec.rate_per_minute:.2f}/min)")
-                    status = "FLAGGED"
-
-            # --- CHECK 4: Missing Critical Data ---
-            if not rec.language or rec.language.lower() == "unknown":
-                issues.append("Missing Language")
-                status = "QUARANTINED"
-            
-            if not rec.date:
-                issues.append("Missing Date")
-                status = "QUARANTINED"
-
-            # Missing cost with non-zero utilization cannot be used in accurate baseline spend math.
-            if rec.minutes_billed > 0 and rec.total_charge <= 0:
-                issues.append("Missing Cost")
-                status = "QUARANTINED"
-
-            # Update record metadata
-            if issues:
-                # Record issues in stats
-                for iss in issues:
-                    qa_stats["issue_counts"][iss] = qa_stats["issue_counts"].get(iss, 0) + 1
-
-                rec.confidence_score *= 0.5 # Lower confidence
-                if rec.raw_columns is None: rec.raw_columns = {}
-                rec.raw_columns["_qa_issues"] = issues
-                rec.raw_columns["_qa_status"] = status
-                
-                if status == "QUARANTINED":
-                    qa_stats["critical_errors_quarantined"] += 1
-                    # Accuracy-first behavior: quarantine records are excluded from baseline math.
-                    continue
-                qa_stats["outliers_flagged"] += 1
-
-            clean_records.append(rec)
-
-        qa_stats["total_records_output"] = len(clean_records)
-        return clean_records, qa_stats
+        # --- CHECK 1: Duplicates ---
+        # Unique signature includes source metadata to avoid false-positive collapses
+        # when distinct sessions happen to share the same business values.
+        key_hashes = self._duplicate_hashes(batch)
+        # NaN is not equal to itself, so a key tuple holding NaN minutes or charge never matched
+        matchable = ~(pd.isna(minutes) | pd.isna(charge))
+        duplicate = pd.Series(key_hashes).duplicated().to_numpy() & matchable
+        if seen_keys is not None:
+            # Keys outlive the chunk; the set keeps their 64-bit hashes
+            duplicate |= np.fromiter((h in seen_keys for h in key_hashes.tolist()), dtype=bool, count=len(batch)) & matchable
+            seen_keys.update(key_hashes[~duplicate & matchable].tolist())
+        checked = ~duplicate
+        qa_stats["duplicates_removed"] = int(duplicate.sum())
+
+        flags = np.zeros(len(batch), dtype=np.uint8)
+
+        def flag(bit: int, mask: np.ndarray) -> None:
+            flags[mask & checked] |= bit
+
+        # --- CHECK 2: Sanity Thresholds ---
+        flag(self.ZERO_DURATION, minutes <= 0)
+        flag(self.EXCESSIVE_DURATION, minutes > self.max_duration)
+
+        # --- CHECK 3: Rate Outliers ---
+        priced = (minutes > 0) & (charge > 0)
+        z_score = np.zeros(len(batch))
+        if std_rate > 0:
+            # Statistical check
+            z_score[priced] = np.abs(rate[priced] - mean_rate) / std_rate
+            flag(self.RATE_OUTLIER, priced & (z_score > self.rate_threshold))
+
+        # Logical threshold check
+        too_low = priced & (rate < self.min_rate)
+        onsite = self._category_lookup(frame['modality'], lambda m: "onsite" in m.lower(), missing=False)
+        flag(self.RATE_LOW, too_low)
+        flag(self.RATE_HIGH, priced & ~too_low & (rate > self.max_rate) & ~onsite)
+
+        # --- CHECK 4: Missing Critical Data ---
+        flag(self.MISSING_LANGUAGE, self._category_lookup(frame['language'], lambda v: not v or v.lower() == "unknown", missing=True))
+        flag(self.MISSING_DATE, np.isnat(frame['date'].to_numpy()))
+        # Missing cost with non-zero utilization cannot be used in accurate baseline spend math.
+        flag(self.MISSING_COST, (minutes > 0) & (charge <= 0))
+
+        # Accuracy-first behavior: quarantine records are excluded from baseline math.
+        has_issues = flags != 0
+        quarantined = (flags & self.QUARANTINE_FLAGS) != 0
+        qa_stats["outliers_flagged"] = int((has_issues & ~quarantined).sum())
+        qa_stats["critical_errors_quarantined"] = int(quarantined.sum())
+        keep = checked & ~quarantined
+
+        # Update record metadata
+        rows = np.flatnonzero(has_issues)
+        if len(rows):
+            row_issues, qa_stats["issue_counts"] = self._describe_issues(flags[rows], z_score[rows], rate[rows])
+
+            qa_issues = frame['qa_issues'].to_numpy(copy=True)
+            qa_issues[rows] = row_issues
+            status_codes = frame['qa_status'].cat.codes.to_numpy().copy()
+            status_codes[rows] = quarantined[rows]  # FLAGGED / QUARANTINED
+            confidence = frame['confidence_score'].to_numpy(copy=True)
+            confidence[rows] *= 0.5 # Lower confidence
+            qa_flags = frame['qa_flags'].to_numpy(copy=True)
+            qa_flags[rows] = flags[rows]
+
+            frame['qa_issues'] = qa_issues
+            frame['qa_status'] = pd.Categorical.from_codes(status_codes, categories=frame['qa_status'].cat.categories)
+            frame['confidence_score'] = confidence
+            frame['qa_flags'] = qa_flags
+
+        qa_stats["total_records_output"] = int(keep.sum())
+        return keep, qa_stats
+
+    def _describe_issues(self, flags: np.ndarray, z_score: np.ndarray,
+                         rate: np.ndarray) -> Tuple[List[List[str]], Dict[str, int]]:
+        """
+        Issue messages for flagged rows (each row's in check order) and the
+        per-message counts, keyed in order of first appearance. Messages that
+        quote a value are formatted once per distinct value.
+        """
+        def fixed(text: str):
+            return lambda m: np.full(m.sum(), text, dtype=object)
+
+        def quoting(template: str, values: np.ndarray):
+            def render(m):
+                codes, uniques = pd.factorize(values[m])
+                return np.array([template.format(v) for v in uniques] + [None], dtype=object)[codes]
+            return render
+
+        messages = (
+            (self.ZERO_DURATION, fixed("Zero/Negative Duration")),
+            (self.EXCESSIVE_DURATION, fixed(f"Excessive Duration (> {self.max_duration} min)")),
+            (self.RATE_OUTLIER, quoting("Statistical Rate Outlier (Z={:.1f})", z_score)),
+            (self.RATE_LOW, quoting("Rate suspiciously low (${:.2f}/min)", rate)),
+            (self.RATE_HIGH, quoting("Rate suspiciously high (${:.2f}/min)", rate)),
+            (self.MISSING_LANGUAGE, fixed("Missing Language")),
+            (self.MISSING_DATE, fixed("Missing Date")),
+            (self.MISSING_COST, fixed("Missing Cost")),
+        )
+        rows, ranks, text = [], [], []
+        for rank, (bit, render) in enumerate(messages):
+            m = (flags & bit) != 0
+            rows.append(np.flatnonzero(m))
+            ranks.append(np.full(m.sum(), rank))
+            text.append(render(m))
+        rows, ranks, text = np.concatenate(rows), np.concatenate(ranks), np.concatenate(text)
+
+        # Row by row, and within a row in check order
+        order = np.lexsort((ranks, rows))
+        rows, text = rows[order], text[order]
+        codes, uniques = pd.factorize(text)
+        issue_counts = dict(zip(uniques.tolist(), np.bincount(codes).tolist()))
+
+        starts = np.flatnonzero(rows[1:] != rows[:-1]) + 1
+        return [part.tolist() for part in np.split(text, starts)], issue_counts
+
+    @staticmethod
+    def _category_lookup(col: pd.Series, test, missing: bool) -> np.ndarray:
+        """test() evaluated once per category of a categorical column; missing values give `missing`."""
+        lookup = np.array([bool(test(str(c))) for c in col.cat.categories] + [missing], dtype=bool)
+        return lookup[col.cat.codes.to_numpy()]
 
     def _extract_row_identity(self, rec: CanonicalRecord) -> Optional[str]:
         """
         Return a source-row identifier when available (e.g., call/session/invoice id).
         This lowers duplicate false positives for repeated same-day transactions.
         """
-        raw = rec.raw_columns if isinstance(rec.raw_columns, dict) else {}
-        if not raw:
-            return None
-
-        id_hints = (
-            "call_id",
-            "session_id",
-            "encounter_id",
-            "interaction_id",
-            "invoice_line_id",
-            "line_id",
-            "record_id",
-            "id",
-        )
-
-        normalized = {str(k).strip().lower(): v for k, v in raw.items()}
-        for hint in id_hints:
-            if hint in normalized:
-                val = normalized[hint]
-                if val is not None:
-                    sval = str(val).strip()
-                    if sval and sval.lower() != "nan":
-                        return sval
-        return None
+        return row_identity(rec.raw_columns if isinstance(rec.raw_columns, dict) else None)
 
     def _build_duplicate_key(self, rec: CanonicalRecord) -> Tuple[Any, ...]:
         """
@@ -210,3 +326,45 @@ class QAgent:
             str(rec.timestamp_end) if rec.timestamp_end else "",
             self._extract_row_identity(rec),
         )
+
+    def duplicate_keys(self, batch: CanonicalBatch) -> np.ndarray:
+        """The 64-bit duplicate-key hashes of a batch's rows, as streaming QA keeps them."""
+        return self._duplicate_hashes(batch)
+
+    def _duplicate_hashes(self, batch: CanonicalBatch) -> np.ndarray:
+        """
+        64-bit hash of _build_duplicate_key() for every row of a batch, built
+        column-wise. Text is normalized once per category and numbers rounded
+        once per distinct value, so equal keys hash alike in any batch.
+        """
+        frame = batch.frame
+
+        def normalized(col: str) -> pd.Categorical:
+            cats = frame[col].cat.categories
+            names = [str(c).strip().lower() for c in cats] + [str(np.nan)]
+            codes, uniques = pd.factorize(np.array(names, dtype=object))
+            return pd.Categorical.from_codes(codes[frame[col].cat.codes.to_numpy()], uniques)
+
+        def rounded(col: str) -> np.ndarray:
+            # NaN gets a code of its own instead of the -1 sentinel, which would index the last value
+            codes, uniques = pd.factorize(frame[col].to_numpy(), use_na_sentinel=False)
+            # + 0.0 folds -0.0 into 0.0, which compare equal in the key tuple
+            return np.array([round(float(v), 4) + 0.0 for v in uniques], dtype="float64")[codes]
+
+        def stamps(col: str) -> np.ndarray:
+            codes, uniques = pd.factorize(frame[col].to_numpy(), use_na_sentinel=False)
+            return np.array([str(v) if v else "" for v in uniques], dtype=object)[codes]
+
+        keys = pd.DataFrame({
+            "source_file": normalized('source_file'),
+            "vendor": normalized('vendor'),
+            "date": frame['date'].to_numpy(),
+            "language": normalized('language'),
+            "modality": normalized('modality'),
+            "minutes_billed": rounded('minutes_billed'),
+            "total_charge": rounded('total_charge'),
+            "timestamp_start": stamps('timestamp_start'),
+            "timestamp_end": stamps('timestamp_end'),
+            "row_id": frame['row_id'].to_numpy(),
+        }, copy=False)
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy()
@@ -1,7 +1,8 @@
 
+import numpy as np
 import pandas as pd
 from typing import Optional, Dict, Tuple
-from core.canonical_schema import CanonicalRecord
+from core.canonical_schema import CanonicalBatch, CanonicalRecord
 
 class RateCardAgent:
     """
@@ -91,32 +92,44 @@ class RateCardAgent:
         Process records and identify those with missing costs.
         NO IMPUTATION with fake numbers - only flagging.
         """
+        batch, stats = self.validate_batch(CanonicalBatch.from_records(records))
+        # Flags go back onto the caller's records, as validate_cost() does
+        for record, status in zip(records, batch.frame['cost_status']):
+            if record.raw_columns is None:
+                record.raw_columns = {}
+            record.raw_columns['_cost_status'] = status
+            if status == 'MISSING':
+                record.raw_columns['_cost_note'] = CanonicalBatch.COST_NOTE
+                record.confidence_score = 0.5  # Lower confidence
+        return list(records), stats
+
+    def validate_batch(self, batch: CanonicalBatch) -> Tuple[CanonicalBatch, Dict]:
+        """
+        Columnar validate_cost() over a whole batch (updated in place).
+        Returns the batch and the same stats as batch_impute().
+        """
+        frame = batch.frame
+        minutes = frame['minutes_billed'].to_numpy()
+        charge = frame['total_charge'].to_numpy()
+
+        # Cost is missing - FLAG it, don't fake it
+        missing = (minutes > 0) & (charge == 0.0)
+        frame['cost_status'] = pd.Categorical.from_codes(missing.astype('int8'), categories=['FROM_FILE', 'MISSING'])
+        frame.loc[missing, 'confidence_score'] = 0.5  # Lower confidence
+
+        has_cost = charge > 0
+        no_cost = ~has_cost & (minutes > 0)
         stats = {
-            'total_records': len(records),
-            'records_with_cost': 0,
-            'records_missing_cost': 0,
+            'total_records': len(batch),
+            'records_with_cost': int(has_cost.sum()),
+            'records_missing_cost': int(no_cost.sum()),
             'imputed_count': 0,  # Always 0 now - we don't impute
             'imputed_total_cost': 0.0,  # Always 0 now
-            'missing_cost_vendors': set()
+            # Set built in record order, then listed for JSON serialization
+            'missing_cost_vendors': list(set(pd.unique(frame['vendor'].to_numpy()[no_cost].astype(object))))
         }
-        
-        updated_records = []
-        
-        for record in records:
-            updated_record = self.validate_cost(record)
-            
-            if record.total_charge > 0:
-                stats['records_with_cost'] += 1
-            elif record.minutes_billed > 0:
-                stats['records_missing_cost'] += 1
-                stats['missing_cost_vendors'].add(record.vendor)
-            
-            updated_records.append(updated_record)
-        
-        # Convert set to list for JSON serialization
-        stats['missing_cost_vendors'] = list(stats['missing_cost_vendors'])
-        
-        return updated_records, stats
+
+        return batch, stats
     
     def export_rate_card(self, filepath: str):
         """Export verified rates (if any) to CSV."""
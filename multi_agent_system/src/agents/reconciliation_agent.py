@@ -1,8 +1,24 @@
 
+import re
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Tuple
-from core.canonical_schema import CanonicalRecord
+from typing import List, Dict, Any, Optional, Tuple
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, is_timedelta64_dtype
+from core.canonical_schema import CanonicalBatch, CanonicalRecord
+
+TOTAL_KEYWORDS = ["total amount due", "grand total", "total charges", "invoice total", "amount due", "net amount"]
+TOTAL_KEYWORD_RE = re.compile("|".join(re.escape(k) for k in TOTAL_KEYWORDS))
+SUMMARY_SHEET_WORDS = ["invoice", "summary", "total", "billing"]
+# Other sheets are transaction listings: only their last rows can hold a totals block
+TAIL_ROWS = 100
+# Cells after a keyword cell (row-major, wrapping into the next row) that may hold its amount
+AMOUNT_LOOKAHEAD = 9
+MIN_TOTAL_AMOUNT = 5.0  # Ignore tiny amounts that aren't totals
+# "Invoice #: 10423", "Invoice No. 10423", "Invoice Number" (value in a following cell)
+INVOICE_NUMBER_RE = re.compile(r"invoice\s*(?:#|no\b|number\b|num\b)[\s.:#]*(.*)", re.IGNORECASE)
+# Billing month in a file name ("VendorA - 2024-01.xlsx"), for invoices without dated records
+NAME_MONTH_RE = re.compile(r"(20\d{2})[-_ ]?(0[1-9]|1[0-2])(?!\d)")
+INVOICE_KEYS = ["Vendor", "Month", "Invoice"]
 
 class ReconciliationAgent:
     """
@@ -12,55 +28,251 @@ class ReconciliationAgent:
 
     def __init__(self):
         self.billed_totals = {} # vendor -> total
+        self.invoice_totals = {}  # source file -> {"vendor", "invoice", "billed"}
+        self.period_totals = None  # charges per (vendor, source file, month), see accumulate_batch
 
     def extract_totals_from_sheets(self, sheets: Dict[str, pd.DataFrame], vendor: str):
         """
         Scans all sheets for a spreadsheet to find the 'Ground Truth' billed total.
         Look for sheets named 'Invoice', 'Summary', 'Total'.
         """
-        keywords = ["total amount due", "grand total", "total charges", "invoice total", "amount due", "net amount"]
-        
+        self.apply_total_candidates(self.find_total_candidates(sheets), vendor)
+
+    def find_total_candidates(self, sheets: Dict[str, pd.DataFrame]) -> List[Tuple[bool, List[float]]]:
+        """
+        Collect every total-keyword hit in a file, independent of vendor state.
+
+        Returns one (is_summary_sheet, amounts) pair per keyword cell, where amounts are
+        the parseable values > 5.0 in the following cells, in scan order. The result is
+        plain data so it can be cached per file and replayed with apply_total_candidates().
+
+        Summary sheets are searched whole; other sheets only in their last TAIL_ROWS
+        rows. Keywords are only looked for in columns that can hold text.
+        """
+        candidates = []
+
         for sheet_name, df in sheets.items():
             # Priority to sheets named 'Invoice' or 'Summary'
-            is_summary_sheet = any(s in sheet_name.lower() for s in ["invoice", "summary", "total", "billing"])
-            
-            # Flatten and search
-            data_list = df.astype(str).values.flatten().tolist()
-            
-            for i, val in enumerate(data_list):
-                if pd.isna(val):
-                    continue
-                cleaned_val = str(val).lower().strip()
-                if any(k in cleaned_val for k in keywords):
-                    # Look in subsequent cells for a float
-                    for offset in range(1, 10):
-                        if i + offset >= len(data_list): break
-                        try:
-                            pot_str = data_list[i + offset].replace('$', '').replace(',', '').strip()
-                            if pot_str and pot_str != 'nan':
-                                amount = float(pot_str)
-                                if amount > 5.0: # Ignore tiny amounts that aren't totals
-                                    # If we find multiple, we usually want the largest one on an invoice sheet
-                                    current_best = self.billed_totals.get(vendor, 0.0)
-                                    if amount > current_best or is_summary_sheet:
-                                        self.billed_totals[vendor] = amount
-                                        break 
-                        except ValueError:
-                            continue
+            is_summary_sheet = any(s in sheet_name.lower() for s in SUMMARY_SHEET_WORDS)
+
+            for cell in self._keyword_cells(df, whole_sheet=is_summary_sheet):
+                amounts = self._amounts_after(df, cell)
+                if amounts:
+                    candidates.append((is_summary_sheet, amounts))
+        return candidates
+
+    def find_invoice_number(self, sheets: Dict[str, pd.DataFrame]) -> Optional[str]:
+        """The first invoice number labelled on a summary sheet, if any."""
+        for sheet_name, df in sheets.items():
+            if not any(s in sheet_name.lower() for s in SUMMARY_SHEET_WORDS):
+                continue
+            n_cols = df.shape[1]
+            for cell in self._keyword_cells(df, whole_sheet=True, pattern=INVOICE_NUMBER_RE):
+                label = str(df.iat[cell // n_cols, cell % n_cols])
+                number = _invoice_value(INVOICE_NUMBER_RE.search(label).group(1))
+                # Otherwise the value is in one of the next cells
+                for pos in range(cell + 1, min(cell + 4, df.size)):
+                    if number is not None:
+                        break
+                    number = _invoice_value(df.iat[pos // n_cols, pos % n_cols])
+                if number is not None:
+                    return number
+        return None
+
+    def find_file_totals(self, sheets: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+        """
+        Total candidates and invoice number of one file, as plain data for the
+        per-file totals cache. Replay with apply_file_totals().
+        """
+        return {"candidates": self.find_total_candidates(sheets), "invoice": self.find_invoice_number(sheets)}
+
+    @staticmethod
+    def _keyword_cells(df: pd.DataFrame, whole_sheet: bool, pattern: re.Pattern = TOTAL_KEYWORD_RE) -> np.ndarray:
+        """Row-major positions (row * n_cols + col) of cells matching `pattern` (a total keyword), in order."""
+        n_rows, n_cols = df.shape
+        first_row = 0 if whole_sheet else max(0, n_rows - TAIL_ROWS)
+        text_cols = np.array([
+            j for j, dtype in enumerate(df.dtypes)
+            if not (is_numeric_dtype(dtype) or is_datetime64_any_dtype(dtype) or is_timedelta64_dtype(dtype))
+        ], dtype=np.int64)
+        if n_rows == 0 or len(text_cols) == 0:
+            return np.array([], dtype=np.int64)
+
+        # One regex pass over the distinct values of the region (NaN never matches)
+        values = df.iloc[first_row:, text_cols].to_numpy(dtype=object).ravel()
+        codes, uniques = pd.factorize(values)
+        text = pd.Series(uniques, dtype=object).astype(str).str.lower()
+        matched = np.flatnonzero(text.map(pattern.search).notna().to_numpy(dtype=bool))
+        hits = np.flatnonzero(np.isin(codes, matched))
+
+        rows, cols = np.divmod(hits, len(text_cols))
+        return (rows + first_row) * n_cols + text_cols[cols]
+
+    @staticmethod
+    def _amounts_after(df: pd.DataFrame, cell: int) -> List[float]:
+        """Amounts > MIN_TOTAL_AMOUNT in the AMOUNT_LOOKAHEAD cells after `cell`, in order."""
+        n_rows, n_cols = df.shape
+        positions = np.arange(cell + 1, min(cell + 1 + AMOUNT_LOOKAHEAD, n_rows * n_cols))
+        amounts = []
+        for row, col in zip(*np.divmod(positions, n_cols)):
+            amount = _parse_amount(df.iat[row, col])
+            if amount is not None and amount > MIN_TOTAL_AMOUNT:
+                amounts.append(amount)
+        return amounts
+
+    def apply_total_candidates(self, candidates: List[Tuple[bool, List[float]]], vendor: str):
+        """Fold one file's total candidates into the billed total for a vendor."""
+        best = self._select_total(candidates, self.billed_totals.get(vendor, 0.0))
+        if best is not None:
+            self.billed_totals[vendor] = best
+
+    def apply_file_totals(self, totals: Dict[str, Any], vendor: str, source_file: str):
+        """
+        Record one file's billed total in the per-file totals index (keyed by
+        the source_file its records carry) and fold it into the vendor total.
+        """
+        self.apply_total_candidates(totals["candidates"], vendor)
+        billed = self._select_total(totals["candidates"], 0.0)
+        if billed is not None:
+            self.invoice_totals[source_file] = {"vendor": vendor, "invoice": totals.get("invoice"), "billed": billed}
+
+    @staticmethod
+    def _select_total(candidates: List[Tuple[bool, List[float]]], current: float) -> Optional[float]:
+        """The amount the candidates settle on, starting from `current`; None if none is taken."""
+        chosen = None
+        for is_summary_sheet, amounts in candidates:
+            for amount in amounts:
+                # If we find multiple, we usually want the largest one on an invoice sheet
+                if amount > current or is_summary_sheet:
+                    current = chosen = amount
+                    break
+        return chosen
 
     def run_reconciliation(self, records: List[CanonicalRecord]) -> Dict[str, Any]:
         """
         Strategic comparison of standardized results vs billed reality.
         """
-        # Group by vendor
+        return self.run_reconciliation_batch(CanonicalBatch.from_records(records))
+
+    def run_reconciliation_batch(self, batch: CanonicalBatch) -> Dict[str, Any]:
+        """
+        run_reconciliation() over a CanonicalBatch. Per-vendor sums are accumulated
+        in record order (bincount), matching the sequential per-record totals.
+        """
         vendor_data = {}
-        for r in records:
-            if r.vendor not in vendor_data:
-                vendor_data[r.vendor] = {"calc_total": 0.0, "calc_minutes": 0.0, "record_count": 0}
-            vendor_data[r.vendor]["calc_total"] += r.total_charge
-            vendor_data[r.vendor]["calc_minutes"] += r.minutes_billed
-            vendor_data[r.vendor]["record_count"] += 1
+        self.period_totals = None
+        self.accumulate_batch(batch, vendor_data)
+        return self.reconcile_totals(vendor_data)
 
+    def accumulate_batch(self, batch: CanonicalBatch, vendor_data: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Fold a batch into running per-vendor totals (vendors in order of first
+        appearance). Each running total is carried into the bincount ahead of the
+        batch's rows, so folding batch after batch sums in record order exactly
+        like one call over their concatenation.
+
+        Charges per (vendor, source file, month) are folded into period_totals
+        for the invoice-level comparison.
+        """
+        if len(batch):
+            partial = self.group_periods(batch)
+            if self.period_totals is not None:
+                partial = pd.concat([self.period_totals, partial], ignore_index=True)
+                partial = partial.groupby(["Vendor", "File", "Month"], sort=False).sum().reset_index()
+            self.period_totals = partial
+
+        # Group by vendor, in order of first appearance
+        vendor_col = batch.frame["vendor"]
+        categories = vendor_col.cat.categories
+        codes = vendor_col.cat.codes.to_numpy()
+        n_vendors = len(categories)
+        present, first_seen = np.unique(codes, return_index=True)
+        for code in present[np.argsort(first_seen)]:
+            vendor_data.setdefault(categories[code], {"calc_total": 0.0, "calc_minutes": 0.0, "record_count": 0})
+
+        running = [vendor_data.get(v, {"calc_total": 0.0, "calc_minutes": 0.0}) for v in categories]
+        carry = np.arange(n_vendors)
+        all_codes = np.concatenate([carry, codes])
+        calc_total = np.bincount(all_codes, weights=np.concatenate([
+            [r["calc_total"] for r in running], batch.frame["total_charge"].to_numpy()
+        ]), minlength=n_vendors)
+        calc_minutes = np.bincount(all_codes, weights=np.concatenate([
+            [r["calc_minutes"] for r in running], batch.frame["minutes_billed"].to_numpy()
+        ]), minlength=n_vendors)
+        record_count = np.bincount(codes, minlength=n_vendors)
+
+        for code in present:
+            stats = vendor_data[categories[code]]
+            stats["calc_total"] = float(calc_total[code])
+            stats["calc_minutes"] = float(calc_minutes[code])
+            stats["record_count"] += int(record_count[code])
+
+    @staticmethod
+    def group_periods(batch: CanonicalBatch) -> pd.DataFrame:
+        """Charge / Minutes / Records summed per Vendor, File (source_file) and Month."""
+        # Plain string keys, as in AggregatorAgent.group_totals
+        df = pd.DataFrame({
+            "Vendor": batch.frame["vendor"].to_numpy(),
+            "File": batch.frame["source_file"].to_numpy(),
+            "Month": batch.months().astype(object),
+            "Charge": batch.frame["total_charge"].to_numpy(),
+            "Minutes": batch.frame["minutes_billed"].to_numpy(),
+            "Records": np.ones(len(batch), dtype="int64"),
+        })
+        return df.groupby(["Vendor", "File", "Month"], sort=False).sum().reset_index()
+
+    def invoice_table(self) -> pd.DataFrame:
+        """
+        Calculated vs billed per (vendor, invoice month, invoice number).
+
+        A file with a billed total is one invoice: its records count towards it,
+        under the file's invoice number (if labelled) and invoice month (the
+        latest month of its records, else a YYYY-MM in its name). Records of
+        files without a total stay in their own month with no invoice number,
+        so they meet the unnumbered invoices of that vendor and month. The two
+        sides are joined on those keys; an invoice number seen in several files
+        is billed once.
+        """
+        calc = self.period_totals
+        if calc is None:
+            calc = pd.DataFrame(columns=["Vendor", "File", "Month", "Charge", "Minutes", "Records"])
+        billed = pd.DataFrame(
+            [(f, e["vendor"], e["invoice"] or "", e["billed"]) for f, e in self.invoice_totals.items()],
+            columns=["File", "Vendor", "Invoice", "Billed"]
+        )
+
+        dated = calc[calc["Month"] != "NaT"]
+        latest = dated.groupby("File")["Month"].max()
+        billed["Month"] = billed["File"].map(latest)
+        missing = billed["Month"].isna()
+        billed.loc[missing, "Month"] = billed.loc[missing, "File"].map(_name_month)
+
+        calc = calc.merge(billed[["File", "Month", "Invoice"]], on="File", how="left", suffixes=("", "_invoice"))
+        calc["Month"] = calc["Month_invoice"].fillna(calc["Month"])
+        calc["Invoice"] = calc["Invoice"].fillna("")
+        calculated = calc.groupby(INVOICE_KEYS)[["Charge", "Minutes", "Records"]].sum()
+
+        numbered = billed["Invoice"] != ""
+        billed = pd.concat([billed[numbered].drop_duplicates(["Vendor", "Invoice"]), billed[~numbered]])
+        billed_by_key = billed.groupby(INVOICE_KEYS)["Billed"].sum()
+
+        table = calculated.join(billed_by_key, how="outer")
+        table[["Charge", "Minutes", "Records", "Billed"]] = table[["Charge", "Minutes", "Records", "Billed"]].fillna(0)
+        table["Variance"] = table["Charge"] - table["Billed"]
+        has_bill = table["Billed"] > 0
+        table["VariancePct"] = np.where(has_bill, table["Variance"] / table["Billed"].where(has_bill, 1.0) * 100, 0.0)
+        table["Status"] = np.select(
+            [~has_bill, table["Records"] == 0, table["VariancePct"].abs() > 2.0],
+            ["NO_INVOICE_FOUND", "NO_RECORDS", "DISCREPANCY"],
+            default="MATCH"
+        )
+        return table.reset_index()
+
+    def reconcile_totals(self, vendor_data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compare accumulated per-vendor totals against the billed invoice totals,
+        and calculated charges against each invoice (see invoice_table()).
+        """
         results = {
             "overall_status": "MATCH",
             "vendors": {},
@@ -69,8 +281,12 @@ class ReconciliationAgent:
             "vendors_with_discrepancy": 0
         }
 
+        invoices = self.invoice_table()
+        # With a per-file index a vendor is billed the sum of its invoices
+        invoice_billed = invoices.groupby("Vendor")["Billed"].sum() if self.invoice_totals else {}
+
         for vendor, stats in vendor_data.items():
-            billed = self.billed_totals.get(vendor, 0.0)
+            billed = float(invoice_billed.get(vendor, self.billed_totals.get(vendor, 0.0)))
             calculated = stats["calc_total"]
             
             variance = calculated - billed
@@ -97,4 +313,43 @@ class ReconciliationAgent:
             }
             results["total_variance"] += abs(variance)
 
+        results["invoices"] = [
+            {
+                "vendor": row.Vendor,
+                "month": row.Month if row.Month not in ("", "NaT") else None,
+                "invoice": row.Invoice or None,
+                "calculated": round(float(row.Charge), 2),
+                "billed": round(float(row.Billed), 2),
+                "variance": round(float(row.Variance), 2),
+                "variance_pct": round(float(row.VariancePct), 2),
+                "record_count": int(row.Records),
+                "status": row.Status
+            }
+            for row in invoices.itertuples(index=False)
+        ]
+        results["invoices_with_discrepancy"] = int((invoices["Status"] == "DISCREPANCY").sum())
         return results
+
+
+def _parse_amount(value: Any) -> Optional[float]:
+    """A cell as a number ("$1,234.50" -> 1234.5), or None."""
+    pot_str = str(value).replace('$', '').replace(',', '').strip()
+    if not pot_str or pot_str == 'nan':
+        return None
+    try:
+        return float(pot_str)
+    except ValueError:
+        return None
+
+
+def _invoice_value(value: Any) -> Optional[str]:
+    """An invoice number cell as text (12345.0 -> "12345"), or None when blank."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip() if value is not None else ""
+    return text if text and text.lower() not in ("nan", "none") else None
+
+
+def _name_month(name: str) -> str:
+    match = NAME_MONTH_RE.search(str(name))
+    return f"{match.group(1)}-{match.group(2)}" if match else ""
@@ -9,12 +9,25 @@ similar professional output automatically.
 import pandas as pd
 from datetime import datetime
 import os
+import sys
 from pathlib import Path
 
+try:
+    from core.baseline_cube import BaselineCube
+except ImportError:  # run directly as a script
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from core.baseline_cube import BaselineCube
+
 class ReportGeneratorAgent:
-    """Generates a professional baseline report from pipeline output."""
+    """
+    Generates a professional baseline report from pipeline output.
+
+    Sections read their rollups from a BaselineCube: the one saved next to the
+    baseline (baseline_cube.parquet) when given, else one built from the
+    baseline on first use.
+    """
     
-    def __init__(self, baseline_csv: str = None, transactions_csv: str = None):
+    def __init__(self, baseline_csv: str = None, transactions_csv: str = None, cube_parquet: str = None):
         if baseline_csv:
             self.baseline = pd.read_csv(baseline_csv)
         else:
@@ -24,8 +37,19 @@ class ReportGeneratorAgent:
             self.transactions = pd.read_csv(transactions_csv)
         else:
             self.transactions = None
+
+        if cube_parquet:
+            self.cube = BaselineCube.read_parquet(cube_parquet)
+        else:
+            self.cube = None
             
         self.report_lines = []
+
+    def rollup(self, *dims: str) -> pd.DataFrame:
+        """Baseline totals by `dims` (see BaselineCube.rollup)."""
+        if self.cube is None:
+            self.cube = BaselineCube.from_baseline(self.baseline)
+        return self.cube.rollup(*dims)
         
     def add_line(self, text: str = ""):
         self.report_lines.append(text)
@@ -40,13 +64,15 @@ class ReportGeneratorAgent:
         """Section 1: Executive Summary"""
         self.add_section("1. EXECUTIVE SUMMARY")
         
-        total_spend = self.baseline['Cost'].sum()
-        total_mins = self.baseline['Minutes'].sum()
-        total_calls = self.baseline['Calls'].sum()
-        date_min = self.baseline['Month'].min()
-        date_max = self.baseline['Month'].max()
-        num_vendors = self.baseline['Vendor'].nunique()
-        num_languages = self.baseline['Language'].nunique()
+        total = self.rollup()
+        total_spend = total.at[0, 'Cost']
+        total_mins = total.at[0, 'Minutes']
+        total_calls = total.at[0, 'Calls']
+        months = self.rollup('Month')['Month']
+        date_min = months.min()
+        date_max = months.max()
+        num_vendors = len(self.rollup('Vendor'))
+        num_languages = len(self.rollup('Language'))
         
         self.add_line()
         self.add_line("This automated baseline report provides a comprehensive analysis of")
@@ -65,13 +91,9 @@ class ReportGeneratorAgent:
         """Section 2: Vendor Summary"""
         self.add_section("2. VENDOR SUMMARY")
         
-        vendor_summary = self.baseline.groupby('Vendor').agg({
-            'Cost': 'sum',
-            'Minutes': 'sum',
-            'Calls': 'sum'
-        }).sort_values('Cost', ascending=False)
+        vendor_summary = self.rollup('Vendor').set_index('Vendor').sort_values('Cost', ascending=False)
         
-        total_spend = self.baseline['Cost'].sum()
+        total_spend = self.rollup().at[0, 'Cost']
         
         self.add_line()
         self.add_line(f"{'Vendor':<30} | {'Spend':>14} | {'% of Total':>10} | {'Minutes':>12}")
@@ -85,13 +107,9 @@ class ReportGeneratorAgent:
         """Section 3: Top Languages"""
         self.add_section(f"3. TOP {top_n} LANGUAGES BY SPEND")
         
-        lang_summary = self.baseline.groupby('Language').agg({
-            'Cost': 'sum',
-            'Minutes': 'sum',
-            'Calls': 'sum'
-        }).sort_values('Cost', ascending=False).head(top_n)
+        lang_summary = self.rollup('Language').set_index('Language').sort_values('Cost', ascending=False).head(top_n)
         
-        total_spend = self.baseline['Cost'].sum()
+        total_spend = self.rollup().at[0, 'Cost']
         
         self.add_line()
         self.add_line(f"{'Rank':<6} | {'Language':<25} | {'Spend':>14} | {'% Total':>8} | {'CPM':>8}")
@@ -99,21 +117,18 @@ class ReportGeneratorAgent:
         
         for i, (lang, row) in enumerate(lang_summary.iterrows(), 1):
             pct = row['Cost'] / total_spend * 100
-            cpm = row['Cost'] / row['Minutes'] if row['Minutes'] > 0 else 0
+            cpm = row['CPM']
             self.add_line(f"{i:<6} | {lang[:25]:<25} | ${row['Cost']:>13,.0f} | {pct:>7.1f}% | ${cpm:>7.2f}")
             
     def generate_modality_analysis(self):
         """Section 4: Modality Breakdown"""
         self.add_section("4. MODALITY ANALYSIS")
         
-        modality_summary = self.baseline.groupby('Modality').agg({
-            'Cost': 'sum',
-            'Minutes': 'sum',
-            'Calls': 'sum'
-        }).sort_values('Cost', ascending=False)
+        modality_summary = self.rollup('Modality').set_index('Modality').sort_values('Cost', ascending=False)
         
-        total_spend = self.baseline['Cost'].sum()
-        total_mins = self.baseline['Minutes'].sum()
+        total = self.rollup()
+        total_spend = total.at[0, 'Cost']
+        total_mins = total.at[0, 'Minutes']
         
         self.add_line()
         self.add_line(f"{'Modality':<15} | {'Spend':>14} | {'% Spend':>8} | {'Minutes':>12} | {'% Mins':>8} | {'CPM':>8}")
@@ -122,20 +137,14 @@ class ReportGeneratorAgent:
         for modality, row in modality_summary.iterrows():
             pct_spend = row['Cost'] / total_spend * 100
             pct_mins = row['Minutes'] / total_mins * 100
-            cpm = row['Cost'] / row['Minutes'] if row['Minutes'] > 0 else 0
+            cpm = row['CPM']
             self.add_line(f"{modality:<15} | ${row['Cost']:>13,.0f} | {pct_spend:>7.1f}% | {row['Minutes']:>12,.0f} | {pct_mins:>7.1f}% | ${cpm:>7.2f}")
             
     def generate_monthly_trends(self):
         """Section 5: Monthly Trend Analysis"""
         self.add_section("5. MONTHLY TREND ANALYSIS")
         
-        monthly = self.baseline.groupby('Month').agg({
-            'Cost': 'sum',
-            'Minutes': 'sum',
-            'Calls': 'sum'
-        }).sort_index()
-        
-        monthly['CPM'] = monthly['Cost'] / monthly['Minutes']
+        monthly = self.rollup('Month').set_index('Month')
         monthly['MoM_Change'] = monthly['Cost'].pct_change() * 100
         
         self.add_line()
@@ -151,11 +160,7 @@ class ReportGeneratorAgent:
         self.add_section("6. BASELINE RATE ANALYSIS")
         
         # Group languages into tiers based on volume
-        lang_summary = self.baseline.groupby('Language').agg({
-            'Cost': 'sum',
-            'Minutes': 'sum'
-        })
-        lang_summary['CPM'] = lang_summary['Cost'] / lang_summary['Minutes']
+        lang_summary = self.rollup('Language').set_index('Language')
         
         total_mins = lang_summary['Minutes'].sum()
         lang_summary['Pct'] = lang_summary['Minutes'] / total_mins * 100
@@ -1,11 +1,13 @@
 
+import numpy as np
 import pandas as pd
-import re
 import hashlib
 import warnings
 from typing import Dict, List, Any, Optional, Tuple
 from core.canonical_schema import CANONICAL_FIELDS
-from core.memory_store import ensure_memory_dir, load_json, save_json
+from core.column_index import ColumnSetIndex, header_tokens, jaccard
+from core.column_profile import ColumnProfile, ColumnProfileCache, score_types
+from core.memory_store import ensure_memory_dir, load_json, merge_json, update_json
 from core.config import get_schema_config
 
 # Few-shot examples for AI prompting - covers diverse vendor formats
@@ -39,7 +41,9 @@ FEW_SHOT_EXAMPLES = [
 class SchemaAgent:
     """
     Agent responsible for deducing the map between Raw Excel Columns -> Canonical Schema.
-    It uses Generative AI (LLM) first, then falls back to heuristic matching.
+    Mappings are resolved cheapest first: the learned registry (exact column
+    signature, then a near-identical layout from the same vendor), heuristic
+    matching, and Generative AI (LLM) only when the heuristics are not confident.
     """
     
     def __init__(self, config_path: str = None):
@@ -53,6 +57,9 @@ class SchemaAgent:
         except Exception:
             self._mapping_registry = {}
             
+        self._column_index: Optional[ColumnSetIndex] = None  # see _get_column_index
+        self._profiles = ColumnProfileCache()  # parse results shared by all phases
+        self._type_engine = None
         self._pending_path = mem_dir / "pending_mappings.json"
         self._pending_mappings = load_json(self._pending_path, [])
         self._last_source = "heuristic"
@@ -108,15 +115,7 @@ class SchemaAgent:
 
         # Active learning: correction history
         self._correction_path = mem_dir / "correction_history.json"
-        self._correction_history = load_json(self._correction_path, {
-            "corrections": [],
-            "vendor_patterns": {},
-            "success_rates": {
-                "ai": {"total": 0, "corrected": 0},
-                "heuristic": {"total": 0, "corrected": 0},
-                "cache": {"total": 0, "corrected": 0}
-            }
-        })
+        self._correction_history = load_json(self._correction_path, self._default_correction_history())
 
         # Delayed import to avoid circular dependency issues if core isn't ready
         try:
@@ -271,9 +270,14 @@ Rules:
 
         return mapping, confidences, reasoning
 
+    def _column_profile(self, df: pd.DataFrame, column: str, rows: Optional[int] = None) -> ColumnProfile:
+        """Memoized type scores and date/numeric parses of df[column] (first `rows` rows)."""
+        return self._profiles.get(df, column, rows)
+
     def _infer_types_from_data(self, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
         """
         Use data-driven type inference to analyze all columns.
+        Results are memoized per column, so later phases reuse them.
 
         Args:
             df: DataFrame to analyze
@@ -281,16 +285,18 @@ Rules:
         Returns:
             Dict mapping column name to type inference results
         """
-        try:
-            from core.type_inference import TypeInferenceEngine
-        except ImportError:
-            return {}
+        if self._type_engine is None:
+            try:
+                from core.type_inference import TypeInferenceEngine
+            except ImportError:
+                return {}
 
-        type_config = self.config.get("type_inference", {})
-        sample_size = type_config.get("sample_size", 100)
+            type_config = self.config.get("type_inference", {})
+            sample_size = type_config.get("sample_size", 100)
+            self._type_engine = TypeInferenceEngine(sample_size=sample_size)
 
-        engine = TypeInferenceEngine(sample_size=sample_size)
-        return engine.analyze_all_columns(df)
+        profiles = [self._column_profile(df, col) for col in df.columns]
+        return dict(zip(df.columns, score_types(profiles, self._type_engine)))
 
     def _heuristic_mapping_with_type_inference(
         self,
@@ -449,20 +455,20 @@ Rules:
                 pruned.pop(field, None)
                 continue
 
-            series = df[col].dropna()
+            profile = self._column_profile(df, col)
+            series = profile.non_null
             if len(series) == 0:
                 continue
 
             if field == "date":
-                parsed = self._safe_to_datetime(series)
+                parsed = profile.dates(self._safe_to_datetime)
                 parse_rate = parsed.notna().sum() / len(series)
                 if parse_rate < min_date_parse:
                     pruned.pop(field, None)
                     continue
 
             if field in ("minutes", "charge", "rate"):
-                cleaned = series.astype(str).str.replace(r'[\$,]', '', regex=True)
-                numeric = pd.to_numeric(cleaned, errors="coerce")
+                numeric = profile.numbers("amount")
                 valid_rate = numeric.notna().sum() / len(series)
                 if valid_rate < min_numeric_rate:
                     pruned.pop(field, None)
@@ -558,45 +564,68 @@ Rules:
             sample_row: Optional sample row for AI context
             vendor: Optional vendor name for context and caching
             df: Optional DataFrame for data-driven type inference
+
+        The tier that answered is available from get_last_source().
         """
         # Store AI confidence for later use
         self._last_ai_confidences = {}
         self._last_ai_reasoning = None
 
-        # 1. AI Attempt with enhanced few-shot prompting
-        if self.ai and self.ai.enabled:
-            system_prompt, user_prompt = self._build_ai_prompt(source_columns, sample_row, vendor)
-
-            ai_response = self.ai.complete_json(system_prompt, user_prompt)
-            if ai_response:
-                validated_map, confidences, reasoning = self._parse_ai_response(ai_response, source_columns)
-                self._last_ai_confidences = confidences
-                self._last_ai_reasoning = reasoning
-
-                # Check minimum confidence threshold from config
-                min_ai_conf = self.config.get("ai_prompting", {}).get("min_ai_field_confidence", 0.5)
-
-                # Filter out low-confidence mappings
-                high_conf_map = {k: v for k, v in validated_map.items()
-                                if confidences.get(k, 0.8) >= min_ai_conf}
-
-                # If AI found the core fields with sufficient confidence, return
-                if len(high_conf_map) >= 3:
-                    self._last_source = "ai"
-                    return high_conf_map
-
-        # 2. Cached mapping (learned/approved)
+        # 1. Registry: exact column signature learned/approved before
         cached = self._get_cached_mapping(source_columns, vendor)
         if cached:
             return cached
 
-        # 2. Heuristic Fallback with Type Inference and Vendor Hints
+        # 2. Registry: same vendor, near-identical layout (a column added/renamed)
+        similar = self._get_similar_mapping(source_columns, vendor, df)
+        if similar:
+            return similar
+
+        # 3. Heuristic mapping with Type Inference and Vendor Hints
         self._last_source = "heuristic"
         mapping = self._heuristic_mapping_with_type_inference(source_columns, df, vendor)
         mapping = self._prune_mapping_with_data_validation(df, mapping)
-        mapping = self._validate_heuristic_with_ai(source_columns, sample_row, mapping, vendor, df)
+        if not (self.ai and self.ai.enabled) or self._is_confident_heuristic(df, mapping):
+            return mapping
 
-        return mapping
+        # 4. AI Attempt with enhanced few-shot prompting, only when still unsure
+        ai_mapping = self._ai_mapping(source_columns, sample_row, vendor)
+        if ai_mapping:
+            return ai_mapping
+
+        self._last_source = "heuristic"
+        return self._validate_heuristic_with_ai(source_columns, sample_row, mapping, vendor, df)
+
+    def _ai_mapping(self, source_columns: List[str], sample_row: Optional[pd.Series], vendor: Optional[str]) -> Optional[Dict[str, str]]:
+        """Ask the LLM for a mapping; None unless it finds the core fields with enough confidence."""
+        system_prompt, user_prompt = self._build_ai_prompt(source_columns, sample_row, vendor)
+
+        ai_response = self.ai.complete_json(system_prompt, user_prompt)
+        if not ai_response:
+            return None
+        validated_map, confidences, reasoning = self._parse_ai_response(ai_response, source_columns)
+        self._last_ai_confidences = confidences
+        self._last_ai_reasoning = reasoning
+
+        # Check minimum confidence threshold from config
+        min_ai_conf = self.config.get("ai_prompting", {}).get("min_ai_field_confidence", 0.5)
+
+        # Filter out low-confidence mappings
+        high_conf_map = {k: v for k, v in validated_map.items()
+                        if confidences.get(k, 0.8) >= min_ai_conf}
+
+        # If AI found the core fields with sufficient confidence, return
+        if len(high_conf_map) >= 3:
+            self._last_source = "ai"
+            return high_conf_map
+        return None
+
+    def _is_confident_heuristic(self, df: Optional[pd.DataFrame], mapping: Dict[str, str]) -> bool:
+        """True when a heuristic mapping scores well enough that the LLM need not be asked."""
+        threshold = float(self.config.get("mapping_tiers", {}).get("heuristic_accept_confidence", 0.75))
+        if df is None or df.empty:
+            return self.validate_mapping(mapping) >= threshold
+        return self.assess_mapping(df, mapping)["final_confidence"] >= threshold
 
     def _validate_cross_field(self, df: pd.DataFrame, mapping: Dict[str, str], sample_size: int = 50) -> Dict[str, Any]:
         """
@@ -625,18 +654,9 @@ Rules:
 
         if all([mins_col, rate_col, charge_col]) and all(c in sample.columns for c in [mins_col, rate_col, charge_col]):
             try:
-                mins = pd.to_numeric(
-                    sample[mins_col].astype(str).str.replace(',', '', regex=False),
-                    errors='coerce'
-                )
-                rate = pd.to_numeric(
-                    sample[rate_col].astype(str).str.replace(r'[\$,]', '', regex=True),
-                    errors='coerce'
-                )
-                charge = pd.to_numeric(
-                    sample[charge_col].astype(str).str.replace(r'[\$,]', '', regex=True),
-                    errors='coerce'
-                )
+                mins = self._column_profile(df, mins_col, sample_size).numbers("count")
+                rate = self._column_profile(df, rate_col, sample_size).numbers("amount")
+                charge = self._column_profile(df, charge_col, sample_size).numbers("amount")
 
                 expected_charge = mins * rate
                 valid_mask = expected_charge.notna() & charge.notna() & (expected_charge > 0)
@@ -661,9 +681,10 @@ Rules:
         # Check 2: Date parse success rate
         date_col = mapping.get("date")
         if date_col and date_col in sample.columns:
-            series = sample[date_col].dropna()
+            profile = self._column_profile(df, date_col, sample_size)
+            series = profile.non_null
             if len(series) > 0:
-                parsed = self._safe_to_datetime(series)
+                parsed = profile.dates(self._safe_to_datetime)
                 parse_rate = parsed.notna().sum() / len(series)
                 results["date_parse_rate"] = float(parse_rate)
 
@@ -719,10 +740,10 @@ Rules:
         # Date parse ratio
         date_col = mapping.get("date")
         if date_col in sample.columns:
-            series = sample[date_col]
-            non_null = series.notna().sum()
+            profile = self._column_profile(df, date_col, sample_size)
+            non_null = len(profile.non_null)
             if non_null > 0:
-                parsed = self._safe_to_datetime(series)
+                parsed = profile.dates(self._safe_to_datetime)
                 ratios.append(parsed.notna().sum() / non_null)
 
         # Language non-empty ratio
@@ -738,26 +759,20 @@ Rules:
         # Minutes numeric ratio
         mins_col = mapping.get("minutes")
         if mins_col in sample.columns:
-            series = sample[mins_col]
-            non_null = series.notna().sum()
+            profile = self._column_profile(df, mins_col, sample_size)
+            non_null = len(profile.non_null)
             if non_null > 0:
-                cleaned = (
-                    series.astype(str)
-                    .str.replace(',', '', regex=False)
-                    .str.replace(r'\s*min(utes?)?\s*$', '', regex=True, flags=re.IGNORECASE)
-                )
-                numeric = pd.to_numeric(cleaned, errors="coerce")
+                numeric = profile.numbers("minutes")
                 valid = numeric[(numeric.notna()) & (numeric >= 0)]
                 ratios.append(len(valid) / non_null)
 
         # Optional: cost numeric ratio
         cost_col = mapping.get("charge") or mapping.get("cost")
         if cost_col in sample.columns:
-            series = sample[cost_col]
-            non_null = series.notna().sum()
+            profile = self._column_profile(df, cost_col, sample_size)
+            non_null = len(profile.non_null)
             if non_null > 0:
-                cleaned = series.astype(str).str.replace(r'[\$,]', '', regex=True)
-                numeric = pd.to_numeric(cleaned, errors="coerce")
+                numeric = profile.numbers("amount")
                 valid = numeric[numeric.notna()]
                 ratios.append(len(valid) / non_null)
 
@@ -825,6 +840,43 @@ Rules:
         joined = "|".join(sorted(normalized))
         return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
 
+    def format_key(self, source_columns: List[str], vendor: Optional[str]) -> str:
+        """Registry key of a vendor's column layout; sheets with the same key share a mapping."""
+        return f"{vendor or 'UNKNOWN'}::{self._columns_signature(source_columns)}"
+
+    @staticmethod
+    def pooled_sample(frames: List[pd.DataFrame], max_rows: int = 200) -> pd.DataFrame:
+        """
+        Rows drawn evenly from several sheets of one layout, interleaved (every
+        sheet's first row, then every sheet's second row, ...) so the head()-based
+        checks of inference and assess_mapping() see all of them. A single sheet
+        is returned as is.
+        """
+        if len(frames) == 1:
+            return frames[0]
+        per_frame = -(-max_rows // len(frames))
+        # Headers may differ in case and spacing: name every sheet's columns as the first sheet does
+        names = {str(c).strip().lower(): c for c in frames[0].columns}
+        heads = [
+            frame.head(per_frame).rename(columns=lambda c: names.get(str(c).strip().lower(), c))
+            for frame in frames
+        ]
+        order = np.argsort(np.concatenate([np.arange(len(head)) for head in heads]), kind="stable")
+        return pd.concat(heads, ignore_index=True).iloc[order].reset_index(drop=True)
+
+    def layout_mapping(
+        self,
+        mapping: Dict[str, str],
+        layout_columns: List[str],
+        source_columns: List[str]
+    ) -> Optional[Dict[str, str]]:
+        """
+        A layout's mapping on the headers of another sheet with the same
+        format_key(), whose column names may differ in case and spacing from
+        the sheet it was inferred on. None if it does not resolve.
+        """
+        return self._resolve_reused_mapping(mapping, layout_columns, source_columns)
+
     def _get_cached_mapping(self, source_columns: List[str], vendor: Optional[str]) -> Optional[Dict[str, str]]:
         signature = self._columns_signature(source_columns)
         vendor_key = vendor or "UNKNOWN"
@@ -842,6 +894,89 @@ Rules:
         self._last_source = "cache"
         return mapping
 
+    def _get_similar_mapping(
+        self,
+        source_columns: List[str],
+        vendor: Optional[str],
+        df: Optional[pd.DataFrame] = None
+    ) -> Optional[Dict[str, str]]:
+        """
+        Reuse a registry mapping of the same vendor whose column layout is close to
+        this one (token-set Jaccard of cleaned headers, via the column index) and
+        whose mapped columns are present here, directly or under a renamed header.
+        With data, the reused mapping must still pass assess_mapping().
+        """
+        tiers = self.config.get("mapping_tiers", {})
+        if not tiers.get("fuzzy_registry", True):
+            return None
+        min_similarity = float(tiers.get("fuzzy_min_similarity", 0.75))
+
+        best, best_rank = None, None
+        for key, similarity in self._get_column_index().query(vendor or "UNKNOWN", source_columns, min_similarity):
+            if best_rank is not None and similarity < best_rank[0]:
+                break  # sorted by similarity: nothing later can rank higher
+            entry = self._mapping_registry.get(key)
+            if not isinstance(entry, dict) or not isinstance(entry.get("mapping"), dict) or not entry["mapping"]:
+                continue
+            resolved = self._resolve_reused_mapping(entry["mapping"], entry.get("columns") or [], source_columns)
+            if resolved is None:
+                continue
+            rank = (similarity, float(entry.get("data_confidence") or 0.0))
+            if best_rank is None or rank > best_rank:
+                best, best_rank = resolved, rank
+
+        if best is None:
+            return None
+        if df is not None and not df.empty and self.assess_mapping(df, best)["final_confidence"] < self.min_final_confidence:
+            return None
+        self._last_source = "registry_match"
+        return best
+
+    def _get_column_index(self) -> ColumnSetIndex:
+        """Similarity index over the registry's column layouts, built on first use."""
+        if self._column_index is None:
+            self._column_index = ColumnSetIndex()
+            for key, entry in self._mapping_registry.items():
+                if isinstance(entry, dict) and entry.get("columns"):
+                    self._column_index.add(key, entry.get("vendor") or "UNKNOWN", entry["columns"])
+        return self._column_index
+
+    def _index_registry_entry(self, key: str) -> None:
+        if self._column_index is not None:
+            entry = self._mapping_registry[key]
+            self._column_index.add(key, entry["vendor"], entry["columns"])
+
+    @staticmethod
+    def _resolve_reused_mapping(
+        mapping: Dict[str, str],
+        known_columns: List[str],
+        source_columns: List[str]
+    ) -> Optional[Dict[str, str]]:
+        """
+        Translate a stored mapping onto this sheet's headers. A mapped column that
+        is missing here may have been renamed: it resolves to the new header (one
+        the stored layout did not have) sharing the most tokens with it, if at
+        least half. None if a field cannot be resolved.
+        """
+        by_name = {str(c).strip().lower(): c for c in source_columns}
+        known = {str(c).strip().lower() for c in known_columns}
+        new_columns = [c for name, c in by_name.items() if name not in known]
+        resolved: Dict[str, str] = {}
+        for field, col in mapping.items():
+            if field not in CANONICAL_FIELDS:
+                return None
+            match = by_name.get(str(col).strip().lower())
+            if match is None:
+                old_tokens = header_tokens([col])
+                scored = [(jaccard(old_tokens, header_tokens([c])), c) for c in new_columns]
+                score, match = max(scored, key=lambda item: item[0], default=(0.0, None))
+                if score < 0.5:
+                    return None
+            resolved[field] = match
+        if len(set(resolved.values())) < len(resolved):
+            return None
+        return resolved
+
     def _save_mapping(self, source_columns: List[str], mapping: Dict[str, str], vendor: Optional[str], source: str, data_confidence: float) -> None:
         field_confidence = self.validate_mapping(mapping)
         if field_confidence < self.min_field_confidence or data_confidence < self.min_data_confidence:
@@ -849,6 +984,10 @@ Rules:
         signature = self._columns_signature(source_columns)
         vendor_key = vendor or "UNKNOWN"
         key = f"{vendor_key}::{signature}"
+        previous = self._mapping_registry.get(key) or {}
+        # Confirming a known mapping again teaches nothing; leave the entry (and memory) as it is
+        if previous.get("mapping") == mapping:
+            return
         self._mapping_registry[key] = {
             "vendor": vendor_key,
             "columns_signature": signature,
@@ -860,7 +999,32 @@ Rules:
             "ai_confidences": self.get_last_ai_confidences(),
             "ai_reasoning": self.get_last_ai_reasoning()
         }
-        save_json(self._registry_path, self._mapping_registry)
+        # A learned date format stays valid while the date column does
+        if previous.get("date_format") and (previous.get("mapping") or {}).get("date") == mapping.get("date"):
+            self._mapping_registry[key]["date_format"] = previous["date_format"]
+        merge_json(self._registry_path, {key: self._mapping_registry[key]})
+        self._index_registry_entry(key)
+
+    def get_date_format(self, source_columns: List[str], vendor: Optional[str]) -> Optional[str]:
+        """Date format learned for this vendor/column layout, if any."""
+        key = f"{vendor or 'UNKNOWN'}::{self._columns_signature(source_columns)}"
+        entry = self._mapping_registry.get(key)
+        if not isinstance(entry, dict):
+            return None
+        return entry.get("date_format")
+
+    def remember_date_format(self, source_columns: List[str], vendor: Optional[str], date_format: Optional[str]) -> bool:
+        """
+        Store the detected date format alongside a saved mapping so later runs
+        skip detection. Layouts without a registry entry are not recorded.
+        """
+        key = f"{vendor or 'UNKNOWN'}::{self._columns_signature(source_columns)}"
+        entry = self._mapping_registry.get(key)
+        if not isinstance(entry, dict) or not date_format or entry.get("date_format") == date_format:
+            return False
+        entry["date_format"] = date_format
+        merge_json(self._registry_path, {key: entry})
+        return True
 
     def _queue_pending_mapping(
         self,
@@ -886,8 +1050,11 @@ Rules:
             "ai_confidences": self.get_last_ai_confidences(),
             "ai_reasoning": self.get_last_ai_reasoning()
         }
-        self._pending_mappings.append(entry)
-        save_json(self._pending_path, self._pending_mappings)
+        # Append to the stored queue, which the dashboard may have changed meanwhile
+        self._pending_mappings = update_json(
+            self._pending_path, [],
+            lambda pending: (pending if isinstance(pending, list) else []) + [entry]
+        )
 
     def save_approved_mapping(self, entry: Dict[str, Any]) -> bool:
         """
@@ -914,7 +1081,8 @@ Rules:
             "ai_confidences": entry.get("ai_confidences"),
             "ai_reasoning": entry.get("ai_reasoning")
         }
-        save_json(self._registry_path, self._mapping_registry)
+        merge_json(self._registry_path, {key: self._mapping_registry[key]})
+        self._index_registry_entry(key)
         return True
 
     def validate_mapping(self, mapping: Dict[str, str]) -> float:
@@ -932,7 +1100,7 @@ Rules:
         return self.validate_mapping(mapping)
 
     def get_last_source(self) -> str:
-        """Returns the last mapping source: cache/ai/heuristic."""
+        """Returns the tier that produced the last mapping: cache/registry_match/heuristic/ai (or heuristic_ai*)."""
         return self._last_source
 
     def get_last_ai_confidences(self) -> Dict[str, float]:
@@ -945,6 +1113,18 @@ Rules:
 
     # ==================== Active Learning Methods ====================
 
+    @staticmethod
+    def _default_correction_history() -> Dict[str, Any]:
+        return {
+            "corrections": [],
+            "vendor_patterns": {},
+            "success_rates": {
+                "ai": {"total": 0, "corrected": 0},
+                "heuristic": {"total": 0, "corrected": 0},
+                "cache": {"total": 0, "corrected": 0}
+            }
+        }
+
     def record_correction(
         self,
         source_columns: List[str],
@@ -995,17 +1175,21 @@ Rules:
             "corrections": corrections_made
         }
 
-        if not isinstance(self._correction_history.get("corrections"), list):
-            self._correction_history["corrections"] = []
-        self._correction_history["corrections"].append(entry)
+        def _record(history):
+            # Applied to the stored history, so corrections saved by other runs are kept
+            self._correction_history = history if isinstance(history, dict) else self._default_correction_history()
+            if not isinstance(self._correction_history.get("corrections"), list):
+                self._correction_history["corrections"] = []
+            self._correction_history["corrections"].append(entry)
 
-        # Update vendor patterns with learned preferences
-        self._update_vendor_patterns(vendor_key, corrections_made, source_columns)
+            # Update vendor patterns with learned preferences
+            self._update_vendor_patterns(vendor_key, corrections_made, source_columns)
 
-        # Update success rates for the original source
-        self._update_success_rates()
+            # Update success rates for the original source
+            self._update_success_rates()
+            return self._correction_history
 
-        save_json(self._correction_path, self._correction_history)
+        self._correction_history = update_json(self._correction_path, self._default_correction_history(), _record)
 
     def _update_vendor_patterns(
         self,
@@ -1064,14 +1248,20 @@ Rules:
             source: The mapping source (ai/heuristic/cache). Uses last_source if not provided.
         """
         src = source or self._last_source
-        if "success_rates" not in self._correction_history:
-            self._correction_history["success_rates"] = {}
 
-        if src not in self._correction_history["success_rates"]:
-            self._correction_history["success_rates"][src] = {"total": 0, "corrected": 0}
+        def _count(history):
+            # Increment the stored counter, not a stale in-memory copy
+            history = history if isinstance(history, dict) else self._default_correction_history()
+            if "success_rates" not in history:
+                history["success_rates"] = {}
+
+            if src not in history["success_rates"]:
+                history["success_rates"][src] = {"total": 0, "corrected": 0}
+
+            history["success_rates"][src]["total"] += 1
+            return history
 
-        self._correction_history["success_rates"][src]["total"] += 1
-        save_json(self._correction_path, self._correction_history)
+        self._correction_history = update_json(self._correction_path, self._default_correction_history(), _count)
 
     def get_vendor_hints(self, vendor: str) -> Dict[str, Any]:
         """
@@ -1,6 +1,7 @@
 
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from core.baseline_cube import BaselineCube
 
 class SimulatorAgent:
     """
@@ -12,37 +13,37 @@ class SimulatorAgent:
         self.target_opi_rate = target_opi_rate
         self.target_vri_rate = target_vri_rate
 
-    def run_scenarios(self, baseline_df: pd.DataFrame) -> Dict[str, Any]:
+    def run_scenarios(self, baseline_df: pd.DataFrame, cube: Optional[BaselineCube] = None) -> Dict[str, Any]:
         """
-        Executes simulations across the entire baseline.
+        Executes simulations across the entire baseline. Spend totals come from
+        the baseline's cube (built here when not given).
         """
         if baseline_df.empty:
             return {"status": "No data to simulate", "total_actual_cost": 0.0, "scenarios": {}}
+        if cube is None:
+            cube = BaselineCube.from_baseline(baseline_df)
+        total_cost = cube.total()["Cost"]
 
         results = {
-            "total_actual_cost": float(baseline_df["Cost"].sum()),
+            "total_actual_cost": float(total_cost),
             "scenarios": {}
         }
 
         # --- Scenario 1: Rate Normalization ---
-        results["scenarios"]["rate_normalization"] = self._simulate_rate_normalization(baseline_df)
+        results["scenarios"]["rate_normalization"] = self._simulate_rate_normalization(baseline_df, total_cost)
 
         # --- Scenario 2: Modality Shift (VRI -> OPI) ---
-        results["scenarios"]["vri_to_opi_shift"] = self._simulate_modality_shift(baseline_df, shift_pct=0.25)
+        results["scenarios"]["vri_to_opi_shift"] = self._simulate_modality_shift(cube, total_cost, shift_pct=0.25)
 
         return results
 
-    def _simulate_rate_normalization(self, df: pd.DataFrame) -> Dict:
+    def _simulate_rate_normalization(self, df: pd.DataFrame, total_cost: float) -> Dict:
         """Calculates savings if all rates were capped at target levels."""
         sim_df = df.copy()
         
         # Apply caps based on modality
-        def get_target(row):
-            if row["Modality"] == "VRI": return self.target_vri_rate
-            if row["Modality"] == "OPI": return self.target_opi_rate
-            return row["CPM"]
-
-        sim_df["Target_CPM"] = sim_df.apply(get_target, axis=1)
+        targets = {"VRI": self.target_vri_rate, "OPI": self.target_opi_rate}
+        sim_df["Target_CPM"] = sim_df["Modality"].map(targets).fillna(sim_df["CPM"])
         sim_df["Target_Cost"] = sim_df["Minutes"] * sim_df["Target_CPM"]
         
         # Potential savings is current cost minus target cost (if target is lower)
@@ -54,26 +55,25 @@ class SimulatorAgent:
             "name": "Standardize Rates",
             "description": f"Cap OPI at ${self.target_opi_rate:.2f}/min and VRI at ${self.target_vri_rate:.2f}/min",
             "annual_impact": float(total_savings),
-            "savings_pct": float(total_savings / df["Cost"].sum() * 100) if df["Cost"].sum() > 0 else 0
+            "savings_pct": float(total_savings / total_cost * 100) if total_cost > 0 else 0
         }
 
-    def _simulate_modality_shift(self, df: pd.DataFrame, shift_pct: float) -> Dict:
+    def _simulate_modality_shift(self, cube: BaselineCube, total_cost: float, shift_pct: float) -> Dict:
         """Calculates savings from shifting expensive VRI minutes to cheaper OPI."""
-        vri_records = df[df["Modality"] == "VRI"]
-        if vri_records.empty:
+        by_modality = cube.rollup("Modality").set_index("Modality")
+        if "VRI" not in by_modality.index:
             return {"name": "VRI Shift", "description": "No VRI usage data found for this vendor.", "annual_impact": 0.0, "status": "No VRI volume found"}
 
-        vri_total_cost = vri_records["Cost"].sum()
-        vri_minutes = vri_records["Minutes"].sum()
+        vri_total_cost = by_modality.at["VRI", "Cost"]
+        vri_minutes = by_modality.at["VRI", "Minutes"]
         if vri_minutes <= 0:
             return {"name": "VRI Shift", "description": "VRI records found but total minutes are zero.", "annual_impact": 0.0, "status": "Invalid VRI minutes"}
         current_vri_cpm = vri_total_cost / vri_minutes
 
         # Calculate OPI average from the data as the landing rate
-        opi_records = df[df["Modality"] == "OPI"]
-        opi_minutes = opi_records["Minutes"].sum()
-        if not opi_records.empty and opi_minutes > 0:
-            opi_cpm = opi_records["Cost"].sum() / opi_minutes
+        opi_minutes = by_modality.at["OPI", "Minutes"] if "OPI" in by_modality.index else 0.0
+        if opi_minutes > 0:
+            opi_cpm = by_modality.at["OPI", "CPM"]
         else:
             opi_cpm = self.target_opi_rate
         
@@ -84,7 +84,7 @@ class SimulatorAgent:
             "name": f"{int(shift_pct*100)}% VRI to OPI Shift",
             "description": f"Transition {int(shift_pct*100)}% of video interpretation back to audio interpretation",
             "annual_impact": float(max(0, savings)),
-            "savings_pct": float(max(0, savings) / df["Cost"].sum() * 100) if df["Cost"].sum() > 0 else 0
+            "savings_pct": float(max(0, savings) / total_cost * 100) if total_cost > 0 else 0
         }
 
     def print_opportunity_register(self, results: Dict):
@@ -2,94 +2,246 @@
 import pandas as pd
 import datetime
 import re
-from typing import List, Dict, Any
-from core.canonical_schema import CanonicalRecord
+import numpy as np
+from typing import List, Dict, Any, Optional
+from core.canonical_schema import CanonicalBatch, CanonicalRecord, row_identities
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# Arrow-backed strings run the .str pipeline in native kernels
+STRING_DTYPE = "string[pyarrow]" if HAS_ARROW else "string[python]"
+
+# String date formats in the order _parse_date tries them, each with a gate that
+# only admits strings strptime accepts for that format. Gated strings parse to the
+# same date under pd.to_datetime(format=...) as under strptime.
+DATE_FORMATS = [
+    ("%Y-%m", r"[0-9]{4}-[0-9]{2}"),
+    ("%Y-%m-%d", r"[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}"),
+    ("%m/%d/%Y", r"[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}"),
+    ("%Y/%m/%d", r"[0-9]{4}/[0-9]{1,2}/[0-9]{1,2}"),
+    ("%d-%b-%y", r"[0-9]{1,2}-[A-Za-z]{3}-[0-9]{2}"),
+]
+DATE_FORMAT_GATES = dict(DATE_FORMATS)
+
+# Plain ASCII decimals, with the ASCII whitespace float() would ignore. Python's
+# float() also takes underscores, inf/nan and Unicode digits; those go row-wise.
+ASCII_SPACE = " \t\n\r\x0b\x0c"
+NUMBER_GATE = rf"[{ASCII_SPACE}]*[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?[{ASCII_SPACE}]*"
+
+# Cell types whose str() round-trips through float(), so they convert directly
+PLAIN_NUMBER_TYPES = (float, int, np.float64, np.int64)
+_type_of = np.frompyfunc(type, 1, 1)
 
 
 class StandardizerAgent:
     """
-    Takes a raw DataFrame + a Schema Mapping and produces a list of CanonicalRecords.
+    Takes a raw DataFrame + a Schema Mapping and produces canonical records,
+    as a columnar CanonicalBatch (process_dataframe_batch) or a list of
+    CanonicalRecords (process_dataframe).
     Handles data type conversion (strings to floats, parsing dates).
     """
 
-    def process_dataframe(self, df: pd.DataFrame, mapping: Dict[str, str], source_file: str, vendor: str) -> List[CanonicalRecord]:
+    def process_dataframe(
+        self,
+        df: pd.DataFrame,
+        mapping: Dict[str, str],
+        source_file: str,
+        vendor: str,
+        date_format: Optional[str] = None
+    ) -> List[CanonicalRecord]:
+        batch = self.process_dataframe_batch(df, mapping, source_file, vendor, date_format=date_format)
+        # Records carry their source row in raw_columns, resolved from the frame at hand
+        return batch.to_records(loader=lambda _path: {"": df})
+
+    def process_dataframe_batch(
+        self,
+        df: pd.DataFrame,
+        mapping: Dict[str, str],
+        source_file: str,
+        vendor: str,
+        sheet_name: Optional[str] = None,
+        source_path: Optional[str] = None,
+        date_format: Optional[str] = None,
+        header_row: Optional[int] = None
+    ) -> CanonicalBatch:
+        """
+        Standardize one mapped sheet into a CanonicalBatch. Rows point back to their
+        position in ``df`` (sheet ``sheet_name`` of ``source_path``) instead of
+        carrying a copy of the raw row.
+
+        ``header_row`` is the 0-based header row ``df`` was read below (see
+        IntakeAgent.load_clean_sheet); with it, rows also record their 1-based
+        row in the original sheet.
+
+        ``date_format`` is the date column's known format (see detect_date_format);
+        without it the format is detected from a sample.
+        """
         # Check required columns
         req_cols = ["language", "date"] # Minimal Requirement
         for rc in req_cols:
             if rc not in mapping:
                 # Can't process this sheet
-                return []
-        
-        # Make a working copy to avoid modifying original
-        work_df = df.copy()
+                return CanonicalBatch.empty()
         
-        # VECTORIZED OPERATIONS: Process all rows at once
+        # Each canonical column is built as a new array; ``df`` is only read
+        n = len(df)
         
-        # 1. Parse Dates (vectorized)
-        date_col = mapping.get("date")
-        work_df['_clean_date'] = work_df[date_col].apply(self._parse_date)
+        # 1. Parse Dates
+        dates = self._parse_dates(df[mapping["date"]], date_format)
         
-        # 2. Parse Language (vectorized)
-        lang_col = mapping.get("language")
-        work_df['_clean_language'] = work_df[lang_col].astype(str).str.strip()
+        # 2. Parse Language
+        lang_codes, languages = self._clean_text(df[mapping["language"]])
         
-        # 3. Parse Minutes (vectorized)
+        # 3. Parse Minutes
         mins_col = mapping.get("minutes")
-        if mins_col:
-            work_df['_clean_minutes'] = work_df[mins_col].apply(self._parse_float)
-        else:
-            work_df['_clean_minutes'] = 0.0
+        minutes = self._parse_floats(df[mins_col]) if mins_col else np.zeros(n, dtype="float64")
             
-        # 4. Parse Charge (vectorized)
+        # 4. Parse Charge
         charge_col = mapping.get("charge") or mapping.get("cost")
-        if charge_col:
-            work_df['_clean_charge'] = work_df[charge_col].apply(self._parse_float)
-        else:
-            work_df['_clean_charge'] = 0.0
+        charge = self._parse_floats(df[charge_col]) if charge_col else np.zeros(n, dtype="float64")
             
-        # 5. Parse Modality (vectorized)
+        # 5. Parse Modality
         if "modality" in mapping:
-            modality_col = mapping.get("modality")
-            work_df['_clean_modality'] = work_df[modality_col].astype(str).str.strip()
+            modality_codes, modalities = self._clean_text(df[mapping.get("modality")])
         else:
-            work_df['_clean_modality'] = "UNKNOWN"
-        
-        # 6. Calculate rate per minute (vectorized)
-        work_df['_rate_per_minute'] = work_df.apply(
-            lambda r: (r['_clean_charge'] / r['_clean_minutes']) if r['_clean_minutes'] > 0 else 0.0,
-            axis=1
-        )
+            modality_codes, modalities = np.zeros(n, dtype="intp"), np.array(["UNKNOWN"], dtype=object)
         
-        # FILTER: Remove rows with invalid data
-        valid_mask = (
-            work_df['_clean_date'].notna() &  # Must have valid date
-            (work_df['_clean_language'] != '') &  # Must have language
-            (work_df['_clean_language'].str.lower() != 'nan')  # Language not "nan"
-        )
+        # 6. Rate per minute: charge / minutes where minutes are positive, else 0.0
+        rate = np.zeros(n, dtype="float64")
+        np.divide(charge, minutes, out=rate, where=minutes > 0)
         
-        valid_df = work_df[valid_mask].copy()
+        # FILTER: valid date and a language that is not blank or "nan"
+        known_language = np.array([lang != '' and lang.lower() != 'nan' for lang in languages], dtype=bool)
+        valid_mask = ~np.isnat(dates) & known_language[lang_codes]
+        valid_rows = np.flatnonzero(valid_mask)
         
-        # BUILD RECORDS: Convert filtered dataframe to CanonicalRecords
-        records = []
-        for _, row in valid_df.iterrows():
-            try:
-                rec = CanonicalRecord(
-                    source_file=source_file,
-                    vendor=vendor,
-                    date=row['_clean_date'],
-                    language=row['_clean_language'],
-                    modality=row['_clean_modality'],
-                    minutes_billed=row['_clean_minutes'],
-                    total_charge=row['_clean_charge'],
-                    rate_per_minute=row['_rate_per_minute'],
-                    raw_columns=row.to_dict()
-                )
-                records.append(rec)
-            except Exception:
-                # Skip malformed rows
-                pass
-                
-        return records
+        # BUILD BATCH: canonical columns plus a lineage pointer per row
+        return CanonicalBatch.from_arrays(
+            source_file=source_file,
+            vendor=vendor,
+            date=dates[valid_rows],
+            language=languages[lang_codes[valid_rows]],
+            modality=modalities[modality_codes[valid_rows]],
+            minutes_billed=minutes[valid_rows],
+            total_charge=charge[valid_rows],
+            rate_per_minute=rate[valid_rows],
+            row_index=valid_rows,
+            row_id=row_identities(df, valid_rows),
+            source_path=source_path,
+            sheet_name=sheet_name,
+            sheet_row=self._sheet_rows(df, valid_rows, header_row)
+        )
+
+    @staticmethod
+    def _sheet_rows(df: pd.DataFrame, rows: np.ndarray, header_row: Optional[int]) -> Optional[np.ndarray]:
+        """
+        1-based original sheet rows of positions ``rows``. Cleaned sheets keep the
+        index labels they were read with (data-row offsets below the header), so
+        the row is label + header_row + 2. None when that does not hold.
+        """
+        if header_row is None or not pd.api.types.is_integer_dtype(df.index):
+            return None
+        return df.index.to_numpy(dtype="int64")[rows] + int(header_row) + 2
+
+    @staticmethod
+    def _clean_text(values: pd.Series):
+        """
+        A text column as (codes, distinct values) after ``astype(str).str.strip()``,
+        so per-row string work happens once per distinct cell.
+        """
+        codes, uniques = pd.factorize(values.astype(str))
+        return codes, np.array([value.strip() for value in uniques], dtype=object)
+
+    def detect_date_format(self, values: pd.Series, sample_size: int = 200) -> Optional[str]:
+        """
+        Pick the string format that parses most of a sample of the column, or None
+        when the column holds no parseable date strings (e.g. native datetimes).
+        """
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            return None
+        arr = values.to_numpy(dtype=object)
+        strings = arr[values.notna().to_numpy() & ~self._native_dates(arr)]
+        return self._detect_format(self._date_strings(strings), sample_size)
+
+    def _detect_format(self, strings: pd.Series, sample_size: int = 200, exclude=()) -> Optional[str]:
+        sample = strings.iloc[:sample_size]
+        best, best_hits = None, 0
+        for fmt, gate in DATE_FORMATS:
+            if fmt in exclude:
+                continue
+            gated = sample[sample.str.fullmatch(gate)]
+            if gated.empty:
+                continue
+            hits = int(pd.to_datetime(gated, format=fmt, errors="coerce").notna().sum())
+            if hits > best_hits:
+                best, best_hits = fmt, hits
+        return best
+
+    def _parse_dates(self, values: pd.Series, date_format: Optional[str] = None) -> np.ndarray:
+        """
+        Column-wise equivalent of applying _parse_date. Distinct string cells are
+        parsed one format at a time with pd.to_datetime (the known or detected
+        format first, then whatever fits the rest); only cells no format takes
+        go row-wise. Returns datetime64[D] with NaT where _parse_date gives None.
+        """
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            if getattr(values.dt, "tz", None) is not None:
+                values = values.dt.tz_localize(None)
+            return values.to_numpy().astype("datetime64[D]")
+
+        arr = values.to_numpy(dtype=object)
+        out = np.full(len(arr), np.datetime64("NaT"), dtype="datetime64[D]")
+        present = values.notna().to_numpy()
+        native = self._native_dates(arr) & present
+        for i in np.flatnonzero(native):
+            out[i] = self._parse_date(arr[i])
+
+        # Billing exports repeat the same few hundred dates; parse each distinct cell once
+        codes, uniques = pd.factorize(arr[present & ~native])
+        uniques = np.asarray(uniques, dtype=object)
+        parsed_uniques = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[D]")
+        strings = self._date_strings(uniques)
+        remaining = np.arange(len(uniques))
+        tried = set()
+        fmt = date_format if date_format in DATE_FORMAT_GATES else None
+        while remaining.size:
+            if fmt is None:
+                fmt = self._detect_format(strings.iloc[remaining], exclude=tried)
+                if fmt is None:
+                    break
+            tried.add(fmt)
+            subset = strings.iloc[remaining]
+            gated = subset.str.fullmatch(DATE_FORMAT_GATES[fmt]).to_numpy()
+            parsed = pd.to_datetime(subset[gated], format=fmt, errors="coerce")
+            ok = parsed.notna().to_numpy()
+            hit = remaining[gated][ok]
+            parsed_uniques[hit] = parsed.to_numpy()[ok].astype("datetime64[D]")
+            taken = np.zeros(len(remaining), dtype=bool)
+            taken[np.flatnonzero(gated)[ok]] = True
+            remaining = remaining[~taken]
+            fmt = None
+
+        # Residue: blanks, garbage and anything outside the gates
+        for i in remaining:
+            parsed_date = self._parse_date(uniques[i])
+            if parsed_date is not None:
+                parsed_uniques[i] = parsed_date
+        out[present & ~native] = parsed_uniques[codes]
+        return out
+
+    @staticmethod
+    def _native_dates(arr: np.ndarray) -> np.ndarray:
+        return np.fromiter((isinstance(v, datetime.date) for v in arr), dtype=bool, count=len(arr))
+
+    @staticmethod
+    def _date_strings(arr: np.ndarray) -> pd.Series:
+        """Cell text up to the first space, as _parse_date sees it."""
+        return pd.Series(arr, dtype=object).astype(str).str.split(" ", n=1).str[0].str.strip()
 
     def _parse_date(self, val: Any) -> datetime.date:
         if pd.isna(val):
@@ -118,6 +270,87 @@ class StandardizerAgent:
                 continue
         return None
 
+    def _parse_floats(self, values: pd.Series) -> np.ndarray:
+        """
+        Column-wise equivalent of applying _parse_float. String cells go through one
+        .str pipeline: strip "$", "," and "min", split MM:SS / HH:MM:SS durations
+        into parts and convert every plain decimal in a single cast. Cells outside
+        the plain-decimal form fall back to _parse_float.
+        """
+        dtype = values.dtype
+        if dtype == np.float64 or (isinstance(dtype, np.dtype) and dtype.kind in "iu"):
+            # str() of these round-trips, so float(str(v)) is just the value
+            out = values.to_numpy(dtype="float64")
+            return np.where(np.isnan(out), 0.0, out)
+
+        arr = values.to_numpy(dtype=object)
+        out = np.zeros(len(arr), dtype="float64")
+        if pd.api.types.infer_dtype(arr, skipna=True) == "string":
+            strings = slice(None)
+        else:
+            present = ~pd.isna(arr)
+            kind_codes, kinds = pd.factorize(_type_of(arr))
+            strings = present & np.array([k is str for k in kinds], dtype=bool)[kind_codes]
+            # Excel hands numbers over as Python ints/floats; those convert directly
+            plain = present & np.array([k in PLAIN_NUMBER_TYPES for k in kinds], dtype=bool)[kind_codes]
+            try:
+                out[plain] = arr[plain].astype("float64")
+            except OverflowError:
+                # float(10**400) raises where float("1000...") gives inf
+                out[plain] = [self._parse_float(v) for v in arr[plain]]
+            other = present & ~strings & ~plain
+            if other.any():
+                out[other] = [self._parse_float(v) for v in arr[other]]
+
+        # Minutes and charge columns repeat heavily (same durations, same rate x
+        # minutes), so each distinct string is parsed once. Missing cells factorize
+        # to -1 and stay 0.0.
+        codes, uniques = _factorize_strings(arr[strings])
+        if len(uniques):
+            parsed = self._parse_number_strings(uniques)
+            out[strings] = np.where(codes >= 0, parsed[codes], 0.0)
+        return out
+
+    def _parse_number_strings(self, arr: np.ndarray) -> np.ndarray:
+        text = (
+            pd.Series(arr, dtype=STRING_DTYPE)
+            .str.replace("$", "", regex=False)
+            .str.replace(",", "", regex=False)
+            .str.replace("min", "", regex=False)
+        )
+        out = np.zeros(len(text), dtype="float64")
+        done = np.zeros(len(text), dtype=bool)
+
+        plain = text.str.fullmatch(NUMBER_GATE).to_numpy(dtype=bool, na_value=False)
+        out[plain] = _cast_float(text[plain])
+        done |= plain
+
+        # Durations: M:S is minutes + seconds/60, H:M:S is hours*60 + minutes + seconds/60
+        colons = text.str.count(":").to_numpy(dtype="int64", na_value=0)
+        for n_parts in (2, 3):
+            rows = np.flatnonzero((colons == n_parts - 1) & ~done)
+            if not rows.size:
+                continue
+            parts = text.iloc[rows].str.strip(ASCII_SPACE).str.split(":", expand=True)
+            gated = np.ones(len(rows), dtype=bool)
+            for j in range(n_parts):
+                gated &= parts[j].str.fullmatch(NUMBER_GATE).to_numpy(dtype=bool, na_value=False)
+            values = [_cast_float(parts[j][gated]) for j in range(n_parts)]
+            if n_parts == 2:
+                minutes = values[0] + values[1] / 60.0
+            else:
+                minutes = values[0] * 60 + values[1] + values[2] / 60.0
+            out[rows[gated]] = minutes
+            done[rows[gated]] = True
+
+        # Residue (blanks, "N/A", exotic float() syntax): once per distinct value
+        rest = np.flatnonzero(~done)
+        if rest.size:
+            codes, uniques = pd.factorize(arr[rest])
+            parsed = np.array([self._parse_float(v) for v in uniques], dtype="float64")
+            out[rest] = parsed[codes]
+        return out
+
     def _parse_float(self, val: Any) -> float:
         if pd.isna(val):
             return 0.0
@@ -144,3 +377,25 @@ class StandardizerAgent:
             return float(s)
         except:
             return 0.0
+
+
+def _factorize_strings(arr: np.ndarray):
+    """(codes, distinct strings) for an object array of str/missing cells; missing is -1."""
+    if HAS_ARROW:
+        try:
+            encoded = pa.array(arr, type=pa.string(), from_pandas=True).dictionary_encode()
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        else:
+            codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False)
+            return codes.astype("int64"), encoded.dictionary.to_numpy(zero_copy_only=False)
+    codes, uniques = pd.factorize(arr)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _cast_float(text: pd.Series) -> np.ndarray:
+    """Correctly rounded string-to-float cast (same result as float())."""
+    text = text.str.strip(ASCII_SPACE)
+    if HAS_ARROW:
+        return pc.cast(pa.array(text), pa.float64()).to_numpy(zero_copy_only=False)
+    return text.to_numpy(dtype=str).astype("float64")
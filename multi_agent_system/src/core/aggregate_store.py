@@ -0,0 +1,210 @@
+"""
+Per-client store of additive baseline aggregates for incremental runs.
+
+Minutes / Cost / Calls summed per (Month, Vendor, Language, Modality) are
+additive, so the baseline of a client's whole history can be kept as running
+totals and updated with only the files that are new or changed. The store
+lives under agent_memory/aggregates/<client>/:
+
+    manifest.json        one entry per source file (size, mtime, SHA-256,
+                         record count, its part file) plus the totals file
+    totals-<id>.pkl      the running totals over all stored files
+    parts/<id>.pkl       one file's contribution: its group totals and the
+                         duplicate-key hashes of its clean rows
+
+A file is identified by its normalized name, as source_file is in QA's
+duplicate keys. When a changed file replaces a stored one, the old part is
+subtracted from the totals before the new one is added (groups whose Calls
+reach zero are dropped), and the two key indexes are compared to report how
+many rows carried over. Files missing from an input directory are left in
+the store: a monthly drop only needs the new files.
+
+Runs stage their parts and commit() applies them under a lock against the
+manifest as it is on disk then. New part and totals files are written first
+and the manifest rename is the commit point, so a crashed run leaves the
+store as it was.
+"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.baseline_cube import DIMENSIONS, MEASURES
+from core.memory_store import atomic_write_json, ensure_memory_dir, file_lock
+from core.sheet_cache import file_digest
+
+# Bump when the stored parts would be computed differently
+STORE_VERSION = 1
+
+
+def source_key(filepath: str) -> str:
+    """Store key of a source file: its name, normalized like QA duplicate keys."""
+    return os.path.basename(str(filepath)).strip().lower()
+
+
+def fold_totals(totals: Optional[pd.DataFrame], part: Optional[pd.DataFrame], sign: int = 1) -> Optional[pd.DataFrame]:
+    """Add (sign=1) or retract (sign=-1) a part's group totals; groups left with no calls are dropped."""
+    if part is None or part.empty:
+        return totals
+    part = part[DIMENSIONS + MEASURES]
+    if sign < 0:
+        part = part.assign(**{m: -part[m] for m in MEASURES})
+    if totals is None or totals.empty:
+        return part.reset_index(drop=True)
+    combined = pd.concat([totals, part], ignore_index=True).groupby(DIMENSIONS).sum().reset_index()
+    return combined[combined["Calls"] != 0].reset_index(drop=True)
+
+
+class AggregateStore:
+    """Running baseline totals of one client, kept per source file."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.manifest = self._load_manifest()
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Tuple[Dict[str, Any], Optional[pd.DataFrame], np.ndarray]] = {}
+
+    @classmethod
+    def for_client(cls, client: str) -> "AggregateStore":
+        return cls(ensure_memory_dir() / "aggregates" / client)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / "manifest.json"
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if not isinstance(manifest, dict) or manifest.get("version") != STORE_VERSION:
+            # Nothing stored yet, or parts of another version: start over
+            return {"version": STORE_VERSION, "totals": None, "files": {}}
+        return manifest
+
+    def _read_pickle(self, name: Optional[str]) -> Any:
+        if not name:
+            return None
+        with open(self.root / name, "rb") as f:
+            return pickle.load(f)
+
+    def _write_pickle(self, name: str, obj: Any) -> None:
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".pkl")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    # ------------------------------------------------------------- planning
+
+    def changed_files(self, files: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split input files into (new or changed, unchanged), in input order. Size
+        and mtime are checked first; a file that differs there is hashed, so a
+        touched but identical file still counts as unchanged.
+        """
+        changed, unchanged = [], []
+        for filepath in files:
+            stat = os.stat(filepath)
+            state = {"name": os.path.basename(filepath), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            entry = self.manifest["files"].get(source_key(filepath))
+            if entry and entry["size"] == state["size"] and entry["mtime_ns"] == state["mtime_ns"]:
+                unchanged.append(filepath)
+                continue
+            state["digest"] = file_digest(filepath)
+            if entry and entry["digest"] == state["digest"]:
+                unchanged.append(filepath)
+                continue
+            self._states[filepath] = state
+            changed.append(filepath)
+        return changed, unchanged
+
+    def stage(self, filepath: str, totals: Optional[pd.DataFrame], keys: np.ndarray) -> None:
+        """Queue a processed file's group totals and duplicate-key hashes for commit()."""
+        state = self._states.get(filepath)
+        if state is None:
+            stat = os.stat(filepath)
+            state = {"name": os.path.basename(filepath), "size": stat.st_size,
+                     "mtime_ns": stat.st_mtime_ns, "digest": file_digest(filepath)}
+        self._pending[source_key(filepath)] = (state, totals, np.asarray(keys, dtype=np.uint64))
+
+    # ------------------------------------------------------------- commit
+
+    def commit(self) -> Dict[str, Any]:
+        """
+        Apply the staged files to the stored totals: retract the parts they
+        replace and add theirs. Returns what changed (files added / replaced,
+        records added / retracted, rows carried over by replaced files).
+        """
+        summary = {"added": [], "replaced": [], "records_added": 0, "records_retracted": 0, "rows_carried_over": 0}
+        if not self._pending:
+            return summary
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.manifest_path):
+            manifest = self._load_manifest()
+            totals = self._read_pickle(manifest["totals"])
+            superseded = [manifest["totals"]] if manifest["totals"] else []
+
+            for key, (state, part, keys) in self._pending.items():
+                old = manifest["files"].get(key)
+                records = int(part["Calls"].sum()) if part is not None else 0
+                if old is not None:
+                    old_part = self._read_pickle(old["part"])
+                    totals = fold_totals(totals, old_part["totals"], sign=-1)
+                    summary["replaced"].append(state["name"])
+                    summary["records_retracted"] += old["records"]
+                    summary["rows_carried_over"] += int(np.isin(keys, old_part["keys"]).sum())
+                    superseded.append(old["part"])
+                else:
+                    summary["added"].append(state["name"])
+                totals = fold_totals(totals, part)
+                summary["records_added"] += records
+
+                part_name = f"parts/{hashlib.sha1(key.encode()).hexdigest()}-{state['digest'][:16]}.pkl"
+                self._write_pickle(part_name, {"name": state["name"], "totals": part, "keys": keys})
+                manifest["files"][key] = {
+                    **state,
+                    "records": records,
+                    "part": part_name,
+                    "updated": datetime.datetime.now().isoformat(timespec="seconds"),
+                }
+
+            totals_name = f"totals-{datetime.datetime.now():%Y%m%d%H%M%S%f}.pkl"
+            self._write_pickle(totals_name, totals)
+            manifest["totals"] = totals_name
+            atomic_write_json(self.manifest_path, manifest)
+
+            live = {entry["part"] for entry in manifest["files"].values()} | {totals_name}
+            for name in superseded:
+                if name not in live:
+                    with contextlib.suppress(OSError):
+                        (self.root / name).unlink()
+
+        self.manifest = manifest
+        self._pending = {}
+        return summary
+
+    def totals(self) -> Optional[pd.DataFrame]:
+        """Group totals over every stored file (None when the store is empty)."""
+        return self._read_pickle(self.manifest["totals"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["files"])
+
@@ -0,0 +1,130 @@
+"""
+Disk-backed cache of LLM responses.
+
+Responses are stored under agent_memory/ai_cache/, keyed by a SHA-256 of the
+request kind, model, system prompt, user prompt and temperature, so identical
+prompts (sheet classification, schema mapping, modality fallback, analyst
+commentary) are answered from disk on later runs. Entries expire after
+``ttl_seconds`` and the directory is kept under ``max_bytes`` by LRU eviction.
+
+Modes (config ``ai_cache.mode`` or env AI_CACHE_MODE):
+- "readwrite": serve hits, store new responses (default)
+- "replay": serve hits only, never write and never call the network
+- "off": no caching
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from core.config import get_cache_config
+from core.disk_cache import DiskLRU
+from core.memory_store import ensure_memory_dir
+
+MODES = ("readwrite", "replay", "off")
+
+
+class AIResponseCache:
+    """Size- and age-bounded store of AI responses with hit/miss counters."""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        mode: str = "readwrite"
+    ):
+        cfg = get_cache_config().get("ai_cache", {})
+        if root is None:
+            root = ensure_memory_dir() / "ai_cache"
+        if max_bytes is None:
+            max_bytes = int(cfg.get("max_bytes", 256 * 1024 ** 2))
+        if ttl_seconds is None:
+            ttl_seconds = float(cfg.get("ttl_seconds", 30 * 24 * 3600))
+        self.store = DiskLRU(root, max_bytes)
+        self.ttl_seconds = ttl_seconds  # 0 = never expire
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls) -> Optional["AIResponseCache"]:
+        """Build the cache unless disabled by config or AI_CACHE_MODE=off."""
+        mode = cache_mode()
+        if mode == "off":
+            return None
+        return cls(mode=mode)
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == "replay"
+
+    def key(self, kind: str, model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        payload = json.dumps([kind, model, system_prompt, user_prompt, float(temperature)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(True, response) on a live hit, (False, None) otherwise."""
+        path = self.store.path(key, ".json")
+        data = self.store.read_bytes(path)
+        entry = None
+        if data is not None:
+            try:
+                entry = json.loads(data.decode("utf-8"))
+            except ValueError:
+                entry = None
+        if entry is not None and self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            if not self.replay:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry.get("response")
+
+    def put(self, key: str, response: Any, model: str) -> None:
+        if self.replay or response is None:
+            return
+        path = self.store.path(key, ".json")
+        entry = {"created": time.time(), "model": model, "response": response}
+        self.store.write_bytes(path, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        self.store.evict(protect=[path])
+
+
+def cache_mode() -> str:
+    """Configured mode; AI_CACHE_MODE overrides config, a disabled cache is "off"."""
+    cfg = get_cache_config().get("ai_cache", {})
+    if not cfg.get("enabled", True):
+        return "off"
+    mode = os.getenv("AI_CACHE_MODE", "").strip().lower() or str(cfg.get("mode", "readwrite")).lower()
+    if mode not in MODES:
+        print(f"Warning: Unknown AI cache mode '{mode}', using 'readwrite'")
+        mode = "readwrite"
+    return mode
+
+
+_cache = None
+_cache_built = False
+
+
+def get_response_cache() -> Optional[AIResponseCache]:
+    """Process-wide response cache shared by every AIClient (None when disabled)."""
+    global _cache, _cache_built
+    if not _cache_built:
+        _cache = AIResponseCache.from_config()
+        _cache_built = True
+    return _cache
+
+
+def response_cache_stats() -> Optional[dict]:
+    """Hit/miss counters of the shared cache, or None if no AI call has used it."""
+    if _cache is None:
+        return None
+    return {"mode": _cache.mode, "hits": _cache.hits, "misses": _cache.misses}
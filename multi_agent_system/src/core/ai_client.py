@@ -1,7 +1,14 @@
 
 import os
 import json
-from typing import Dict, Any, Optional
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from core.ai_cache import AIResponseCache, cache_mode, get_response_cache
+from core.config import get_ai_config
 
 try:
     from dotenv import load_dotenv
@@ -9,26 +16,170 @@ except ImportError:
     load_dotenv = None
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, APIConnectionError
 except ImportError:
     OpenAI = None
+    APIConnectionError = None
+
+TEMPERATURES = {"json": 0.0, "text": 0.7}
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class TokenBucket:
+    """Thread-safe rate limiter: `rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take one token, waiting for it; False if it would not arrive before `deadline`."""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed requests, sending callers back to
+    their heuristics. After `cooldown` seconds one trial request is let through;
+    success closes the breaker again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = int(threshold)
+        self.cooldown = float(cooldown)
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self.opened_at >= self.cooldown:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.threshold > 0 and self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"Warning: {self.failures} AI requests failed in a row. Using heuristics "
+                          f"for the next {self.cooldown:.0f}s.")
+                self.opened_at = time.monotonic()
+
+
+class RequestLimits:
+    """
+    Concurrency, rate, retry and deadline settings shared by AIClients.
+    Settings come from config/ai_config.json; `overrides` replace single keys.
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, Any]] = None):
+        cfg = {**get_ai_config(), **(overrides or {})}
+        self.max_in_flight = max(1, int(cfg["max_in_flight"]))
+        self.timeout_seconds = float(cfg["timeout_seconds"])
+        self.deadline_seconds = float(cfg["deadline_seconds"])
+        self.max_retries = int(cfg["max_retries"])
+        self.backoff_base = float(cfg["backoff_base_seconds"])
+        self.backoff_max = float(cfg["backoff_max_seconds"])
+        self.bucket = TokenBucket(cfg["requests_per_second"], cfg["burst"])
+        self.breaker = CircuitBreaker(cfg["breaker_failures"], cfg["breaker_cooldown_seconds"])
+        self.in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ai")
+            return self._executor
+
+    def backoff(self, attempt: int, exc: Exception) -> float:
+        """Seconds to wait before retry `attempt` (0-based): Retry-After, else jittered exponential."""
+        response = getattr(exc, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    if APIConnectionError is not None and isinstance(exc, APIConnectionError):
+        return True  # includes timeouts
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+_limits = None
+_limits_lock = threading.Lock()
+
+
+def get_request_limits() -> RequestLimits:
+    """Process-wide limits, so every agent's client shares one rate budget and breaker."""
+    global _limits
+    with _limits_lock:
+        if _limits is None:
+            _limits = RequestLimits()
+        return _limits
+
 
 class AIClient:
     """
-    Centralized client for AI interactions. 
+    Centralized client for AI interactions.
     Designed to fail gracefully if no API key is present, falling back to heuristic logic.
+    Responses go through the shared on-disk cache (core.ai_cache), so an identical
+    request is only sent once; in replay mode misses are never sent at all.
+    Requests are rate limited, retried with backoff and bounded by a deadline;
+    the *_many methods send a list of prompts concurrently.
     """
-    
-    def __init__(self):
+
+    def __init__(self, cache: Optional[AIResponseCache] = None, limits: Optional[RequestLimits] = None):
         if load_dotenv:
             load_dotenv()
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.client = None
         self.enabled = False
-        
+        self._cache = cache
+        self._limits = limits
+
         if self.api_key and OpenAI:
             try:
-                self.client = OpenAI(api_key=self.api_key)
+                # Retries and timeouts are handled here, not by the SDK
+                self.client = OpenAI(api_key=self.api_key, max_retries=0)
                 self.enabled = True
             except Exception as e:
                 print(f"Warning: Failed to initialize OpenAI client: {e}")
@@ -36,7 +187,12 @@ class AIClient:
             print("Warning: 'openai' package not installed. Running in Heuristic Mode.")
         else:
             print("Note: No OPENAI_API_KEY found. Running in Heuristic Mode.")
-            
+
+        # Replay answers from the cache alone, so it needs no API key
+        if not self.enabled and (cache.replay if cache is not None else cache_mode() == "replay"):
+            self.enabled = True
+            print("Note: Replaying cached AI responses (no network calls).")
+
     def complete_json(self, system_prompt: str, user_prompt: str, model: str = "gpt-4o") -> Optional[Dict[str, Any]]:
         """
         Requests a JSON response from the LLM.
@@ -44,24 +200,7 @@ class AIClient:
         """
         if not self.enabled:
             return None
-            
-        try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.0
-            )
-            
-            content = response.choices[0].message.content
-            return json.loads(content)
-            
-        except Exception as e:
-            print(f"AI Request Failed: {e}")
-            return None
+        return self._complete_many("json", [(system_prompt, user_prompt)], model)[0]
 
     def complete_text(self, system_prompt: str, user_prompt: str, model: str = "gpt-4o") -> Optional[str]:
         """
@@ -70,19 +209,109 @@ class AIClient:
         """
         if not self.enabled:
             return None
-            
+        return self._complete_many("text", [(system_prompt, user_prompt)], model)[0]
+
+    def complete_json_many(self, prompts: Sequence[Tuple[str, str]], model: str = "gpt-4o") -> List[Optional[Dict[str, Any]]]:
+        """
+        Requests JSON responses for (system_prompt, user_prompt) pairs concurrently.
+        Results are in prompt order, None where AI is disabled or the request failed.
+        """
+        if not self.enabled:
+            return [None] * len(prompts)
+        return self._complete_many("json", prompts, model)
+
+    def complete_text_many(self, prompts: Sequence[Tuple[str, str]], model: str = "gpt-4o") -> List[Optional[str]]:
+        """Text counterpart of complete_json_many."""
+        if not self.enabled:
+            return [None] * len(prompts)
+        return self._complete_many("text", prompts, model)
+
+    def _complete_many(self, kind: str, prompts: Sequence[Tuple[str, str]], model: str) -> List[Any]:
+        """Answer from the response cache, send the misses (each distinct prompt once) and store the results."""
+        cache = self._cache if self._cache is not None else get_response_cache()
+        results: List[Any] = [None] * len(prompts)
+        pending: Dict[Any, List[int]] = {}
+        for i, (system_prompt, user_prompt) in enumerate(prompts):
+            if cache is not None:
+                key = cache.key(kind, model, system_prompt, user_prompt, TEMPERATURES[kind])
+            else:
+                key = (system_prompt, user_prompt)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            if cache is not None:
+                hit, response = cache.get(key)
+                if hit:
+                    results[i] = response
+                    continue
+                if cache.replay:
+                    continue
+            pending[key] = [i]
+        if not pending or self.client is None:
+            return results
+
+        keys = list(pending)
+        calls = [(kind, model) + tuple(prompts[pending[key][0]]) for key in keys]
+        if len(calls) == 1:
+            answers = [self._send(*calls[0])]
+        else:
+            answers = list(self.limits.executor().map(lambda call: self._send(*call), calls))
+        for key, answer in zip(keys, answers):
+            for i in pending[key]:
+                results[i] = answer
+            if cache is not None:
+                cache.put(key, answer, model)
+        return results
+
+    @property
+    def limits(self) -> RequestLimits:
+        return self._limits if self._limits is not None else get_request_limits()
+
+    def _send(self, kind: str, model: str, system_prompt: str, user_prompt: str) -> Any:
+        """One request with rate limiting, retries and a deadline; None on failure."""
+        limits = self.limits
+        if not limits.breaker.allow():
+            return None
+        request = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": TEMPERATURES[kind]
+        }
+        if kind == "json":
+            request["response_format"] = {"type": "json_object"}
+
+        deadline = time.monotonic() + limits.deadline_seconds
+        attempt = 0
+        while True:
+            if not limits.bucket.acquire(deadline):
+                print("AI Request Failed: deadline exceeded waiting for rate limit")
+                limits.breaker.record(False)
+                return None
+            timeout = max(0.001, min(limits.timeout_seconds, deadline - time.monotonic()))
+            try:
+                with limits.in_flight:
+                    response = self.client.chat.completions.create(timeout=timeout, **request)
+                content = response.choices[0].message.content
+                break
+            except Exception as e:
+                if attempt < limits.max_retries and _is_retryable(e):
+                    delay = limits.backoff(attempt, e)
+                    if time.monotonic() + delay < deadline:
+                        time.sleep(delay)
+                        attempt += 1
+                        continue
+                print(f"AI Request Failed: {e}")
+                limits.breaker.record(False)
+                return None
+
+        limits.breaker.record(True)
+        if kind == "text":
+            return content
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
+            return json.loads(content)
+        except (TypeError, ValueError) as e:
             print(f"AI Request Failed: {e}")
             return None
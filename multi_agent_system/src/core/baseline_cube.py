@@ -0,0 +1,117 @@
+"""
+Grouping-sets cube over the baseline table.
+
+The baseline has one row per (Month, Vendor, Language, Modality). Reports, the
+analyst, the simulator and the dashboard also need it per month, per vendor,
+per language and so on. A BaselineCube holds every rollup of the four
+dimensions (16 grouping sets, grand total included) with CPM and
+Avg_Call_Length, built in one pass over integer codes: each dimension is
+factorized once (months sort chronologically as YYYY-MM), and each grouping
+set is a bincount over the packed codes of the dimensions it keeps.
+
+Rolled-up dimensions are None in cube.frame, and the Grouping column is a
+bitmask of them (bit i set when DIMENSIONS[i] is rolled up), so the grouping
+sets survive a round trip through Parquet. As with DataFrame.groupby, a row
+with a missing key only counts towards the sets that roll that key up.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["Month", "Vendor", "Language", "Modality"]
+MEASURES = ["Minutes", "Cost", "Calls"]
+RATES = ["CPM", "Avg_Call_Length"]
+CUBE_COLUMNS = DIMENSIONS + ["Grouping"] + MEASURES + RATES
+
+
+def grouping_id(dims: Iterable[str]) -> int:
+    """Grouping bitmask of the set that keeps `dims` (and rolls up the other dimensions)."""
+    kept = set(dims)
+    unknown = kept.difference(DIMENSIONS)
+    if unknown:
+        raise KeyError(f"Not a cube dimension: {sorted(unknown)}")
+    return sum(1 << i for i, dim in enumerate(DIMENSIONS) if dim not in kept)
+
+
+def add_rates(df: pd.DataFrame) -> pd.DataFrame:
+    """Derive CPM and Avg_Call_Length from summed Cost / Minutes / Calls (0 where undefined)."""
+    df["CPM"] = (
+        df["Cost"]
+        .div(df["Minutes"])
+        .replace([float("inf"), -float("inf")], 0.0)
+        .fillna(0.0)
+    )
+    df["Avg_Call_Length"] = (
+        df["Minutes"]
+        .div(df["Calls"])
+        .replace([float("inf"), -float("inf")], 0.0)
+        .fillna(0.0)
+    )
+    return df
+
+
+class BaselineCube:
+    """Every rollup of a baseline table; query with rollup() and total()."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    @classmethod
+    def from_baseline(cls, baseline: pd.DataFrame) -> "BaselineCube":
+        """Cube of a baseline table (or of AggregatorAgent group totals)."""
+        n = len(baseline)
+        codes, levels = [], []
+        for dim in DIMENSIONS:
+            dim_codes, dim_levels = pd.factorize(baseline[dim], sort=True)
+            codes.append(dim_codes.astype(np.int64))
+            levels.append(np.asarray(dim_levels, dtype=object))
+        measures = {m: baseline[m].to_numpy(dtype=np.float64) for m in MEASURES}
+
+        parts = []
+        for mask in range(1 << len(DIMENSIONS)):
+            kept = [i for i in range(len(DIMENSIONS)) if not mask >> i & 1]
+            # Pack the kept codes into one key; rows missing a kept key drop out
+            key = np.zeros(n, dtype=np.int64)
+            valid = np.ones(n, dtype=bool)
+            for i in kept:
+                key = key * len(levels[i]) + codes[i]
+                valid &= codes[i] >= 0
+            keys, inverse = np.unique(key[valid], return_inverse=True)
+            size = len(keys)
+
+            part = {"Grouping": np.full(size, mask, dtype=np.int8)}
+            for m in MEASURES:
+                part[m] = np.bincount(inverse, weights=measures[m][valid], minlength=size)
+            for i in reversed(kept):
+                keys, dim_codes = np.divmod(keys, len(levels[i]))
+                part[DIMENSIONS[i]] = levels[i][dim_codes]
+            for i in range(len(DIMENSIONS)):
+                if i not in kept:
+                    part[DIMENSIONS[i]] = np.full(size, None, dtype=object)
+            parts.append(pd.DataFrame(part))
+
+        frame = pd.concat(parts, ignore_index=True)
+        frame["Calls"] = np.rint(frame["Calls"].to_numpy()).astype(np.int64)
+        return cls(add_rates(frame)[CUBE_COLUMNS])
+
+    def rollup(self, *dims: str) -> pd.DataFrame:
+        """The grouping set keeping `dims`: those columns, the measures and rates, ordered by dimension."""
+        rows = self.frame[self.frame["Grouping"] == grouping_id(dims)]
+        return rows[list(dims) + MEASURES + RATES].reset_index(drop=True)
+
+    def total(self) -> Dict[str, float]:
+        """Grand-total measures and rates (zeros for an empty baseline)."""
+        rows = self.rollup()
+        if rows.empty:
+            return {col: 0 if col == "Calls" else 0.0 for col in MEASURES + RATES}
+        return {col: rows[col].iloc[0].item() for col in MEASURES + RATES}
+
+    def to_parquet(self, path: Union[str, Path]) -> None:
+        self.frame.to_parquet(path, index=False)
+
+    @classmethod
+    def read_parquet(cls, path: Union[str, Path]) -> "BaselineCube":
+        return cls(pd.read_parquet(path))
@@ -0,0 +1,52 @@
+"""
+First-in first-out spool of CanonicalBatches on disk.
+
+Streaming runs standardize and validate one sheet at a time, park the batch
+here and read the batches back in order for the second pass, so at most one
+sheet's records are held in memory. Entries are deleted as they are read.
+"""
+
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from core.canonical_schema import CanonicalBatch
+
+
+class BatchSpool:
+    """Ordered on-disk queue of batches, removed when closed."""
+
+    def __init__(self, parent: Optional[Path] = None):
+        self.root = Path(tempfile.mkdtemp(prefix=".spool-", dir=parent))
+        self._paths: List[Path] = []
+        self.record_count = 0
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def append(self, batch: CanonicalBatch) -> None:
+        path = self.root / f"{len(self._paths):06d}.pkl"
+        with open(path, "wb") as f:
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._paths.append(path)
+        self.record_count += len(batch)
+
+    def drain(self) -> Iterator[CanonicalBatch]:
+        """Yield the batches in the order they were appended, deleting each one."""
+        for path in self._paths:
+            with open(path, "rb") as f:
+                batch = pickle.load(f)
+            path.unlink()
+            yield batch
+        self._paths = []
+
+    def close(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self) -> "BatchSpool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
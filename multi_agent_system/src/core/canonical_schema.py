@@ -1,8 +1,12 @@
 
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterator, List, Sequence, Tuple, Union
 import datetime
 
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
 class CanonicalRecord(BaseModel):
     """
     The standard format for a single line item of language service usage.
@@ -38,6 +42,383 @@ class CanonicalRecord(BaseModel):
                 pass
         return v
 
+# Raw column names (normalized) that identify a source row, in priority order
+ROW_ID_HINTS = (
+    "call_id",
+    "session_id",
+    "encounter_id",
+    "interaction_id",
+    "invoice_line_id",
+    "line_id",
+    "record_id",
+    "id",
+)
+
+
+def _row_id_value(val: Any) -> Optional[str]:
+    if val is None:
+        return None
+    sval = str(val).strip()
+    if sval and sval.lower() != "nan":
+        return sval
+    return None
+
+
+def row_identity(raw: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Source-row identifier (call/session/invoice id...) from a raw row dict, if any.
+    """
+    if not raw:
+        return None
+    normalized = {str(k).strip().lower(): v for k, v in raw.items()}
+    for hint in ROW_ID_HINTS:
+        if hint in normalized:
+            sval = _row_id_value(normalized[hint])
+            if sval is not None:
+                return sval
+    return None
+
+
+def row_identities(df: pd.DataFrame, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    row_identity() for the rows of a frame (all rows, or the given positions).
+    The ID columns are looked up once per frame; a row falls back to the next
+    hint column when its value is blank.
+    """
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    out = np.full(len(rows), None, dtype=object)
+    # Later columns win when two names normalize the same way, as in a dict
+    by_name = {str(c).strip().lower(): j for j, c in enumerate(df.columns)}
+    hint_cols = [by_name[h] for h in ROW_ID_HINTS if h in by_name]
+    if not hint_cols or len(rows) == 0:
+        return out
+    values = df.iloc[rows, hint_cols].to_numpy(dtype=object)
+    for i, row in enumerate(values):
+        for val in row:
+            sval = _row_id_value(val)
+            if sval is not None:
+                out[i] = sval
+                break
+    return out
+
+
+class CanonicalBatch:
+    """
+    Columnar set of canonical records: one NumPy-backed column per CanonicalRecord
+    field, with categorical source_file, vendor, language and modality.
+
+    Agents work on whole columns through their *_batch entry points. Per-row
+    CanonicalRecord objects are only built on demand (indexing, iteration,
+    to_records()) for code that still expects them.
+
+    Source rows are not copied. Each row carries a lineage pointer
+    (file_id, sheet_id, row_index) into the cleaned sheet it came from, plus
+    sheet_row, its 1-based row in the original sheet where known. Raw values
+    are resolved through a sheet loader only when asked for (raw_rows(), or
+    IntakeAgent.raw_rows() for exported transactions). Cost and QA results
+    live in status columns.
+    """
+
+    CATEGORICAL = ("source_file", "vendor", "language", "modality")
+    STATUS = ("cost_status", "qa_status", "qa_issues", "qa_flags")
+    COST_NOTE = "Source file has no cost column"
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        files: Optional[List[str]] = None,
+        sheets: Optional[List[Tuple[int, str]]] = None
+    ):
+        self.frame = frame
+        self.files = files if files is not None else []  # file_id -> source path
+        self.sheets = sheets if sheets is not None else []  # sheet_id -> (file_id, sheet name)
+
+    # ------------------------------------------------------------ building
+
+    @classmethod
+    def empty(cls) -> "CanonicalBatch":
+        return cls.from_arrays(
+            source_file=[], vendor=[], date=[], language=[], modality=[],
+            minutes_billed=[], total_charge=[], rate_per_minute=[]
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        source_file: Union[str, Sequence[str]],
+        vendor: Union[str, Sequence[str]],
+        date: Sequence[Any],
+        language: Sequence[str],
+        modality: Sequence[str],
+        minutes_billed: Sequence[float],
+        total_charge: Sequence[float],
+        rate_per_minute: Sequence[float],
+        row_index: Optional[Sequence[int]] = None,
+        row_id: Optional[Sequence[Optional[str]]] = None,
+        source_path: Optional[str] = None,
+        sheet_name: Optional[str] = None,
+        sheet_row: Optional[Sequence[int]] = None
+    ) -> "CanonicalBatch":
+        """
+        Build a batch from column arrays. ``row_index`` gives each row's position
+        in sheet ``sheet_name`` of ``source_path`` (defaults to ``source_file``),
+        ``sheet_row`` its 1-based row number in the original sheet, if known.
+        NumPy arrays are adopted without a copy; the batch owns them afterwards.
+        """
+        n = len(language)
+        has_lineage = row_index is not None
+        frame = pd.DataFrame({
+            "source_file": _categorical(source_file, n),
+            "vendor": _categorical(vendor, n),
+            "date": _to_datetime64(date),
+            "timestamp_start": np.full(n, None, dtype=object),
+            "timestamp_end": np.full(n, None, dtype=object),
+            "language": pd.Categorical(np.asarray(language, dtype=object)),
+            "modality": pd.Categorical(np.asarray(modality, dtype=object)),
+            "minutes_billed": np.asarray(minutes_billed, dtype="float64"),
+            "calls_count": np.ones(n, dtype="int64"),
+            "total_charge": np.asarray(total_charge, dtype="float64"),
+            "rate_per_minute": np.asarray(rate_per_minute, dtype="float64"),
+            "confidence_score": np.ones(n, dtype="float64"),
+            "row_id": np.asarray(row_id, dtype=object) if row_id is not None else np.full(n, None, dtype=object),
+            "cost_status": pd.Categorical.from_codes(np.full(n, -1, dtype="int8"), ["FROM_FILE", "MISSING"]),
+            "qa_status": pd.Categorical.from_codes(np.full(n, -1, dtype="int8"), ["FLAGGED", "QUARANTINED"]),
+            "qa_issues": np.full(n, None, dtype=object),
+            "qa_flags": np.zeros(n, dtype="uint8"),  # QAgent issue bits
+            "file_id": np.full(n, 0 if has_lineage else -1, dtype="int32"),
+            "sheet_id": np.full(n, 0 if has_lineage else -1, dtype="int32"),
+            "row_index": np.asarray(row_index, dtype="int64") if has_lineage else np.full(n, -1, dtype="int64"),
+            "sheet_row": np.asarray(sheet_row, dtype="int64") if sheet_row is not None else np.full(n, -1, dtype="int64"),
+        }, copy=False)
+        if not has_lineage:
+            return cls(frame)
+        path = source_path or (source_file if isinstance(source_file, str) else "")
+        return cls(frame, [path], [(0, sheet_name or "")])
+
+    @classmethod
+    def from_records(cls, records: Sequence[CanonicalRecord]) -> "CanonicalBatch":
+        """
+        Columnar copy of existing CanonicalRecords. These have no lineage; their
+        raw_columns dicts are kept by reference in a ``raw_columns`` column.
+        """
+        records = list(records)
+        batch = cls.from_arrays(
+            source_file=[r.source_file for r in records],
+            vendor=[r.vendor for r in records],
+            date=[r.date for r in records],
+            language=[r.language for r in records],
+            modality=[r.modality for r in records],
+            minutes_billed=[r.minutes_billed for r in records],
+            total_charge=[r.total_charge for r in records],
+            rate_per_minute=[r.rate_per_minute for r in records],
+            row_id=[row_identity(r.raw_columns if isinstance(r.raw_columns, dict) else None) for r in records],
+        )
+        frame = batch.frame
+        frame["timestamp_start"] = _object_array([r.timestamp_start for r in records])
+        frame["timestamp_end"] = _object_array([r.timestamp_end for r in records])
+        frame["calls_count"] = np.array([r.calls_count for r in records], dtype="int64")
+        frame["confidence_score"] = np.array([r.confidence_score for r in records], dtype="float64")
+        frame["raw_columns"] = _object_array([r.raw_columns for r in records])
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Sequence["CanonicalBatch"]) -> "CanonicalBatch":
+        """Stack batches in order. Lineage ids are renumbered, categories unioned."""
+        batches = [b for b in batches if b is not None]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        file_ids: Dict[str, int] = {}
+        sheets: List[Tuple[int, str]] = []
+        sheet_ids: Dict[Tuple[int, str], int] = {}
+        with_raw = any("raw_columns" in b.frame.columns for b in batches)
+        frames = []
+        for b in batches:
+            file_map = np.array([file_ids.setdefault(path, len(file_ids)) for path in b.files] + [-1], dtype="int32")
+            sheet_map = []
+            for fid, name in b.sheets:
+                key = (int(file_map[fid]), name)
+                if key not in sheet_ids:
+                    sheet_ids[key] = len(sheets)
+                    sheets.append(key)
+                sheet_map.append(sheet_ids[key])
+            sheet_map = np.array(sheet_map + [-1], dtype="int32")
+
+            f = b.frame.copy(deep=False)
+            # -1 (no lineage) indexes the trailing -1 of each map
+            f["file_id"] = file_map[f["file_id"].to_numpy()]
+            f["sheet_id"] = sheet_map[f["sheet_id"].to_numpy()]
+            if with_raw and "raw_columns" not in f.columns:
+                f["raw_columns"] = np.full(len(f), None, dtype=object)
+            frames.append(f)
+
+        # Empty frames add no rows; leaving them out keeps pandas from weighing
+        # their all-NA columns when it picks the result dtypes
+        frame = pd.concat([f for f in frames if len(f)] or frames[:1], ignore_index=True)
+        for col in cls.CATEGORICAL + ("cost_status", "qa_status"):
+            frame[col] = union_categoricals([f[col] for f in frames], ignore_order=True)
+        return cls(frame, list(file_ids), sheets)
+
+    def take(self, rows: Union[np.ndarray, Sequence[Any]]) -> "CanonicalBatch":
+        """Rows selected by a boolean mask or by position, sharing lineage tables."""
+        rows = np.asarray(rows)
+        frame = self.frame[rows] if rows.dtype == bool else self.frame.iloc[rows]
+        return CanonicalBatch(frame.reset_index(drop=True), self.files, self.sheets)
+
+    # ------------------------------------------------------------- access
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __iter__(self) -> Iterator[CanonicalRecord]:
+        return iter(self.to_records())
+
+    def __getitem__(self, i: int) -> CanonicalRecord:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.take([i]).to_records()[0]
+
+    def to_records(self, loader: Optional[Callable[[str], Dict[str, pd.DataFrame]]] = None) -> List[CanonicalRecord]:
+        """
+        Materialize per-row CanonicalRecords (backward-compatible view).
+        raw_columns holds the status annotations, on top of the raw source row
+        when a sheet ``loader`` is given (see raw_rows()).
+        """
+        raws = self.raw_rows(loader) if loader is not None else self._attached_raw()
+        _annotate(raws, self.frame)
+        f = self.frame
+        dates = f["date"].to_numpy().astype("datetime64[D]").astype(object)
+        return [
+            CanonicalRecord(
+                source_file=source_file, vendor=vendor, date=date,
+                timestamp_start=ts_start, timestamp_end=ts_end,
+                language=language, modality=modality,
+                minutes_billed=minutes, calls_count=calls,
+                total_charge=charge, rate_per_minute=rate,
+                raw_columns=raw, confidence_score=conf,
+            )
+            for source_file, vendor, date, ts_start, ts_end, language, modality,
+                minutes, calls, charge, rate, raw, conf in zip(
+                f["source_file"].astype(object), f["vendor"].astype(object), dates,
+                f["timestamp_start"], f["timestamp_end"],
+                f["language"].astype(object), f["modality"].astype(object),
+                f["minutes_billed"].tolist(), f["calls_count"].tolist(),
+                f["total_charge"].tolist(), f["rate_per_minute"].tolist(),
+                raws, f["confidence_score"].tolist()
+            )
+        ]
+
+    def raw_rows(self, loader: Callable[[str], Dict[str, pd.DataFrame]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resolve each row's raw source values through its lineage pointer.
+        ``loader(path)`` returns a file's cleaned sheets ({sheet: DataFrame}), e.g.
+        IntakeAgent.load_clean_sheet, which serves them from the parsed-sheet cache.
+        Each file is loaded once. Rows without lineage get their attached raw dict.
+        """
+        out = self._attached_raw()
+        sheet_id = self.frame["sheet_id"].to_numpy()
+        row_index = self.frame["row_index"].to_numpy()
+        loaded: Dict[int, Dict[str, pd.DataFrame]] = {}
+        for sid in np.unique(sheet_id):
+            if sid < 0:
+                continue
+            fid, sheet = self.sheets[sid]
+            if fid not in loaded:
+                loaded[fid] = loader(self.files[fid])
+            df = loaded[fid].get(sheet)
+            if df is None:
+                continue
+            idx = np.flatnonzero(sheet_id == sid)
+            for i, raw in zip(idx, df.iloc[row_index[idx]].to_dict("records")):
+                out[i] = raw
+        return out
+
+    def date_strings(self) -> np.ndarray:
+        """ISO dates (YYYY-MM-DD), as str(record.date) would give."""
+        return np.datetime_as_string(self.frame["date"].to_numpy().astype("datetime64[D]"))
+
+    def months(self) -> np.ndarray:
+        """YYYY-MM buckets, as record.date.strftime("%Y-%m") would give."""
+        return np.datetime_as_string(self.frame["date"].to_numpy().astype("datetime64[M]"))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Transaction export: canonical fields, lineage and status columns. Dates
+        are YYYY-MM-DD strings. Lineage is the sheet name, source_row (0-based
+        row of the cleaned sheet, which IntakeAgent.raw_rows() resolves) and
+        source_sheet_row (1-based row of the original sheet, or CSV line).
+        """
+        f = self.frame
+        sheet_names = np.array([name for _, name in self.sheets] + [None], dtype=object)
+        issues = f["qa_issues"].to_numpy()
+        return pd.DataFrame({
+            "source_file": f["source_file"].astype(object),
+            "vendor": f["vendor"].astype(object),
+            "date": self.date_strings().astype(object),
+            "timestamp_start": f["timestamp_start"],
+            "timestamp_end": f["timestamp_end"],
+            "language": f["language"].astype(object),
+            "modality": f["modality"].astype(object),
+            "minutes_billed": f["minutes_billed"],
+            "calls_count": f["calls_count"],
+            "total_charge": f["total_charge"],
+            "rate_per_minute": f["rate_per_minute"],
+            "confidence_score": f["confidence_score"],
+            "source_sheet": sheet_names[f["sheet_id"].to_numpy()],
+            "source_row": f["row_index"].astype("Int64").mask(f["row_index"] < 0),
+            "source_sheet_row": f["sheet_row"].astype("Int64").mask(f["sheet_row"] < 0),
+            "cost_status": f["cost_status"],
+            "qa_status": f["qa_status"],
+            "qa_issues": ["; ".join(v) if v else None for v in issues],
+        }, index=f.index)
+
+    def _attached_raw(self) -> List[Optional[Dict[str, Any]]]:
+        if "raw_columns" not in self.frame.columns:
+            return [None] * len(self.frame)
+        return [dict(raw) if isinstance(raw, dict) else None for raw in self.frame["raw_columns"]]
+
+
+def _annotate(raws: List[Optional[Dict[str, Any]]], frame: pd.DataFrame) -> None:
+    """Fold status columns into raw_columns dicts the way agents used to write them."""
+    cost = frame["cost_status"].astype(object).to_numpy()
+    qa_status = frame["qa_status"].astype(object).to_numpy()
+    qa_issues = frame["qa_issues"].to_numpy()
+    for i in np.flatnonzero(frame["cost_status"].notna().to_numpy() | frame["qa_issues"].notna().to_numpy()):
+        raw = raws[i] if raws[i] is not None else {}
+        if isinstance(cost[i], str):
+            raw["_cost_status"] = cost[i]
+            if cost[i] == "MISSING":
+                raw["_cost_note"] = CanonicalBatch.COST_NOTE
+        if qa_issues[i] is not None:
+            raw["_qa_issues"] = qa_issues[i]
+            raw["_qa_status"] = qa_status[i]
+        raws[i] = raw
+
+
+def _categorical(values: Union[str, Sequence[str]], n: int) -> pd.Categorical:
+    if isinstance(values, str):
+        return pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[values])
+    return pd.Categorical(np.asarray(values, dtype=object))
+
+
+def _object_array(values: Sequence[Any]) -> np.ndarray:
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def _to_datetime64(values: Sequence[Any]) -> np.ndarray:
+    """Calendar dates (date/datetime objects or datetime64) at second resolution."""
+    arr = values if isinstance(values, np.ndarray) else _object_array(values)
+    if arr.dtype == object:
+        arr = np.array([v.date() if isinstance(v, datetime.datetime) else v for v in arr], dtype="datetime64[D]")
+    return arr.astype("datetime64[D]").astype("datetime64[s]")
+
+
 # Define the expected fields for the Schema Mapper target
 CANONICAL_FIELDS = {
     "date": ["date", "call date", "invoice date", "service date", "job date", "start date", "year-month", "month", "period"],
@@ -0,0 +1,130 @@
+"""
+Similarity index over registered column layouts.
+
+A layout is reduced to the set of tokens in its cleaned headers, so an added,
+renamed or reordered column changes only a few tokens. Layouts are partitioned
+by vendor, and each partition keeps an inverted index from token to layout.
+A lookup counts shared tokens for every layout at once (one bincount over the
+query tokens' posting lists) and scores only the layouts sharing a token, which
+gives their exact token-set Jaccard similarity without visiting the rest (see
+benchmarks/bench_column_index.py).
+MinHash/LSH was considered; a vendor's layouts share most of their tokens, so
+LSH buckets would hold most of the partition anyway and add false negatives.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token: str) -> str:
+    # "charges" ~ "charge", "minutes" ~ "minute"
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def header_tokens(columns: Iterable) -> FrozenSet[str]:
+    """Lowercase word tokens of all headers ("Total Charges ($)" -> total, charge)."""
+    tokens: Set[str] = set()
+    for col in columns:
+        tokens.update(_stem(t) for t in TOKEN_RE.findall(str(col).strip().lower()))
+    return frozenset(tokens)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _Partition:
+    """One vendor's layouts: slot ids in insertion order and token posting lists."""
+
+    def __init__(self):
+        self.keys: List[Optional[str]] = []  # None once removed
+        self.sizes: List[int] = []
+        self.slot: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def posting(self, token: str) -> Optional[np.ndarray]:
+        ids = self.postings.get(token)
+        if ids is None:
+            return None
+        arr = self._arrays.get(token)
+        if arr is None or len(arr) != len(ids):
+            arr = self._arrays[token] = np.asarray(ids, dtype=np.int64)
+        return arr
+
+
+class ColumnSetIndex:
+    """Nearest registered layouts of a vendor by token-set Jaccard similarity."""
+
+    def __init__(self):
+        self._partitions: Dict[str, _Partition] = {}
+        self._vendor_of: Dict[str, str] = {}
+        self.scored = 0  # layouts scored by query() so far
+
+    def __len__(self) -> int:
+        return len(self._vendor_of)
+
+    def add(self, key: str, vendor: str, columns: Iterable) -> None:
+        """Index (or re-index) the layout stored under `key`."""
+        self.remove(key)
+        part = self._partitions.setdefault(vendor, _Partition())
+        tokens = header_tokens(columns)
+        slot = len(part.keys)
+        part.keys.append(key)
+        part.sizes.append(len(tokens))
+        part.slot[key] = slot
+        for token in tokens:
+            part.postings.setdefault(token, []).append(slot)
+        self._vendor_of[key] = vendor
+
+    def remove(self, key: str) -> None:
+        # The slot stays in the posting lists but no longer resolves to a key
+        vendor = self._vendor_of.pop(key, None)
+        if vendor is None:
+            return
+        part = self._partitions[vendor]
+        part.keys[part.slot.pop(key)] = None
+
+    def query(
+        self,
+        vendor: str,
+        columns: Iterable,
+        min_similarity: float = 0.0,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        (key, similarity) of the vendor's layouts sharing at least one header token,
+        most similar first (ties in insertion order). Layouts with no token in
+        common have similarity 0 and are not scored.
+        """
+        part = self._partitions.get(vendor)
+        if part is None or not part.slot:
+            return []
+        tokens = header_tokens(columns)
+        postings = [arr for arr in (part.posting(t) for t in tokens) if arr is not None]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(part.keys))
+        slots = np.flatnonzero(shared)
+        shared = shared[slots]
+        union = len(tokens) + np.asarray(part.sizes, dtype=np.int64)[slots] - shared
+        similarity = shared / union
+        self.scored += len(slots)
+
+        order = np.argsort(-similarity, kind="stable")
+        order = order[similarity[order] >= min_similarity]
+        found = []
+        for i in order:
+            key = part.keys[slots[i]]
+            if key is None:
+                continue
+            found.append((key, float(similarity[i])))
+            if limit is not None and len(found) >= limit:
+                break
+        return found
@@ -0,0 +1,135 @@
+"""
+Per-column parse results shared by the SchemaAgent phases.
+
+Heuristic mapping, pruning, assess_mapping() and the cross-field checks all
+look at the same columns: type inference, date parsing and numeric parsing of
+the same values. A ColumnProfile holds those results for one column slice,
+computed on first use. Profiles are cached by column label plus a fingerprint
+of the slice: its length, dtype and a fixed sample of its rows (head, tail and
+evenly strided rows, values and index). A phase handed another DataFrame object
+with the same rows (e.g. a pooled sample rebuilt by the pipeline) reuses them,
+and a lookup costs the same on a column of any length. Slices that differ only
+outside the sampled rows share an entry; within one mapping run the phases see
+the same rows, so that does not arise.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Rows of a column slice that go into its fingerprint
+FINGERPRINT_HEAD = 32
+FINGERPRINT_TAIL = 32
+FINGERPRINT_STRIDED = 64
+
+# How numeric columns are cleaned before pd.to_numeric, by kind
+NUMERIC_CLEANERS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    "amount": lambda s: s.str.replace(r'[\$,]', '', regex=True),
+    "count": lambda s: s.str.replace(',', '', regex=False),
+    "minutes": lambda s: (
+        s.str.replace(',', '', regex=False)
+        .str.replace(r'\s*min(utes?)?\s*$', '', regex=True, flags=re.IGNORECASE)
+    ),
+}
+
+
+class ColumnProfile:
+    """Lazily parsed views of one column slice; parsed series keep its index (NaN rows included)."""
+
+    def __init__(self, values: pd.Series):
+        self.values = values
+        self.non_null = values.dropna()
+        self._types: Dict[int, Dict[str, Any]] = {}
+        self._dates: Optional[pd.Series] = None
+        self._numbers: Dict[str, pd.Series] = {}
+
+    def type_scores(self, engine) -> Dict[str, Any]:
+        """TypeInferenceEngine.analyze_column() result for this column."""
+        return score_types([self], engine)[0]
+
+    def dates(self, parse: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        """Values parsed as datetimes (NaT where unparseable)."""
+        if self._dates is None:
+            self._dates = parse(self.values)
+        return self._dates
+
+    def numbers(self, kind: str) -> pd.Series:
+        """Values cleaned as NUMERIC_CLEANERS[kind] and parsed as numbers (NaN where unparseable)."""
+        parsed = self._numbers.get(kind)
+        if parsed is None:
+            cleaned = NUMERIC_CLEANERS[kind](self.values.astype(str))
+            parsed = self._numbers[kind] = pd.to_numeric(cleaned, errors="coerce")
+        return parsed
+
+
+def score_types(profiles: List[ColumnProfile], engine) -> List[Dict[str, Any]]:
+    """type_scores() of several profiles; the ones not scored yet go to the engine in one batch."""
+    pending = [p for p in profiles if engine.sample_size not in p._types]
+    if pending:
+        for profile, result in zip(pending, engine.analyze_columns([p.values for p in pending])):
+            profile._types[engine.sample_size] = result
+    return [p._types[engine.sample_size] for p in profiles]
+
+
+def sample_positions(n: int) -> np.ndarray:
+    """Row positions fingerprinted in a slice of n rows: head, tail and evenly strided rows."""
+    if n <= FINGERPRINT_HEAD + FINGERPRINT_TAIL + FINGERPRINT_STRIDED:
+        return np.arange(n)
+    return np.unique(np.concatenate([
+        np.arange(FINGERPRINT_HEAD),
+        np.linspace(0, n - 1, FINGERPRINT_STRIDED).astype(np.int64),
+        np.arange(n - FINGERPRINT_TAIL, n),
+    ]))
+
+
+def fingerprint(values: pd.Series) -> Optional[str]:
+    """Digest of a column slice's length, dtype and sampled rows (values and index); None if it cannot be hashed."""
+    try:
+        hashed = pd.util.hash_pandas_object(values.iloc[sample_positions(len(values))], index=True)
+    except (TypeError, ValueError):
+        return None
+    digest = hashlib.blake2b(hashed.to_numpy().tobytes(), digest_size=16)
+    digest.update(f"{len(values)}:{values.dtype}".encode())
+    return digest.hexdigest()
+
+
+class ColumnProfileCache:
+    """Bounded LRU of ColumnProfiles keyed by (column label, rows, fingerprint)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, Optional[int], str], ColumnProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, df: pd.DataFrame, column: Hashable, rows: Optional[int] = None) -> ColumnProfile:
+        """Profile of df[column] (its first `rows` rows when given)."""
+        if rows is not None and rows >= len(df):
+            rows = None  # the head is the whole column
+        values = df[column] if rows is None else df[column].head(rows)
+        digest = fingerprint(values) if isinstance(values, pd.Series) else None
+        if digest is None:
+            return ColumnProfile(values)
+
+        key = (column, rows, digest)
+        with self._lock:
+            profile = self._entries.get(key)
+            if profile is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return profile
+            self.misses += 1
+            profile = self._entries[key] = ColumnProfile(values)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return profile
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -38,6 +38,11 @@ def get_schema_config() -> Dict[str, Any]:
             "min_field_confidence": 0.6,
             "require_overall_ok": True,
             "min_overall_confidence": 0.65
+        },
+        "mapping_tiers": {
+            "fuzzy_registry": True,
+            "fuzzy_min_similarity": 0.75,
+            "heuristic_accept_confidence": 0.75
         }
     }
     cfg_path = _repo_root() / "config" / "schema_config.json"
@@ -46,3 +51,49 @@ def get_schema_config() -> Dict[str, Any]:
         return defaults
     merged = {**defaults, **overrides}
     return merged
+
+
+def get_cache_config() -> Dict[str, Any]:
+    defaults = {
+        "sheet_cache": {
+            "enabled": True,
+            "max_bytes": 2 * 1024 ** 3
+        },
+        "ai_cache": {
+            "enabled": True,
+            "mode": "readwrite",
+            "ttl_seconds": 30 * 24 * 3600,
+            "max_bytes": 256 * 1024 ** 2
+        }
+    }
+    cfg_path = _repo_root() / "config" / "cache_config.json"
+    overrides = _load_json(cfg_path)
+    if not isinstance(overrides, dict):
+        return defaults
+    merged = {**defaults, **overrides}
+    # Section-level merge so a partial override keeps the remaining defaults
+    for section, values in defaults.items():
+        if isinstance(overrides.get(section), dict):
+            merged[section] = {**values, **overrides[section]}
+    return merged
+
+
+def get_ai_config() -> Dict[str, Any]:
+    defaults = {
+        "max_in_flight": 4,
+        "requests_per_second": 5.0,
+        "burst": 5,
+        "timeout_seconds": 30,
+        "deadline_seconds": 120,
+        "max_retries": 4,
+        "backoff_base_seconds": 0.5,
+        "backoff_max_seconds": 20,
+        "breaker_failures": 5,
+        "breaker_cooldown_seconds": 60
+    }
+    cfg_path = _repo_root() / "config" / "ai_config.json"
+    overrides = _load_json(cfg_path)
+    if not isinstance(overrides, dict):
+        return defaults
+    merged = {**defaults, **overrides}
+    return merged
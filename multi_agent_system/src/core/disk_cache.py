@@ -0,0 +1,95 @@
+"""
+Size-capped on-disk cache directory with least-recently-used eviction.
+
+Entries are plain files. A file's modification time doubles as its last access
+time (it is touched on every hit), so eviction needs no separate index and
+several processes can share the directory.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+class DiskLRU:
+    """Directory of cache files bounded by total size."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str, suffix: str = "") -> Path:
+        """Location for a key, sharded by its first two characters."""
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def touch(self, path: Path) -> None:
+        """Mark an entry as recently used."""
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        """Write atomically: readers never see a half-written entry."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def read_bytes(self, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        self.touch(path)
+        return data
+
+    def total_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self, protect: Iterable[Path] = ()) -> int:
+        """
+        Delete least recently used entries until the directory fits the cap.
+        Returns the number of bytes freed.
+        """
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        if total <= self.max_bytes:
+            return 0
+        keep = {Path(p) for p in protect}
+        freed = 0
+        for mtime, path, size in sorted(entries, key=lambda e: e[0]):
+            if total - freed <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                path.unlink()
+                freed += size
+            except OSError:
+                continue
+        return freed
+
+    def _entries(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith(".tmp-"):
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        return entries
@@ -0,0 +1,335 @@
+"""
+SQLite store behind agent memory.
+
+Each JSON document that used to be a file in agent_memory/ (mapping registry,
+intake classifications, correction history, ...) is a namespace in
+``memory.db`` next to it, stored one row per entry:
+
+- a dict document has one row per top-level key; a list value is stored as an
+  empty-list row plus one row per item, so appending a correction adds a row;
+- a list document has one row per item.
+
+Saving writes only the rows that changed since the document was last loaded or
+saved by this process, in one transaction, so the cost of a save follows the
+size of the change rather than the size of the document, and rows another
+process added meanwhile survive. ``merge`` upserts single entries and
+``update`` is an atomic read-modify-write; SQLite's write lock (BEGIN
+IMMEDIATE) serializes writers across processes. Rows carry the entry's
+``vendor`` and ``columns_signature`` (indexed) for lookups without loading the
+whole document. The database runs in WAL mode, so readers do not block writers.
+
+A document's JSON file is imported the first time its namespace is read and
+then renamed to ``<name>.json.migrated``.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DB_NAME = "memory.db"
+ITEM_SEP = "\x1f"  # separates a list key from the item index in a row key
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    namespace TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    migrated_from TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    vendor TEXT,
+    signature TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_vendor ON entries(namespace, vendor);
+CREATE INDEX IF NOT EXISTS idx_entries_signature ON entries(namespace, signature);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def encode_document(data: Any) -> Tuple[str, Dict[str, Any]]:
+    """(kind, {row key: value}) for a JSON document, in document order."""
+    rows: Dict[str, Any] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            key = str(key)
+            if isinstance(value, list):
+                rows[key] = []
+                for i, item in enumerate(value):
+                    rows[f"{key}{ITEM_SEP}{i:08d}"] = item
+            else:
+                rows[key] = value
+        return "dict", rows
+    if isinstance(data, list):
+        return "list", {f"{i:08d}": item for i, item in enumerate(data)}
+    return "value", {"": data}
+
+
+def decode_document(kind: str, rows: List[Tuple[str, Any]]) -> Any:
+    """Inverse of encode_document; `rows` are (key, value) in seq order."""
+    if kind == "list":
+        return [value for _, value in sorted(rows, key=lambda r: r[0])]
+    if kind == "value":
+        return rows[0][1] if rows else None
+    doc: Dict[str, Any] = {}
+    items: Dict[str, List[Tuple[str, Any]]] = {}
+    for key, value in rows:
+        if ITEM_SEP in key:
+            parent, index = key.split(ITEM_SEP, 1)
+            items.setdefault(parent, []).append((index, value))
+        else:
+            doc[key] = value
+    for parent, values in items.items():
+        if isinstance(doc.get(parent), list):
+            doc[parent] = [value for _, value in sorted(values, key=lambda r: r[0])]
+    return doc
+
+
+class MemoryDB:
+    """One memory.db file: JSON documents stored row by row."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Serialized rows as last loaded/saved here, per namespace: the base of the next diff
+        self._snapshots: Dict[str, Dict[str, str]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork (pool workers)
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+            self._snapshots = {}
+        return self._conn
+
+    def _transaction(self):
+        conn = self._connect()
+        return _Transaction(conn)
+
+    def load(self, namespace: str, default: Any, legacy_path: Optional[Path] = None) -> Any:
+        """The document in `namespace`, importing `legacy_path` the first time."""
+        with self._lock:
+            self._ensure_migrated(namespace, legacy_path)
+            kind, rows = self._read(self._connect(), namespace)
+            if kind is None:
+                return default
+            self._snapshots[namespace] = dict(rows)
+            return decode_document(kind, [(key, json.loads(value)) for key, value in rows])
+
+    def save(self, namespace: str, data: Any, legacy_path: Optional[Path] = None) -> int:
+        """
+        Store a document, writing only rows that changed since this process last
+        loaded or saved it; rows other processes added meanwhile are kept.
+        Returns the number of rows written or deleted.
+        """
+        with self._lock:
+            self._ensure_migrated(namespace, legacy_path)
+            with self._transaction() as conn:
+                base = self._snapshots.get(namespace)
+                if base is None:
+                    base = dict(self._read(conn, namespace)[1])
+                kind, rows = encode_document(data)
+                self._set_kind(conn, namespace, kind)
+                written = self._write(conn, namespace, rows, base)
+            self._snapshots[namespace] = {key: _dumps(value) for key, value in rows.items()}
+            return written
+
+    def merge(self, namespace: str, entries: Dict[str, Any], legacy_path: Optional[Path] = None) -> int:
+        """
+        Add or replace top-level entries of a dict document without reading or
+        rewriting the rest of it. Concurrent merges of different keys never
+        lose each other's entries.
+        """
+        with self._lock:
+            self._ensure_migrated(namespace, legacy_path)
+            _, rows = encode_document(entries)
+            with self._transaction() as conn:
+                base: Dict[str, str] = {}
+                for key in entries:
+                    key = str(key)
+                    base.update(conn.execute(
+                        "SELECT key, value FROM entries WHERE namespace = ? AND (key = ? OR (key >= ? AND key < ?))",
+                        (namespace, key, key + ITEM_SEP, key + chr(ord(ITEM_SEP) + 1))
+                    ).fetchall())
+                self._set_kind(conn, namespace, "dict", replace=False)
+                # The snapshot is left alone: a later save of a copy that lacks
+                # these entries must not read that as a deletion
+                return self._write(conn, namespace, rows, base)
+
+    def update(self, namespace: str, default: Any, apply: Callable[[Any], Any],
+               legacy_path: Optional[Path] = None) -> Any:
+        """
+        Atomic read-modify-write: `apply` receives the stored document (a copy
+        of `default` if there is none) inside a write transaction and returns
+        the new document, or None after changing it in place. Returns the
+        document as stored.
+        """
+        with self._lock:
+            self._ensure_migrated(namespace, legacy_path)
+            with self._transaction() as conn:
+                kind, current = self._read(conn, namespace)
+                if kind is None:
+                    doc = copy.deepcopy(default)
+                else:
+                    doc = decode_document(kind, [(key, json.loads(value)) for key, value in current])
+                result = apply(doc)
+                if result is None:
+                    result = doc
+                kind, rows = encode_document(result)
+                self._set_kind(conn, namespace, kind)
+                self._write(conn, namespace, rows, dict(current))
+            self._snapshots[namespace] = {key: _dumps(value) for key, value in rows.items()}
+            return result
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection, namespace: str) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+        row = conn.execute("SELECT kind FROM documents WHERE namespace = ?", (namespace,)).fetchone()
+        if row is None:
+            return None, []
+        rows = conn.execute(
+            "SELECT key, value FROM entries WHERE namespace = ? ORDER BY seq, key", (namespace,)
+        ).fetchall()
+        return row[0], rows
+
+    @staticmethod
+    def _set_kind(conn: sqlite3.Connection, namespace: str, kind: str, replace: bool = True) -> None:
+        conflict = "DO UPDATE SET kind = excluded.kind" if replace else "DO NOTHING"
+        conn.execute(
+            f"INSERT INTO documents (namespace, kind) VALUES (?, ?) ON CONFLICT(namespace) {conflict}",
+            (namespace, kind)
+        )
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, namespace: str, rows: Dict[str, Any], base: Dict[str, str]) -> int:
+        """Make the `base` rows of a namespace look like `rows`; other rows are untouched."""
+        encoded = {key: _dumps(value) for key, value in rows.items()}
+        removed = [key for key in base if key not in encoded]
+        conn.executemany(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?",
+            [(namespace, key) for key in removed]
+        )
+        changed = [key for key, text in encoded.items() if base.get(key) != text]
+        if changed:
+            next_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM entries WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+            now = time.time()
+            params = []
+            for offset, key in enumerate(changed):
+                vendor, signature = _index_fields(rows[key])
+                params.append((namespace, key, next_seq + offset, encoded[key], vendor, signature, now))
+            # An updated row keeps its seq, so documents keep their order
+            conn.executemany(
+                "INSERT INTO entries (namespace, key, seq, value, vendor, signature, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, "
+                "vendor = excluded.vendor, signature = excluded.signature, updated = excluded.updated",
+                params
+            )
+        return len(removed) + len(changed)
+
+    def find(self, namespace: str, vendor: Optional[str] = None, signature: Optional[str] = None) -> Dict[str, Any]:
+        """Entries of a namespace by vendor and/or column signature (indexed), keyed by row key."""
+        clauses, params = ["namespace = ?"], [namespace]
+        if vendor is not None:
+            clauses.append("vendor = ?")
+            params.append(vendor)
+        if signature is not None:
+            clauses.append("signature = ?")
+            params.append(signature)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT key, value FROM entries WHERE {' AND '.join(clauses)} ORDER BY seq, key", params
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def digest(self) -> str:
+        """SHA-256 of every stored document's kind and rows; write order and times do not count."""
+        h = hashlib.sha256()
+        with self._lock:
+            conn = self._connect()
+            for row in conn.execute("SELECT namespace, kind FROM documents ORDER BY namespace"):
+                h.update(_dumps(list(row)).encode("utf-8"))
+            for row in conn.execute("SELECT namespace, key, value FROM entries ORDER BY namespace, key"):
+                h.update(_dumps(list(row)).encode("utf-8"))
+        return h.hexdigest()
+
+    def _ensure_migrated(self, namespace: str, legacy_path: Optional[Path]) -> None:
+        """Import the document's JSON file once, then rename it out of the way."""
+        if legacy_path is None or namespace in self._snapshots or not legacy_path.exists():
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return  # unreadable: leave the file alone, callers get their default
+        with self._transaction() as conn:
+            # Another process may have migrated it meanwhile
+            if conn.execute("SELECT 1 FROM documents WHERE namespace = ?", (namespace,)).fetchone() is None:
+                kind, rows = encode_document(data)
+                self._set_kind(conn, namespace, kind)
+                self._write(conn, namespace, rows, {})
+                conn.execute(
+                    "UPDATE documents SET migrated_from = ? WHERE namespace = ?", (str(legacy_path), namespace)
+                )
+        try:
+            legacy_path.replace(legacy_path.with_name(legacy_path.name + ".migrated"))
+        except OSError:
+            pass
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *exc) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _index_fields(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    if not isinstance(value, dict):
+        return None, None
+    vendor, signature = value.get("vendor"), value.get("columns_signature")
+    return (
+        str(vendor) if vendor is not None else None,
+        str(signature) if signature is not None else None
+    )
+
+
+_dbs: Dict[str, MemoryDB] = {}
+_dbs_lock = threading.Lock()
+
+
+def get_memory_db(directory: Path) -> MemoryDB:
+    """Shared MemoryDB for the memory.db in `directory`."""
+    path = Path(directory).resolve() / DB_NAME
+    with _dbs_lock:
+        db = _dbs.get(str(path))
+        if db is None:
+            db = _dbs[str(path)] = MemoryDB(path)
+        return db
@@ -1,6 +1,34 @@
+"""
+Agent memory: learned mappings, classifications, corrections and labels.
+
+load_json/save_json keep their file-like signatures, but a document at
+``<dir>/<name>.json`` lives in the SQLite store ``<dir>/memory.db`` under
+namespace ``<name>`` (see core.memory_db). Saves write only the entries that
+changed; an existing JSON file is imported on first load.
+
+Several pipelines and the dashboard may share one agent_memory/. Writers that
+add entries use merge_json (per-entry upsert) or update_json (atomic
+read-modify-write) so concurrent runs do not overwrite each other. If SQLite
+is unusable (e.g. WAL on a network filesystem) the documents fall back to JSON
+files, written to a temp file and renamed under an advisory lock.
+"""
+
+import contextlib
+import copy
+import hashlib
 import json
+import os
+import sqlite3
+import tempfile
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from core.memory_db import DB_NAME, get_memory_db
+
+try:
+    import fcntl
+except ImportError:  # Windows: rename is still atomic, locking is skipped
+    fcntl = None
 
 
 def get_repo_root() -> Path:
@@ -8,12 +36,45 @@ def get_repo_root() -> Path:
 
 
 def ensure_memory_dir() -> Path:
-    mem_dir = get_repo_root() / "agent_memory"
-    mem_dir.mkdir(exist_ok=True)
+    """agent_memory/ in the repo root, or the directory named by AGENT_MEMORY_DIR."""
+    mem_dir = Path(os.getenv("AGENT_MEMORY_DIR") or get_repo_root() / "agent_memory")
+    mem_dir.mkdir(parents=True, exist_ok=True)
     return mem_dir
 
 
-def load_json(path: Path, default: Any) -> Any:
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Exclusive advisory lock on ``<path>.lock``, held for the block."""
+    lock_path = Path(path).with_name(Path(path).name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(path: Path, data: Any) -> None:
+    """Write JSON to a temp file and rename it over `path`: readers never see a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def _read_file(path: Path, default: Any) -> Any:
     if not path.exists():
         return default
     try:
@@ -23,7 +84,87 @@ def load_json(path: Path, default: Any) -> Any:
         return default
 
 
+def _fallback(path: Path, error: Exception) -> None:
+    print(f"Warning: Agent memory store unavailable ({error}); using {path.name} directly")
+
+
+def load_json(path: Path, default: Any) -> Any:
+    path = Path(path)
+    try:
+        return get_memory_db(path.parent).load(path.stem, default, legacy_path=path)
+    except sqlite3.Error as e:
+        _fallback(path, e)
+    return _read_file(path, default)
+
+
 def save_json(path: Path, data: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    path = Path(path)
+    try:
+        get_memory_db(path.parent).save(path.stem, data, legacy_path=path)
+        return
+    except sqlite3.Error as e:
+        _fallback(path, e)
+    with file_lock(path):
+        atomic_write_json(path, data)
+
+
+def update_json(path: Path, default: Any, apply: Callable[[Any], Any]) -> Any:
+    """
+    Read-modify-write a document atomically with respect to other processes.
+    `apply` gets the stored document (or a copy of `default`) and returns the
+    new one, or None after changing it in place. Returns the stored document.
+    """
+    path = Path(path)
+    try:
+        return get_memory_db(path.parent).update(path.stem, default, apply, legacy_path=path)
+    except sqlite3.Error as e:
+        _fallback(path, e)
+    return _update_file(path, default, apply)
+
+
+def merge_json(path: Path, entries: Dict[str, Any]) -> None:
+    """Add or replace top-level entries of a dict document, keeping everything else stored."""
+    path = Path(path)
+    try:
+        get_memory_db(path.parent).merge(path.stem, entries, legacy_path=path)
+        return
+    except sqlite3.Error as e:
+        _fallback(path, e)
+
+    def _merge(doc):
+        doc = doc if isinstance(doc, dict) else {}
+        doc.update(entries)
+        return doc
+
+    _update_file(path, {}, _merge)
+
+
+def _update_file(path: Path, default: Any, apply: Callable[[Any], Any]) -> Any:
+    with file_lock(path):
+        doc = _read_file(path, copy.deepcopy(default))
+        result = apply(doc)
+        if result is None:
+            result = doc
+        atomic_write_json(path, result)
+    return result
+
+
+def memory_digest(directory: Optional[Path] = None) -> str:
+    """
+    SHA-256 of the agent memory documents in `directory` (agent_memory/ by
+    default): the rows of memory.db plus any JSON documents not migrated yet
+    or written by the fallback. The sheet, AI and aggregate caches are not
+    documents and do not count.
+    """
+    directory = Path(directory) if directory is not None else ensure_memory_dir()
+    h = hashlib.sha256()
+    if (directory / DB_NAME).exists():
+        try:
+            h.update(get_memory_db(directory).digest().encode("utf-8"))
+        except sqlite3.Error as e:
+            h.update(f"unavailable: {e}".encode("utf-8"))
+    for path in sorted(directory.glob("*.json")):
+        h.update(path.name.encode("utf-8"))
+        with contextlib.suppress(OSError):
+            h.update(path.read_bytes())
+    return h.hexdigest()
@@ -0,0 +1,185 @@
+"""
+Run-level memoization keyed by an input fingerprint.
+
+What a run produces is determined by its input files, the configuration in
+config/ (agent_config.json included), the pipeline code, the agent memory it
+starts from (learned mappings, classifications, corrections, labels) and the
+options that change what is computed (streaming, incremental, AI on or off).
+run_fingerprint() digests all of them. Caches that only save work (parsed
+sheets, AI responses) are left out, and so is the input directory's path, so
+the same files uploaded to the dashboard match a CLI run.
+
+Each client's out/<client>/run_index.json maps fingerprints to the run
+directory that produced them. A run whose fingerprint is indexed, and whose
+earlier run is still complete on disk, hard-links that run's artifacts into
+its own directory (copying where links are not possible) and writes a manifest
+pointing back at it instead of running the agents again.
+
+Memory is fingerprinted as it is before the run. A run that teaches the agents
+something (a new mapping, say) leaves memory changed, so the run is indexed
+under a second fingerprint too (final_fingerprint in its manifest), computed
+from the memory as it leaves it: an identical next run, which starts from that
+memory, is reused.
+"""
+
+import contextlib
+import datetime
+import functools
+import hashlib
+import json
+import os
+import platform
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.memory_store import atomic_write_json, file_lock, get_repo_root, memory_digest
+from core.sheet_cache import file_digest
+
+# Bump when fingerprints would be computed from different parts
+FINGERPRINT_VERSION = 1
+INDEX_NAME = "run_index.json"
+
+
+@functools.lru_cache(maxsize=1)
+def code_version() -> str:
+    """SHA-256 over the pipeline's Python sources (multi_agent_system/)."""
+    root = get_repo_root() / "multi_agent_system"
+    h = hashlib.sha256()
+    for path in sorted(root.rglob("*.py")):
+        if "__pycache__" in path.parts:
+            continue
+        h.update(path.relative_to(root).as_posix().encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def config_digests() -> Dict[str, str]:
+    """SHA-256 of each config/*.json, plus the agents' cwd-relative agent_config.json if it is elsewhere."""
+    config_dir = get_repo_root() / "config"
+    digests = {path.name: file_digest(str(path)) for path in sorted(config_dir.glob("*.json"))}
+    agent_config = Path("config/agent_config.json").resolve()
+    if agent_config.exists() and agent_config.parent != config_dir.resolve():
+        digests[str(agent_config)] = file_digest(str(agent_config))
+    return digests
+
+
+def run_fingerprint(files: Iterable[str], options: Optional[Dict[str, Any]] = None) -> str:
+    """Fingerprint of a run over `files` with `options`, from the current config, code and memory."""
+    doc = {
+        "version": FINGERPRINT_VERSION,
+        "inputs": sorted((os.path.basename(f), file_digest(f)) for f in files),
+        "config": config_digests(),
+        "code": code_version(),
+        "packages": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "memory": memory_digest(),
+        "options": options or {},
+    }
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def read_manifest(run_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(Path(run_dir) / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+
+def _link(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Another filesystem, or links not supported
+        shutil.copy2(src, dst)
+
+
+class RunIndex:
+    """Fingerprint -> run directory, for the runs of one client (out/<client>/)."""
+
+    def __init__(self, client_dir: Path):
+        self.client_dir = Path(client_dir)
+
+    @property
+    def path(self) -> Path:
+        return self.client_dir / INDEX_NAME
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if not isinstance(index, dict) or index.get("version") != FINGERPRINT_VERSION:
+            return {"version": FINGERPRINT_VERSION, "runs": {}}
+        return index
+
+    def lookup(self, fingerprint: str) -> Optional[Path]:
+        """The run directory recorded for `fingerprint`, if that run is complete and its outputs all exist."""
+        entry = self._load()["runs"].get(fingerprint)
+        if not entry:
+            return None
+        run_dir = self.client_dir / entry["run"]
+        manifest = read_manifest(run_dir)
+        if (
+            manifest is None
+            or manifest.get("status") != "COMPLETE"
+            or fingerprint not in (manifest.get("fingerprint"), manifest.get("final_fingerprint"))
+            or not all((run_dir / name).is_file() for name in manifest.get("outputs", {}).values())
+        ):
+            return None
+        return run_dir
+
+    def record(self, fingerprint: str, run_dir: Path) -> None:
+        """Index a completed run; entries whose run directories are gone are dropped."""
+        self.client_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path):
+            index = self._load()
+            index["runs"] = {
+                fp: entry for fp, entry in index["runs"].items()
+                if (self.client_dir / entry["run"]).is_dir()
+            }
+            index["runs"][fingerprint] = {
+                "run": Path(run_dir).name,
+                "recorded": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            atomic_write_json(self.path, index)
+
+
+def find_run(out_dir: Path, fingerprint: str) -> Optional[Path]:
+    """The most recent run with `fingerprint` across all clients under `out_dir` (for the dashboard)."""
+    found: List[Path] = []
+    for index_path in Path(out_dir).glob(f"*/{INDEX_NAME}"):
+        run_dir = RunIndex(index_path.parent).lookup(fingerprint)
+        if run_dir is not None:
+            found.append(run_dir)
+    return max(found, key=lambda p: p.name) if found else None
+
+
+def reuse_run(source: Path, target: Path, **updates: Any) -> Dict[str, Any]:
+    """
+    Give `target` the artifacts of the completed run in `source` (hard links,
+    or copies) and a manifest of its own: the source manifest with `updates`
+    applied and reused_from set. Returns that manifest.
+    """
+    source, target = Path(source), Path(target)
+    manifest = read_manifest(source)
+    target.mkdir(parents=True, exist_ok=True)
+    for name in manifest["outputs"].values():
+        dst = target / name
+        with contextlib.suppress(FileNotFoundError):
+            dst.unlink()
+        _link(source / name, dst)
+    manifest.update(updates)
+    manifest["reused_from"] = source.name
+    with open(target / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,183 @@
+"""
+Content-addressed cache of parsed sheets.
+
+Cleaned DataFrames produced by IntakeAgent.load_clean_sheet() are stored under
+agent_memory/sheet_cache/, keyed by the SHA-256 of the source file bytes plus
+sheet name and header row. Repeat runs over an unchanged vendor drop reuse them
+instead of parsing Excel again. Frames are written as Parquet when pyarrow is
+available and can represent them exactly; otherwise they are pickled.
+"""
+
+import hashlib
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import get_cache_config
+from core.disk_cache import DiskLRU
+from core.memory_store import ensure_memory_dir
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Bump when intake output for identical bytes would change (header detection, scoring...)
+CACHE_VERSION = 1
+# Bump when ReconciliationAgent.find_file_totals() would return other totals
+TOTALS_VERSION = 3
+
+
+def file_digest(filepath: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes."""
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SheetCache:
+    """
+    On-disk store of cleaned sheets and per-file reconciliation totals.
+    Bounded by ``max_bytes``; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        cfg = get_cache_config().get("sheet_cache", {})
+        if root is None:
+            root = ensure_memory_dir() / "sheet_cache"
+        if max_bytes is None:
+            max_bytes = int(cfg.get("max_bytes", 2 * 1024 ** 3))
+        self.store = DiskLRU(root, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, disabled: bool = False) -> Optional["SheetCache"]:
+        """Build the cache unless disabled by flag or config."""
+        if disabled or not get_cache_config().get("sheet_cache", {}).get("enabled", True):
+            return None
+        return cls()
+
+    # ------------------------------------------------------------------ keys
+
+    def _file_key(self, digest: str, kind: str) -> str:
+        return hashlib.sha256(f"v{CACHE_VERSION}::{digest}::{kind}".encode("utf-8")).hexdigest()
+
+    def _sheet_key(self, digest: str, sheet: str, header_row: Any) -> str:
+        payload = f"v{CACHE_VERSION}::{digest}::{sheet}::{header_row}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------- clean sheets
+
+    def get_sheets(self, digest: str) -> Optional[Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]]:
+        """
+        Return ({sheet: DataFrame}, diagnostics) for a file digest, or None on a miss.
+        A manifest whose frames were evicted counts as a miss.
+        """
+        manifest = self._read_json(self._file_key(digest, "sheets"))
+        if manifest is None:
+            self.misses += 1
+            return None
+        frames = {}
+        for entry in manifest.get("sheets", []):
+            df = self._read_frame(entry["key"], entry["format"])
+            if df is None:
+                self.misses += 1
+                return None
+            frames[entry["sheet"]] = df
+        self.hits += 1
+        return frames, manifest.get("diagnostics", {})
+
+    def put_sheets(
+        self,
+        digest: str,
+        frames: Dict[str, pd.DataFrame],
+        header_rows: Dict[str, Any],
+        diagnostics: Dict[str, Any]
+    ) -> None:
+        entries = []
+        written = []
+        for sheet, df in frames.items():
+            key = self._sheet_key(digest, sheet, header_rows.get(sheet))
+            fmt, path = self._write_frame(key, df)
+            written.append(path)
+            entries.append({"sheet": sheet, "header_row": header_rows.get(sheet), "key": key, "format": fmt})
+        manifest_key = self._file_key(digest, "sheets")
+        written.append(self._write_json(manifest_key, {"sheets": entries, "diagnostics": diagnostics}))
+        self.store.evict(protect=written)
+
+    # ------------------------------------------------------- reconciliation
+
+    def get_totals(self, digest: str) -> Optional[Any]:
+        payload = self._read_json(self._file_key(digest, f"totals.v{TOTALS_VERSION}"))
+        if payload is None:
+            return None
+        return payload.get("totals")
+
+    def put_totals(self, digest: str, totals: Any) -> None:
+        path = self._write_json(self._file_key(digest, f"totals.v{TOTALS_VERSION}"), {"totals": totals})
+        self.store.evict(protect=[path])
+
+    # ------------------------------------------------------------ helpers
+
+    def _read_json(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.store.read_bytes(self.store.path(key, ".json"))
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            return None
+
+    def _write_json(self, key: str, payload: Dict[str, Any]) -> Path:
+        path = self.store.path(key, ".json")
+        self.store.write_bytes(path, json.dumps(payload, default=str).encode("utf-8"))
+        return path
+
+    def _write_frame(self, key: str, df: pd.DataFrame) -> Tuple[str, Path]:
+        if HAS_PARQUET:
+            try:
+                buf = io.BytesIO()
+                df.to_parquet(buf)
+                # Only keep Parquet when it round-trips exactly (mixed-type columns do not)
+                if _restore_missing(pd.read_parquet(io.BytesIO(buf.getvalue()))).equals(df):
+                    path = self.store.path(key, ".parquet")
+                    self.store.write_bytes(path, buf.getvalue())
+                    return "parquet", path
+            except Exception:
+                pass
+        buf = io.BytesIO()
+        df.to_pickle(buf)
+        path = self.store.path(key, ".pkl")
+        self.store.write_bytes(path, buf.getvalue())
+        return "pickle", path
+
+    def _read_frame(self, key: str, fmt: str) -> Optional[pd.DataFrame]:
+        suffix = ".parquet" if fmt == "parquet" else ".pkl"
+        data = self.store.read_bytes(self.store.path(key, suffix))
+        if data is None:
+            return None
+        try:
+            if fmt == "parquet":
+                return _restore_missing(pd.read_parquet(io.BytesIO(data)))
+            return pd.read_pickle(io.BytesIO(data))
+        except Exception:
+            return None
+
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """Parquet returns None for missing strings; the parser produced NaN."""
+    for i, dtype in enumerate(df.dtypes):
+        if dtype != object:
+            continue
+        series = df.iloc[:, i]
+        if series.isna().any():
+            df.isetitem(i, series.where(series.notna(), np.nan))
+    return df
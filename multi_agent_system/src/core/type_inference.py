@@ -6,7 +6,9 @@ complementing keyword-based matching in the SchemaAgent.
 """
 
 import re
-from typing import List, Dict, Any, Set
+from typing import Any, Callable, Dict, List, Set
+
+import numpy as np
 import pandas as pd
 
 # Date patterns with their format descriptions
@@ -45,6 +47,65 @@ KNOWN_LANGUAGES: Set[str] = {
 }
 
 
+def _substring_pattern(words: List[str]) -> str:
+    """
+    Regex matching any of `words` as a substring, as a trie of alternations
+    (shared prefixes are tried once instead of once per word).
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        if "" in node:
+            return ""  # a whole word matched; longer ones cannot add anything
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return build(trie)
+
+
+# All DATE_PATTERNS in one anchored alternation
+DATE_RE = re.compile("|".join(f"(?:{pattern})" for pattern, _ in DATE_PATTERNS))
+# Known languages longer than 3 letters, found anywhere in a value ("Spanish - Medical")
+LANGUAGE_RE = re.compile(_substring_pattern(sorted(lang for lang in KNOWN_LANGUAGES if len(lang) > 3)))
+MINUTES_SUFFIX_RE = re.compile(r'\s*min(utes?)?\s*$', flags=re.IGNORECASE)
+DECIMALS_RE = re.compile(r'\.(\d+)$')
+
+
+class _Cells:
+    """
+    The sampled cells of several columns stacked into one array, so each
+    scorer runs its string operations once for all columns. Operations run on
+    the distinct values only and are mapped back to the cells.
+    """
+
+    def __init__(self, samples: List[np.ndarray]):
+        self.sizes = np.array([len(s) for s in samples], dtype=np.int64)
+        self.ends = np.cumsum(self.sizes)
+        self.starts = self.ends - self.sizes
+        self.group = np.repeat(np.arange(len(samples)), self.sizes)
+        values = np.concatenate(samples) if samples else np.array([], dtype=object)
+        # str() of an object is the same in any column, so one astype(str) converts all
+        text = pd.Series(values, dtype=object).astype(str).to_numpy(dtype=object)
+        self.codes, uniques = pd.factorize(text)
+        self.uniques = pd.Series(uniques, dtype=object)
+
+    def cells(self, per_value) -> np.ndarray:
+        """Expand a result computed per distinct value to one per cell."""
+        return np.asarray(per_value)[self.codes]
+
+    def count(self, mask: np.ndarray) -> np.ndarray:
+        """Number of True cells in each column."""
+        return np.bincount(self.group[mask], minlength=len(self.sizes))
+
+    def slices(self):
+        return zip(self.starts, self.ends)
+
+
 class TypeInferenceEngine:
     """Analyzes column values to infer semantic type for schema mapping."""
 
@@ -67,18 +128,67 @@ class TypeInferenceEngine:
         Returns:
             Dict with 'type', 'confidence', and 'all_scores' keys
         """
-        sample = series.dropna().head(self.sample_size)
-        if len(sample) == 0:
-            return {"type": "unknown", "confidence": 0.0, "all_scores": {}}
-
-        results = {
-            "date": self._score_date(sample),
-            "language": self._score_language(sample),
-            "minutes": self._score_minutes(sample),
-            "charge": self._score_charge(sample),
-            "rate": self._score_rate(sample),
+        return self.analyze_columns([series])[0]
+
+    def analyze_all_columns(self, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze all columns in a DataFrame.
+
+        Args:
+            df: DataFrame to analyze
+
+        Returns:
+            Dict mapping column name to type inference results
+        """
+        columns = [series for _, series in df.items()]
+        return dict(zip(df.columns, self.analyze_columns(columns)))
+
+    def analyze_columns(self, columns: List[pd.Series]) -> List[Dict[str, Any]]:
+        """
+        Analyze several columns at once (one pass of each scorer over all their
+        sampled cells). Returns one analyze_column() result per column.
+        """
+        samples = [self._sample(series) for series in columns]
+        cells = _Cells([sample for sample in samples if len(sample)])
+        scores = {
+            "date": self._score_date(cells),
+            "language": self._score_language(cells),
+            "minutes": self._score_minutes(cells),
+            "charge": self._score_charge(cells),
+            "rate": self._score_rate(cells),
         }
 
+        results = []
+        scored = 0  # position among the non-empty samples
+        for sample in samples:
+            if len(sample) == 0:
+                results.append({"type": "unknown", "confidence": 0.0, "all_scores": {}})
+                continue
+            results.append(self._result({kind: values[scored] for kind, values in scores.items()}))
+            scored += 1
+        return results
+
+    def _sample(self, series: pd.Series) -> np.ndarray:
+        """
+        The first sample_size non-null values, as objects whose str() is what
+        series.astype(str) gives (converted here for dtypes where it is not).
+        """
+        values = series.to_numpy()
+        stop = self.sample_size
+        while True:  # look only as far as needed to find sample_size values
+            keep = np.flatnonzero(pd.notna(values[:stop]))
+            if len(keep) >= self.sample_size or stop >= len(values):
+                break
+            stop *= 4
+        keep = keep[:self.sample_size]
+
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "Obiuf":
+            return values[keep].astype(object)
+        # Dates, categories, ...: formatting depends on the column
+        return series.iloc[keep].astype(str).to_numpy(dtype=object)
+
+    @staticmethod
+    def _result(results: Dict[str, float]) -> Dict[str, Any]:
         # Find the best matching type
         best_type = max(results, key=results.get)
         best_score = results[best_type]
@@ -93,68 +203,59 @@ class TypeInferenceEngine:
             "all_scores": results
         }
 
-    def analyze_all_columns(self, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
-        """
-        Analyze all columns in a DataFrame.
-
-        Args:
-            df: DataFrame to analyze
-
-        Returns:
-            Dict mapping column name to type inference results
-        """
-        results = {}
-        for col in df.columns:
-            results[col] = self.analyze_column(df[col])
-        return results
-
-    def _score_date(self, sample: pd.Series) -> float:
-        """Score likelihood this column contains dates."""
-        if len(sample) == 0:
-            return 0.0
-
-        matches = 0
-        for val in sample.astype(str):
-            val_clean = str(val).strip()
-            # Check if it's already a date type
-            if hasattr(val, 'strftime'):
-                matches += 1
-                continue
-            # Take first part if datetime with time
-            val_date = val_clean.split()[0] if ' ' in val_clean else val_clean
-            for pattern, _ in DATE_PATTERNS:
-                if re.match(pattern, val_clean) or re.match(pattern, val_date):
-                    matches += 1
-                    break
-
-        return matches / len(sample)
-
-    def _score_language(self, sample: pd.Series) -> float:
-        """Score likelihood this column contains language names."""
-        if len(sample) == 0:
-            return 0.0
-
-        matches = 0
-        for val in sample.astype(str):
-            val_clean = val.strip().lower()
-            # Direct match
-            if val_clean in KNOWN_LANGUAGES:
-                matches += 1
-            # Check if language name is contained (e.g., "Spanish - Medical")
-            elif any(lang in val_clean for lang in KNOWN_LANGUAGES if len(lang) > 3):
-                matches += 0.8  # Partial credit for substring match
-
-        return min(1.0, matches / len(sample))
-
-    def _score_minutes(self, sample: pd.Series) -> float:
-        """Score likelihood this column contains duration in minutes."""
+    @staticmethod
+    def _guarded(score) -> Callable:
+        """Wrap a per-column scorer so a failing column scores 0.0 without affecting the others."""
+        def run(*args):
+            try:
+                return score(*args)
+            except Exception:
+                return 0.0
+        return run
+
+    def _score_date(self, cells: _Cells) -> List[float]:
+        """Score likelihood each column contains dates."""
+        text = cells.uniques.str.strip()
+        # Take first part if datetime with time
+        date_part = text.where(~text.str.contains(' ', regex=False), text.str.split(n=1).str[0])
+        hits = cells.cells(text.str.match(DATE_RE).to_numpy(dtype=bool) | date_part.str.match(DATE_RE).to_numpy(dtype=bool))
+        return [int(n) / size for n, size in zip(cells.count(hits), cells.sizes)]
+
+    def _score_language(self, cells: _Cells) -> List[float]:
+        """Score likelihood each column contains language names."""
+        text = cells.uniques.str.strip().str.lower()
+        # Direct match, else partial credit for a contained name (e.g., "Spanish - Medical")
+        exact = text.isin(KNOWN_LANGUAGES).to_numpy()
+        partial = ~exact & text.str.contains(LANGUAGE_RE).to_numpy(dtype=bool)
+        credit = cells.cells(np.where(exact, 1.0, np.where(partial, 0.8, 0.0)))
+
+        scores = []
+        for (start, end), size in zip(cells.slices(), cells.sizes):
+            column = credit[start:end]
+            # Added up cell by cell, as a running total would
+            matches = np.add.accumulate(column)[-1] if (column == 0.8).any() else int((column == 1.0).sum())
+            scores.append(min(1.0, float(matches) / size))
+        return scores
+
+    def _numbers(self, cells: _Cells, cleaned: pd.Series) -> np.ndarray:
+        return cells.cells(pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=float, na_value=np.nan))
+
+    def _decimal_places(self, cells: _Cells, cleaned: pd.Series) -> np.ndarray:
+        return cells.cells(cleaned.str.extract(DECIMALS_RE, expand=False).str.len().to_numpy(dtype=float, na_value=np.nan))
+
+    def _score_minutes(self, cells: _Cells) -> List[float]:
+        """Score likelihood each column contains duration in minutes."""
         try:
             # Clean and convert to numeric
-            cleaned = sample.astype(str).str.replace(',', '', regex=False)
-            cleaned = cleaned.str.replace(r'\s*min(utes?)?\s*$', '', regex=True, flags=re.IGNORECASE)
-            numeric = pd.to_numeric(cleaned, errors='coerce')
-            valid = numeric.dropna()
+            cleaned = cells.uniques.str.replace(',', '', regex=False).str.replace(MINUTES_SUFFIX_RE, '', regex=True)
+            numeric = self._numbers(cells, cleaned)
+            decimals = self._decimal_places(cells, cleaned)
+        except Exception:
+            return [0.0] * len(cells.sizes)
 
+        @self._guarded
+        def score(start, end):
+            valid = numeric[start:end][~np.isnan(numeric[start:end])]
             if len(valid) == 0:
                 return 0.0
 
@@ -170,29 +271,32 @@ class TypeInferenceEngine:
                 ratio = min(1.0, ratio + 0.1)
 
             # Penalize if values look like currency (too precise decimals)
-            decimal_places = cleaned.str.extract(r'\.(\d+)$')[0].str.len()
-            if decimal_places.mean() > 2:
+            if _nanmean(decimals[start:end]) > 2:
                 ratio *= 0.7  # Likely currency, not minutes
 
             return ratio
-        except Exception:
-            return 0.0
 
-    def _score_charge(self, sample: pd.Series) -> float:
-        """Score likelihood this column contains monetary charges."""
-        try:
-            str_sample = sample.astype(str)
+        return [score(start, end) for start, end in cells.slices()]
 
+    def _score_charge(self, cells: _Cells) -> List[float]:
+        """Score likelihood each column contains monetary charges."""
+        try:
+            text = cells.uniques
             # Look for currency indicators
-            has_dollar = str_sample.str.contains(r'^\s*\$', regex=True).sum()
-            has_currency_word = str_sample.str.lower().str.contains(r'usd|eur|gbp').sum()
+            has_dollar = cells.cells(text.str.contains(r'^\s*\$', regex=True).to_numpy(dtype=bool))
+            has_currency_word = cells.cells(text.str.lower().str.contains(r'usd|eur|gbp').to_numpy(dtype=bool))
 
             # Clean and parse
-            cleaned = str_sample.str.replace(r'[\$,]', '', regex=True)
-            cleaned = cleaned.str.strip()
-            numeric = pd.to_numeric(cleaned, errors='coerce')
-            valid = numeric.dropna()
+            cleaned = text.str.replace(r'[\$,]', '', regex=True).str.strip()
+            numeric = self._numbers(cells, cleaned)
+            decimals = self._decimal_places(cells, cleaned)
+            currency = cells.count(has_dollar) + cells.count(has_currency_word)
+        except Exception:
+            return [0.0] * len(cells.sizes)
 
+        @self._guarded
+        def score(start, end, size, currency_cells):
+            valid = numeric[start:end][~np.isnan(numeric[start:end])]
             if len(valid) == 0:
                 return 0.0
 
@@ -201,7 +305,7 @@ class TypeInferenceEngine:
             ratio = in_range / len(valid)
 
             # Strong boost for currency symbols
-            currency_ratio = (has_dollar + has_currency_word) / len(sample)
+            currency_ratio = currency_cells / size
             if currency_ratio > 0.1:
                 ratio = min(1.0, ratio + 0.3)
 
@@ -211,24 +315,25 @@ class TypeInferenceEngine:
                 ratio = min(1.0, ratio + 0.1)
 
             # Check for 2 decimal places (currency formatting)
-            decimal_places = cleaned.str.extract(r'\.(\d+)$')[0].str.len()
-            if 1.5 <= decimal_places.mean() <= 2.5:
+            if 1.5 <= _nanmean(decimals[start:end]) <= 2.5:
                 ratio = min(1.0, ratio + 0.1)
 
             return ratio
-        except Exception:
-            return 0.0
 
-    def _score_rate(self, sample: pd.Series) -> float:
-        """Score likelihood this column contains per-minute rates."""
-        try:
-            str_sample = sample.astype(str)
+        return [score(start, end, size, n) for (start, end), size, n in zip(cells.slices(), cells.sizes, currency)]
 
+    def _score_rate(self, cells: _Cells) -> List[float]:
+        """Score likelihood each column contains per-minute rates."""
+        try:
             # Clean and parse
-            cleaned = str_sample.str.replace(r'[\$,]', '', regex=True)
-            numeric = pd.to_numeric(cleaned, errors='coerce')
-            valid = numeric.dropna()
+            cleaned = cells.uniques.str.replace(r'[\$,]', '', regex=True)
+            numeric = self._numbers(cells, cleaned)
+        except Exception:
+            return [0.0] * len(cells.sizes)
 
+        @self._guarded
+        def score(start, end):
+            valid = numeric[start:end][~np.isnan(numeric[start:end])]
             if len(valid) == 0:
                 return 0.0
 
@@ -238,7 +343,7 @@ class TypeInferenceEngine:
 
             # Strong indicator: low variance (rates are usually consistent)
             if len(valid) > 5:
-                std = valid.std()
+                std = valid.std(ddof=1)
                 mean = valid.mean()
                 if mean > 0:
                     cv = std / mean  # Coefficient of variation
@@ -251,8 +356,14 @@ class TypeInferenceEngine:
                 ratio = min(1.0, ratio + 0.2)
 
             return ratio
-        except Exception:
-            return 0.0
+
+        return [score(start, end) for start, end in cells.slices()]
+
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean ignoring NaN; NaN (compares False) when there are no values."""
+    present = values[~np.isnan(values)]
+    return present.mean() if len(present) else np.nan
 
 
 def get_known_languages() -> Set[str]:
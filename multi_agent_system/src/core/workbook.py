@@ -0,0 +1,148 @@
+"""
+Single-pass workbook reader.
+
+A WorkbookSession parses every sheet of a file exactly once into a raw grid of
+cell values. Header detection, sheet scoring, reconciliation total extraction
+and the final re-headered DataFrames are all derived from that grid in memory,
+so large vendor workbooks are no longer opened and parsed two or three times.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from core.sheet_cache import file_digest
+
+CSV_SHEET = "csv"
+
+
+@contextmanager
+def open_excel_file(filepath: str):
+    """
+    Open Excel files with engine settings that suppress noisy legacy .xls logs.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == ".xls":
+        with open(os.devnull, "w", encoding="utf-8") as sink:
+            with pd.ExcelFile(filepath, engine="xlrd", engine_kwargs={"logfile": sink}) as xls:
+                yield xls
+        return
+    with pd.ExcelFile(filepath) as xls:
+        yield xls
+
+
+class WorkbookSession:
+    """
+    Parses each sheet of a workbook (or a CSV as one logical sheet) once and serves
+    every downstream view from the cached raw rows.
+
+    Raw rows are kept as untyped cell values (the same values pandas hands to its
+    parser), so re-heading a sheet goes through the same type inference as
+    ``pd.read_excel(header=n)`` and yields identical frames.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.ext = os.path.splitext(filepath)[1].lower()
+        self._xls_cm = None
+        self._xls = None
+        self._sheet_names: Optional[List[str]] = None
+        self._rows: Dict[str, List[list]] = {}
+        self._grids: Dict[str, pd.DataFrame] = {}
+        self._errors: Dict[str, Exception] = {}
+        self._digest: Optional[str] = None
+
+    @property
+    def is_csv(self) -> bool:
+        return self.ext == ".csv"
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the file bytes, used as the parsed-sheet cache key."""
+        if self._digest is None:
+            self._digest = file_digest(self.filepath)
+        return self._digest
+
+    def __enter__(self) -> "WorkbookSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the underlying Excel handle. Parsed rows stay available."""
+        if self._xls_cm is not None:
+            try:
+                self._xls_cm.__exit__(None, None, None)
+            finally:
+                self._xls_cm = None
+                self._xls = None
+
+    def _excel(self):
+        if self._xls is None:
+            self._xls_cm = open_excel_file(self.filepath)
+            self._xls = self._xls_cm.__enter__()
+        return self._xls
+
+    @property
+    def sheet_names(self) -> List[str]:
+        if self._sheet_names is None:
+            if self.is_csv:
+                self._sheet_names = [CSV_SHEET]
+            else:
+                self._sheet_names = list(self._excel().sheet_names)
+        return self._sheet_names
+
+    def rows(self, sheet: str) -> List[list]:
+        """
+        Raw cell values for a sheet, parsed on first access only.
+        Errors are remembered so a broken sheet is not retried.
+        """
+        if sheet in self._rows:
+            return self._rows[sheet]
+        if sheet in self._errors:
+            raise self._errors[sheet]
+        try:
+            if self.is_csv:
+                raw = pd.read_csv(self.filepath, header=None, dtype=object)
+            else:
+                raw = pd.read_excel(self._excel(), sheet_name=sheet, header=None, dtype=object)
+        except Exception as e:
+            self._errors[sheet] = e
+            raise
+        self._rows[sheet] = raw.values.tolist()
+        return self._rows[sheet]
+
+    def grid(self, sheet: str) -> pd.DataFrame:
+        """Full sheet without a header row, typed like ``read_excel(header=None)``."""
+        if sheet not in self._grids:
+            self._grids[sheet] = self._parse(self.rows(sheet), None)
+        return self._grids[sheet]
+
+    def preview(self, sheet: str, nrows: int = 100) -> pd.DataFrame:
+        """First ``nrows`` rows, typed like ``read_excel(header=None, nrows=nrows)``."""
+        return self._parse(self.rows(sheet)[:nrows], None)
+
+    def frame(self, sheet: str, header_row: int) -> pd.DataFrame:
+        """Re-header the cached grid in memory, typed like ``read_excel(header=header_row)``."""
+        return self._parse(self.rows(sheet), header_row)
+
+    def all_grids(self) -> Dict[str, pd.DataFrame]:
+        """Every readable sheet as a raw grid. Unreadable sheets are skipped."""
+        grids = {}
+        for sheet in self.sheet_names:
+            try:
+                grids[sheet] = self.grid(sheet)
+            except Exception:
+                continue
+        return grids
+
+    @staticmethod
+    def _parse(rows: List[list], header: Optional[int]) -> pd.DataFrame:
+        if not rows:
+            return pd.DataFrame()
+        with TextParser(rows, header=header) as parser:
+            return parser.read()
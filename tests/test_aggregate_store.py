@@ -0,0 +1,60 @@
+import os
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.aggregate_store import AggregateStore, fold_totals
+
+
+def _totals(rows):
+    return pd.DataFrame(rows, columns=["Month", "Vendor", "Language", "Modality", "Minutes", "Cost", "Calls"])
+
+
+def _sorted(df):
+    return df.sort_values(["Month", "Vendor", "Language", "Modality"]).reset_index(drop=True)
+
+
+def test_replaced_file_is_retracted(tmp_path):
+    jan, feb = tmp_path / "VendorA - 2024-01.csv", tmp_path / "VendorA - 2024-02.csv"
+    jan.write_text("jan v1")
+    feb.write_text("feb")
+    jan_v1 = _totals([("2024-01", "VendorA", "Spanish", "OPI", 10.0, 12.5, 2),
+                      ("2024-01", "VendorA", "Arabic", "VRI", 5.0, 9.0, 1)])
+    feb_part = _totals([("2024-02", "VendorA", "Spanish", "OPI", 7.0, 8.75, 1)])
+
+    store = AggregateStore(tmp_path / "store")
+    assert store.changed_files([str(jan), str(feb)]) == ([str(jan), str(feb)], [])
+    store.stage(str(jan), jan_v1, np.array([1, 2, 3], dtype=np.uint64))
+    store.stage(str(feb), feb_part, np.array([4], dtype=np.uint64))
+    assert store.commit()["records_added"] == 4
+
+    # A later run sees both as unchanged, even after a touch
+    store = AggregateStore(tmp_path / "store")
+    os.utime(feb, ns=(0, 0))
+    assert store.changed_files([str(jan), str(feb)]) == ([], [str(jan), str(feb)])
+
+    # The vendor re-sends January: Arabic is gone, Spanish corrected
+    jan.write_text("jan v2")
+    jan_v2 = _totals([("2024-01", "VendorA", "Spanish", "OPI", 11.0, 13.75, 2)])
+    assert store.changed_files([str(jan)]) == ([str(jan)], [])
+    store.stage(str(jan), jan_v2, np.array([1, 3], dtype=np.uint64))
+    changes = store.commit()
+    assert changes["replaced"] == ["VendorA - 2024-01.csv"]
+    assert (changes["records_retracted"], changes["records_added"], changes["rows_carried_over"]) == (3, 2, 2)
+
+    expected = _sorted(pd.concat([jan_v2, feb_part], ignore_index=True))
+    pd.testing.assert_frame_equal(_sorted(AggregateStore(tmp_path / "store").totals()), expected)
+    # Superseded part and totals files are removed
+    assert len(list((tmp_path / "store" / "parts").iterdir())) == 2
+    assert len(list((tmp_path / "store").glob("totals-*.pkl"))) == 1
+
+
+def test_fold_totals_drops_groups_without_calls():
+    part = _totals([("2024-01", "VendorA", "Spanish", "OPI", 10.0, 12.5, 2)])
+    assert fold_totals(fold_totals(None, part), part, sign=-1).empty
+    assert fold_totals(part, None) is part
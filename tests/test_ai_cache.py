@@ -0,0 +1,80 @@
+import sys
+import time
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.ai_cache import AIResponseCache
+from core.ai_client import AIClient
+
+
+class FakeCompletions:
+    """Stands in for openai's chat.completions: counts requests."""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _client(cache, content='{"label": "Usage"}'):
+    client = AIClient(cache=cache)
+    completions = FakeCompletions(content)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    client.enabled = True
+    return client, completions
+
+
+def test_identical_request_is_answered_from_cache(tmp_path):
+    cache = AIResponseCache(tmp_path, max_bytes=10 ** 6, ttl_seconds=3600)
+    client, completions = _client(cache)
+
+    assert client.complete_json("sys", "classify this") == {"label": "Usage"}
+    assert client.complete_json("sys", "classify this") == {"label": "Usage"}
+    assert completions.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A different prompt or model is a different entry
+    client.complete_json("sys", "classify that")
+    client.complete_json("sys", "classify this", model="gpt-4o-mini")
+    assert completions.calls == 3
+
+    # A fresh client (a later run) reads the same directory
+    later, later_completions = _client(AIResponseCache(tmp_path, max_bytes=10 ** 6, ttl_seconds=3600))
+    assert later.complete_json("sys", "classify this") == {"label": "Usage"}
+    assert later_completions.calls == 0
+
+
+def test_expired_entries_are_refetched(tmp_path):
+    cache = AIResponseCache(tmp_path, max_bytes=10 ** 6, ttl_seconds=60)
+    client, completions = _client(cache, content="summary")
+    client.complete_text("sys", "summarize")
+
+    entry = next(tmp_path.rglob("*.json"))
+    data = json.loads(entry.read_text())
+    data["created"] = time.time() - 120
+    entry.write_text(json.dumps(data))
+
+    assert client.complete_text("sys", "summarize") == "summary"
+    assert completions.calls == 2
+
+
+def test_replay_mode_never_calls_network_or_writes(tmp_path):
+    seeded = AIResponseCache(tmp_path, max_bytes=10 ** 6, ttl_seconds=0)
+    client, _ = _client(seeded)
+    client.complete_json("sys", "known prompt")
+
+    replay = AIResponseCache(tmp_path, max_bytes=10 ** 6, ttl_seconds=0, mode="replay")
+    client, completions = _client(replay)
+    assert client.complete_json("sys", "known prompt") == {"label": "Usage"}
+    assert client.complete_json("sys", "new prompt") is None
+    assert completions.calls == 0
+    assert len(list(tmp_path.rglob("*.json"))) == 1
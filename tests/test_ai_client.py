@@ -0,0 +1,133 @@
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+pytest.importorskip("openai")
+
+from core.ai_cache import AIResponseCache
+from core.ai_client import AIClient, RequestLimits
+
+
+class StubOpenAI:
+    """Local stand-in for the chat completions endpoint, scripted per test."""
+
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)  # served in order, then 200s
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                try:
+                    time.sleep(stub.delay)
+                    if status == 200:
+                        content = json.dumps({"echo": body["messages"][1]["content"]})
+                        payload = {
+                            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": content}}],
+                        }
+                    else:
+                        payload = {"error": {"message": f"stub status {status}", "type": "stub"}}
+                    data = json.dumps(payload).encode("utf-8")
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    if status == 429:
+                        self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubOpenAI()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.url)
+    yield server
+    server.close()
+
+
+def _client(tmp_path, **limits):
+    settings = {"backoff_base_seconds": 0.01, "requests_per_second": 0, **limits}
+    cache = AIResponseCache(tmp_path / "ai_cache", max_bytes=10 ** 6, ttl_seconds=0)
+    return AIClient(cache=cache, limits=RequestLimits(settings))
+
+
+def test_rate_limited_responses_are_retried(stub, tmp_path):
+    stub.statuses = [429, 503]
+    client = _client(tmp_path, max_retries=3)
+    assert client.complete_json("sys", "hello") == {"echo": "hello"}
+    assert stub.requests == 3
+
+
+def test_slow_response_hits_the_deadline(stub, tmp_path):
+    stub.delay = 2.0
+    client = _client(tmp_path, timeout_seconds=0.2, deadline_seconds=0.5, max_retries=5)
+    start = time.monotonic()
+    assert client.complete_json("sys", "slow") is None
+    assert time.monotonic() - start < 1.5
+
+
+def test_breaker_trips_to_heuristics_after_repeated_failures(stub, tmp_path):
+    stub.statuses = [500] * 10
+    client = _client(tmp_path, max_retries=0, breaker_failures=2, breaker_cooldown_seconds=60)
+    for i in range(4):
+        assert client.complete_json("sys", f"prompt {i}") is None
+    assert stub.requests == 2
+    assert client.limits.breaker.is_open
+
+
+def test_many_prompts_are_sent_concurrently_within_the_limit(stub, tmp_path):
+    stub.delay = 0.2
+    client = _client(tmp_path, max_in_flight=3)
+    prompts = [("sys", f"row {i}") for i in range(8)] + [("sys", "row 0")]
+    results = client.complete_json_many(prompts)
+
+    assert [r["echo"] for r in results] == [f"row {i}" for i in range(8)] + ["row 0"]
+    assert stub.requests == 8  # the repeated prompt is sent once
+    assert 2 <= stub.max_active <= 3
+
+
+def test_token_bucket_spaces_out_requests(stub, tmp_path):
+    client = _client(tmp_path, requests_per_second=20, burst=1)
+    start = time.monotonic()
+    client.complete_json_many([("sys", f"row {i}") for i in range(5)])
+    # One token up front, then one every 50ms
+    assert time.monotonic() - start >= 0.18
@@ -0,0 +1,71 @@
+import itertools
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from agents.aggregator_agent import AggregatorAgent
+from core.baseline_cube import DIMENSIONS, BaselineCube
+
+
+def _baseline(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    totals = pd.DataFrame({
+        "Month": rng.choice(["2024-01", "2024-02", "2023-12", "NaT"], n),
+        "Vendor": rng.choice(["VendorA", "VendorB", "VendorC"], n),
+        "Language": rng.choice(["Spanish", "Arabic", "Mandarin", "Somali", "ASL"], n),
+        "Modality": rng.choice(["OPI", "VRI", "OnSite"], n),
+        "Minutes": rng.uniform(0, 60, n).round(1),
+        "Cost": rng.uniform(0, 90, n).round(2),
+        "Calls": rng.integers(0, 4, n),
+    }).groupby(DIMENSIONS).sum().reset_index()
+    return AggregatorAgent().finalize_baseline(totals)
+
+
+def test_every_grouping_set_matches_groupby():
+    baseline = _baseline()
+    cube = AggregatorAgent().build_cube(baseline)
+    assert len(cube.frame["Grouping"].unique()) == 16
+
+    for size in range(1, len(DIMENSIONS) + 1):
+        for dims in itertools.combinations(DIMENSIONS, size):
+            expected = baseline.groupby(list(dims))[["Minutes", "Cost", "Calls"]].sum().reset_index()
+            got = cube.rollup(*dims)
+            assert got[list(dims)].equals(expected[list(dims)])
+            np.testing.assert_allclose(got[["Minutes", "Cost", "Calls"]], expected[["Minutes", "Cost", "Calls"]])
+            np.testing.assert_allclose(got["CPM"], (expected["Cost"] / expected["Minutes"]).fillna(0.0))
+
+    total = cube.total()
+    assert total["Calls"] == baseline["Calls"].sum()
+    assert np.isclose(total["Cost"], baseline["Cost"].sum())
+    assert cube.rollup("Month")["Month"].tolist() == ["2023-12", "2024-01", "2024-02", "NaT"]
+
+
+def test_missing_keys_only_count_when_rolled_up():
+    baseline = AggregatorAgent().finalize_baseline(pd.DataFrame({
+        "Month": ["2024-01", "2024-01"], "Vendor": ["VendorA", "VendorA"],
+        "Language": ["Spanish", None], "Modality": ["OPI", "OPI"],
+        "Minutes": [10.0, 0.0], "Cost": [12.0, 3.0], "Calls": [2, 1],
+    }))
+    cube = BaselineCube.from_baseline(baseline)
+    assert cube.rollup("Language")["Cost"].tolist() == [12.0]
+    assert cube.rollup("Vendor")["Cost"].tolist() == [15.0]
+    assert cube.rollup("Vendor")["Calls"].tolist() == [3]
+
+
+def test_cube_round_trips_through_parquet(tmp_path):
+    cube = BaselineCube.from_baseline(_baseline(n=50))
+    cube.to_parquet(tmp_path / "baseline_cube.parquet")
+    loaded = BaselineCube.read_parquet(tmp_path / "baseline_cube.parquet")
+    assert loaded.frame.equals(cube.frame)
+    assert loaded.rollup("Vendor", "Modality").equals(cube.rollup("Vendor", "Modality"))
+
+
+def test_empty_baseline_has_zero_totals():
+    cube = AggregatorAgent().build_cube(AggregatorAgent().finalize_baseline(None))
+    assert cube.frame.empty
+    assert cube.total()["Cost"] == 0.0
@@ -0,0 +1,173 @@
+import sys
+import warnings
+from pathlib import Path
+import pandas as pd
+import datetime
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from agents.standardizer_agent import StandardizerAgent
+from agents.rate_card_agent import RateCardAgent
+from agents.qa_agent import QAgent, RunningMoments
+from agents.reconciliation_agent import ReconciliationAgent
+from agents.aggregator_agent import AggregatorAgent
+from core.canonical_schema import CanonicalBatch, CanonicalRecord
+
+
+def _sheet():
+    return pd.DataFrame([
+        {"Call Date": datetime.datetime(2024, 1, 1, 9, 30), "Lang": "Spanish", "Mins": 10, "Total": "$12.50", "Call ID": "A1"},
+        {"Call Date": "2024-01-02", "Lang": "Arabic", "Mins": "5:30", "Total": 0, "Call ID": "A2"},
+        {"Call Date": "2024-01-02", "Lang": "Arabic", "Mins": "5:30", "Total": 0, "Call ID": "A2"},
+        {"Call Date": None, "Lang": "French", "Mins": 3, "Total": 4.0, "Call ID": "A3"},
+    ])
+
+
+MAPPING = {"date": "Call Date", "language": "Lang", "minutes": "Mins", "charge": "Total"}
+
+
+def test_batch_matches_record_path():
+    agent = StandardizerAgent()
+    batch = agent.process_dataframe_batch(_sheet(), MAPPING, "test.csv", "VendorA")
+    records = agent.process_dataframe(_sheet(), MAPPING, "test.csv", "VendorA")
+
+    assert len(batch) == 3
+    assert str(batch.frame["vendor"].dtype) == "category"
+    resolved = batch.to_records(loader=lambda _path: {"": _sheet()})
+    assert [r.model_dump() for r in resolved] == [r.model_dump() for r in records]
+    assert batch[0].raw_columns is None
+    assert batch[0].date == datetime.date(2024, 1, 1)
+    # The list API resolves raw rows; the batch only keeps lineage
+    assert records[0].raw_columns["Call ID"] == "A1"
+    assert list(batch.frame["row_index"]) == [0, 1, 2]
+
+    # Round trip through the record view keeps every field
+    again = CanonicalBatch.from_records(records)
+    assert [r.model_dump() for r in again] == [r.model_dump() for r in records]
+
+    # List API returns the caller's own objects, annotated in place
+    clean, stats = QAgent().process_records(records)
+    assert stats["duplicates_removed"] == 1
+    assert clean == [records[0]]
+    assert records[1].raw_columns["_qa_status"] == "QUARANTINED"
+
+
+def test_annotations_and_concat():
+    agent = StandardizerAgent()
+    a = agent.process_dataframe_batch(_sheet(), MAPPING, "a.csv", "VendorA", sheet_name="Detail")
+    b = agent.process_dataframe_batch(_sheet(), MAPPING, "b.csv", "VendorB", sheet_name="Detail")
+    batch = CanonicalBatch.concat([a, b])
+    assert len(batch) == 6
+    assert list(batch.frame["vendor"].astype(object)) == ["VendorA"] * 3 + ["VendorB"] * 3
+
+    batch, stats = RateCardAgent().validate_batch(batch)
+    assert stats["records_missing_cost"] == 4
+    clean, qa_stats = QAgent().process_batch(batch)
+    # One duplicate per file; missing-cost rows are quarantined
+    assert qa_stats["duplicates_removed"] == 2
+    assert qa_stats["critical_errors_quarantined"] == 2
+    assert len(clean) == 2
+
+    assert list(batch.frame["cost_status"].astype(object)[:3]) == ["FROM_FILE", "MISSING", "MISSING"]
+    assert batch.frame["qa_status"].iloc[1] == "QUARANTINED"
+    # Issue codes as a bitmask; the duplicate row is not checked
+    assert list(batch.frame["qa_flags"][:3]) == [0, QAgent.MISSING_COST, 0]
+    assert batch.to_records()[1].raw_columns["_qa_status"] == "QUARANTINED"
+
+    # Raw values come back through the lineage pointers, one load per file
+    loads = []
+    def loader(path):
+        loads.append(path)
+        return {"Detail": _sheet()}
+    raw = batch.raw_rows(loader)
+    assert sorted(loads) == ["a.csv", "b.csv"]
+    assert raw[4]["Call ID"] == "A2"
+    assert isinstance(clean.to_records()[0], CanonicalRecord)
+
+    exported = batch.to_frame()
+    assert "raw_columns" not in exported.columns
+    assert list(exported["source_row"]) == [0, 1, 2, 0, 1, 2]
+
+
+def test_concat_skips_empty_batches():
+    agent = StandardizerAgent()
+    a = agent.process_dataframe_batch(_sheet(), MAPPING, "a.csv", "VendorA", sheet_name="Detail")
+    b = agent.process_dataframe_batch(_sheet(), MAPPING, "b.csv", "VendorB", sheet_name="Detail")
+    # A chunk left with no rows, e.g. after QA
+    gone = b.take(b.frame["total_charge"] < 0)
+    expected = CanonicalBatch.concat([a, b])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        batch = CanonicalBatch.concat([CanonicalBatch.empty(), a, gone, b, CanonicalBatch.empty()])
+        empty = CanonicalBatch.concat([CanonicalBatch.empty(), gone])
+    pd.testing.assert_frame_equal(batch.to_frame(), expected.to_frame())
+    assert dict(batch.frame.dtypes) == dict(expected.frame.dtypes)
+    assert len(empty) == 0
+    assert list(empty.frame.columns) == list(CanonicalBatch.empty().frame.columns)
+
+
+def test_chunked_qa_matches_whole_batch():
+    agent = StandardizerAgent()
+    sheet = pd.concat([_sheet()] * 3, ignore_index=True)
+    sheet["Total"] = [12.5, 9.0, 9.0, 4.0, 30.0, 2.0, 2.0, 1.0, 7.5, 4.0, 4.0, 3.5]
+    chunks = [agent.process_dataframe_batch(sheet.iloc[i:i + 5].reset_index(drop=True), MAPPING, "a.csv", "VendorA")
+              for i in range(0, len(sheet), 5)]
+    whole = agent.process_dataframe_batch(sheet, MAPPING, "a.csv", "VendorA")
+    for b in chunks + [whole]:
+        RateCardAgent().validate_batch(b)
+
+    qa = QAgent()
+    moments = RunningMoments()
+    for b in chunks:
+        qa.rate_moments(b, moments)
+    seen, vendor_data, totals, kept = set(), {}, None, []
+    for b in chunks:
+        clean, _ = qa.process_batch(b, moments, seen)
+        ReconciliationAgent().accumulate_batch(clean, vendor_data)
+        totals = AggregatorAgent().accumulate_batch(clean, totals)
+        kept.append(clean)
+
+    clean, stats = qa.process_batch(whole)
+    assert abs(moments.mean - stats["mean_rate_detected"]) < 1e-12
+    assert abs(moments.std - stats["std_rate_detected"]) < 1e-12
+    # Duplicates are caught across chunk boundaries through the hashed key set
+    streamed = CanonicalBatch.concat(kept)
+    assert len(streamed) == len(clean)
+    assert list(streamed.frame["total_charge"]) == list(clean.frame["total_charge"])
+    assert vendor_data == {"VendorA": {"calc_total": clean.frame["total_charge"].sum(),
+                                       "calc_minutes": clean.frame["minutes_billed"].sum(),
+                                       "record_count": len(clean)}}
+    baseline = AggregatorAgent().finalize_baseline(totals)
+    pd.testing.assert_frame_equal(baseline.reset_index(drop=True),
+                                  AggregatorAgent().create_baseline_batch(clean).reset_index(drop=True))
+
+
+def test_duplicate_check_matches_tuple_keys_with_nan_values():
+    def record(minutes, charge):
+        return CanonicalRecord(source_file="a.csv", vendor="VendorA", date=datetime.date(2024, 1, 2),
+                               language="Spanish", modality="OPI", minutes_billed=minutes, total_charge=charge)
+
+    nan = float("nan")
+    records = [record(7.0, 5.0), record(nan, 5.0), record(nan, 5.0), record(7.0, nan),
+               record(3.0, 4.5), record(3.0, 4.5)]
+    qa = QAgent()
+
+    # The per-record check this replaced: a set of key tuples, in which NaN matches nothing
+    seen, expected = set(), 0
+    for rec in records:
+        key = qa._build_duplicate_key(rec)
+        expected += key in seen
+        seen.add(key)
+    assert expected == 1
+
+    _, stats = qa.process_batch(CanonicalBatch.from_records(records))
+    assert stats["duplicates_removed"] == expected
+    # Same across chunks, through the hashed key set
+    seen_keys, removed = set(), 0
+    for i in range(0, len(records), 2):
+        _, chunk_stats = qa.process_batch(CanonicalBatch.from_records(records[i:i + 2]), RunningMoments(), seen_keys)
+        removed += chunk_stats["duplicates_removed"]
+    assert removed == expected
@@ -0,0 +1,49 @@
+import sys
+import random
+from pathlib import Path
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.column_index import ColumnSetIndex, header_tokens, jaccard
+
+WORDS = ["service", "date", "language", "minutes", "charge", "total", "rate", "client", "site", "call",
+         "id", "start", "end", "interpreter", "type", "department", "cost", "center", "account", "region"]
+
+
+def test_header_tokens_ignore_case_order_and_punctuation():
+    assert header_tokens(["Total Charge ($)", "Service\nDate"]) == header_tokens(["service date", "TOTAL_CHARGE"])
+
+
+def test_query_scores_only_layouts_sharing_a_token():
+    rng = random.Random(7)
+    index = ColumnSetIndex()
+    layouts = {}
+    for i in range(500):
+        # Layouts from two disjoint vocabularies; the query uses only the first
+        words = WORDS[:10] if i % 2 else WORDS[10:]
+        cols = [f"{rng.choice(words)} {rng.choice(words)} f{i}x{j}" for j in range(10)]
+        layouts[f"VendorA::{i}"] = cols
+        index.add(f"VendorA::{i}", "VendorA", cols)
+    index.add("VendorB::0", "VendorB", layouts["VendorA::41"])
+
+    # One column renamed and one added
+    query = layouts["VendorA::41"][:9] + ["Renamed Column", "Extra"]
+    found = index.query("VendorA", query, min_similarity=0.6)
+    assert found[0][0] == "VendorA::41"
+    assert 0.6 <= found[0][1] < 1.0
+
+    tokens = header_tokens(query)
+    sharing = [key for key, cols in layouts.items() if tokens & header_tokens(cols)]
+    assert index.scored == len(sharing) == 250
+    # Same similarities as a pairwise scan, without visiting the other layouts
+    expected = {key: jaccard(tokens, header_tokens(layouts[key])) for key in sharing}
+    assert dict(index.query("VendorA", query)) == expected
+    assert index.scored == 500
+    assert index.query("VendorC", query) == []
+    assert index.query("VendorA", ["zzz"]) == []
+    assert index.scored == 500
+
+    index.remove("VendorA::41")
+    assert all(key != "VendorA::41" for key, _ in index.query("VendorA", query))
@@ -0,0 +1,113 @@
+import sys
+import json
+import multiprocessing
+from pathlib import Path
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.memory_db import get_memory_db
+from core.memory_store import load_json, merge_json, save_json, update_json
+
+
+def test_documents_round_trip_in_order(tmp_path):
+    history = {
+        "corrections": [{"vendor": "A"}, {"vendor": "B"}],
+        "vendor_patterns": {"A": {"minutes": ["Mins"]}},
+        "empty": [],
+        "count": 3,
+    }
+    save_json(tmp_path / "correction_history.json", history)
+    save_json(tmp_path / "pending_mappings.json", [{"n": 2}, {"n": 1}])
+
+    assert load_json(tmp_path / "correction_history.json", {}) == history
+    assert list(load_json(tmp_path / "correction_history.json", {})) == list(history)
+    assert load_json(tmp_path / "pending_mappings.json", []) == [{"n": 2}, {"n": 1}]
+    assert load_json(tmp_path / "missing.json", {"default": True}) == {"default": True}
+    # Documents live in the database, not in per-document files
+    assert not (tmp_path / "correction_history.json").exists()
+
+
+def test_saves_write_only_changed_entries(tmp_path):
+    path = tmp_path / "mapping_registry.json"
+    registry = {f"V{i}::sig{i}": {"vendor": f"V{i}", "columns_signature": f"sig{i}"} for i in range(100)}
+    save_json(path, registry)
+    db = get_memory_db(tmp_path)
+
+    registry["V100::sig100"] = {"vendor": "V100", "columns_signature": "sig100"}
+    assert db.save("mapping_registry", registry) == 1
+    registry["V3::sig3"]["date_format"] = "%m/%d/%Y"
+    del registry["V4::sig4"]
+    assert db.save("mapping_registry", registry) == 2
+    assert db.save("mapping_registry", registry) == 0
+
+    # Appending to a nested list adds one row
+    history = {"corrections": [{"i": i} for i in range(50)]}
+    db.save("correction_history", history)
+    history["corrections"].append({"i": 50})
+    assert db.save("correction_history", history) == 1
+
+    assert list(db.find("mapping_registry", vendor="V3")) == ["V3::sig3"]
+    assert list(db.find("mapping_registry", signature="sig100")) == ["V100::sig100"]
+
+
+def test_existing_json_is_migrated_once(tmp_path):
+    legacy = {"abc": {"type": "transaction", "confidence": 0.7}}
+    path = tmp_path / "intake_classifications.json"
+    path.write_text(json.dumps(legacy))
+
+    assert load_json(path, {}) == legacy
+    assert not path.exists()
+    assert (tmp_path / "intake_classifications.json.migrated").exists()
+
+    # Later loads come from the database
+    legacy["def"] = {"type": "summary", "confidence": 0.6}
+    save_json(path, legacy)
+    assert load_json(path, {}) == legacy
+
+
+def _concurrent_writer(directory, worker, n):
+    for i in range(n):
+        merge_json(Path(directory) / "mapping_registry.json", {f"w{worker}::{i}": {"vendor": f"w{worker}"}})
+
+        def bump(history):
+            history["success_rates"]["cache"]["total"] += 1
+        update_json(Path(directory) / "correction_history.json",
+                    {"success_rates": {"cache": {"total": 0}}}, bump)
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_concurrent_writer, args=(str(tmp_path), w, 25)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+
+    assert len(load_json(tmp_path / "mapping_registry.json", {})) == 100
+    assert load_json(tmp_path / "correction_history.json", {})["success_rates"]["cache"]["total"] == 100
+
+    # A process saving its (stale) copy keeps entries other processes added
+    registry = load_json(tmp_path / "mapping_registry.json", {})
+    merge_json(tmp_path / "mapping_registry.json", {"other::run": {"vendor": "other"}})
+    registry["mine::run"] = {"vendor": "mine"}
+    save_json(tmp_path / "mapping_registry.json", registry)
+    assert {"other::run", "mine::run"} <= set(load_json(tmp_path / "mapping_registry.json", {}))
+
+
+def test_json_fallback_when_sqlite_is_unavailable(tmp_path, monkeypatch):
+    import sqlite3
+    import core.memory_store as memory_store
+
+    def unavailable(directory):
+        raise sqlite3.OperationalError("locking protocol")
+    monkeypatch.setattr(memory_store, "get_memory_db", unavailable)
+
+    path = tmp_path / "intake_classifications.json"
+    merge_json(path, {"a": 1})
+    merge_json(path, {"b": 2})
+    assert json.loads(path.read_text()) == {"a": 1, "b": 2}
+    assert load_json(path, {}) == {"a": 1, "b": 2}
+    assert not list(tmp_path.glob(".tmp-*"))
@@ -0,0 +1,81 @@
+import sys
+import re
+from pathlib import Path
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from agents.modality_agent import ModalityRefinementAgent
+from core.canonical_schema import CanonicalBatch
+from core.memory_store import load_json
+
+
+class BatchAI:
+    """Stands in for AIClient: answers every listed description as VRI."""
+    enabled = True
+
+    def __init__(self):
+        self.requests = []
+
+    def complete_json_many(self, prompts):
+        self.requests.append(prompts)
+        answers = []
+        for _, user_prompt in prompts:
+            values = re.findall(r'"([^"]+)"', user_prompt)
+            answers.append({"labels": {value: "VRI" for value in values}})
+        return answers
+
+
+def _agent(tmp_path, ai=None):
+    agent = ModalityRefinementAgent()
+    agent._labels_path = tmp_path / "modality_labels.json"
+    agent.ai_cache = load_json(agent._labels_path, {})
+    agent.ai = ai
+    return agent
+
+
+def _batch(values):
+    n = len(values)
+    return CanonicalBatch.from_arrays(
+        source_file="f.csv",
+        vendor="VendorA",
+        date=["2024-01-01"] * n,
+        language=["Spanish"] * n,
+        modality=values,
+        minutes_billed=[1.0] * n,
+        total_charge=[1.0] * n,
+        rate_per_minute=[1.0] * n,
+    )
+
+
+def test_rules_keep_priority_order(tmp_path):
+    agent = _agent(tmp_path)
+    cases = {
+        "Phone then video": "VRI",          # VRI outranks OPI wherever it appears
+        "Document travel": "OnSite",
+        "TELEPHONIC": "OPI",
+        "Proofreading": "Translation",
+        "Sign language": None,
+    }
+    for raw, expected in cases.items():
+        assert agent._match_rules(raw) == expected
+
+
+def test_unresolved_values_go_to_ai_once_and_are_remembered(tmp_path):
+    ai = BatchAI()
+    agent = _agent(tmp_path, ai)
+    batch = _batch(["Phone", "Zoom session", "zoom session", "Mystery", "Phone"])
+    stats = agent.refine_batch(batch)
+
+    assert len(ai.requests) == 1 and len(ai.requests[0]) == 1  # one prompt for all values
+    assert list(batch.frame["modality"]) == ["OPI", "VRI", "VRI", "VRI", "OPI"]
+    assert stats["OPI"] == 2 and stats["VRI"] == 3
+
+    # A later run reads the saved labels instead of asking again
+    later = _agent(tmp_path, BatchAI())
+    batch = _batch(["Mystery"])
+    later.refine_batch(batch)
+    assert later.ai.requests == []
+    assert list(batch.frame["modality"]) == ["VRI"]
@@ -4,30 +4,41 @@ import subprocess
 import json
 import shutil
 from pathlib import Path
+import pandas as pd
 
-def test_full_pipeline_e2e():
-    # Setup
-    client = "test_client"
-    input_dir = "tests/fixtures"
-
-    # Run pipeline via CLI
+def _run_pipeline(input_dir, client, root, *extra):
+    """Run the CLI with outputs and agent memory under `root`; returns the new run directory."""
     cmd = [
         "python", "baseline", "run",
-        "--input", input_dir,
-        "--client", client
+        "--input", str(input_dir),
+        "--client", client,
+        "--output-dir", str(root),
+        "--memory-dir", str(root / "agent_memory"),
+        *extra
     ]
-
     result = subprocess.run(cmd, capture_output=True, text=True)
     assert result.returncode == 0, f"Pipeline failed: {result.stderr}"
+    return sorted(d for d in (root / "out" / client).iterdir() if d.is_dir())[-1]
 
-    # Verify outputs
-    out_dir = Path("out") / client
-    assert out_dir.exists(), "Output directory not created"
+def _vendor_files(tmp_path, *names):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    for name in names:
+        shutil.copy("tests/fixtures/sample_transactions.csv", input_dir / name)
+    return input_dir
 
-    # Get the latest run
-    runs = sorted([d for d in out_dir.iterdir() if d.is_dir()])
-    assert len(runs) > 0, "No run directory found"
-    latest_run = runs[-1]
+def test_full_pipeline_e2e(tmp_path):
+    # Setup
+    client = "test_client"
+    input_dir = "tests/fixtures"
+
+    # Run pipeline via CLI
+    latest_run = _run_pipeline(input_dir, client, tmp_path)
+
+    # Verify outputs
+    assert (tmp_path / "out" / client / "run_index.json").exists()
+    assert (tmp_path / "agent_memory" / "memory.db").exists()
+    assert (tmp_path / "baseline_v1_output.csv").exists()
 
     assert (latest_run / "baseline_v1_output.csv").exists()
     assert (latest_run / "manifest.json").exists()
@@ -40,10 +51,111 @@ def test_full_pipeline_e2e():
     assert manifest["metrics"]["total_records"] > 0
     assert manifest["status"] == "COMPLETE"
 
+def test_parallel_run_matches_serial(tmp_path):
+    # Two vendors so the worker pool has more than one file to schedule
+    input_dir = _vendor_files(tmp_path, "VendorA_2024.csv", "VendorB_2024.csv")
+
+    outputs = {}
+    # Each run starts from its own empty memory
+    for client, extra in (("test_serial", []), ("test_parallel", ["--workers", "2"])):
+        latest_run = _run_pipeline(input_dir, client, tmp_path / client, *extra)
+        outputs[client] = {
+            name: (latest_run / name).read_bytes()
+            for name in ("baseline_v1_output.csv", "baseline_transactions.csv", "audit_logs.json")
+        }
+
+    assert outputs["test_serial"] == outputs["test_parallel"]
+
+def test_stream_run_matches_batch(tmp_path):
+    input_dir = _vendor_files(tmp_path, "VendorA_2024.csv", "VendorB_2024.csv")
+
+    outputs = {}
+    for client, extra in (("test_batch", []), ("test_stream", ["--stream"])):
+        latest_run = _run_pipeline(input_dir, client, tmp_path / client, *extra)
+        outputs[client] = latest_run
+        # The spool is cleaned up after the second pass
+        assert not any(p.name.startswith(".spool-") for p in latest_run.iterdir())
+
+    batch, stream = outputs["test_batch"], outputs["test_stream"]
+    for name in ("baseline_transactions.csv", "audit_logs.json"):
+        assert (batch / name).read_bytes() == (stream / name).read_bytes()
+    # Baseline sums are folded per chunk, so allow for float re-association
+    pd.testing.assert_frame_equal(
+        pd.read_csv(batch / "baseline_v1_output.csv"),
+        pd.read_csv(stream / "baseline_v1_output.csv"),
+        check_exact=False,
+    )
+    manifests = [json.loads((run / "manifest.json").read_text()) for run in (batch, stream)]
+    assert manifests[0]["metrics"]["total_records"] == manifests[1]["metrics"]["total_records"]
+
+def test_incremental_run_matches_full_run(tmp_path):
+    input_dir = _vendor_files(tmp_path, "VendorA_2024.csv")
+    root = tmp_path / "incremental"
+
+    def run(client, root, extra=()):
+        latest_run = _run_pipeline(input_dir, client, root, *extra)
+        return latest_run, json.loads((latest_run / "manifest.json").read_text())
+
+    run("test_incremental", root, ["--incremental"])
+    assert (root / "agent_memory" / "aggregates" / "test_incremental").is_dir()
+    # The next drop adds a file; the stored one is not processed again
+    shutil.copy("tests/fixtures/sample_transactions.csv", input_dir / "VendorB_2024.csv")
+    incremental, manifest = run("test_incremental", root, ["--incremental"])
+    assert manifest["files_processed"] == ["VendorB_2024.csv"]
+    assert manifest["files_unchanged"] == ["VendorA_2024.csv"]
+
+    full, _ = run("test_incremental_full", tmp_path / "full")
+    keys = ["Month", "Vendor", "Language", "Modality"]
+    baselines = [pd.read_csv(run_dir / "baseline_v1_output.csv").sort_values(keys).reset_index(drop=True)
+                 for run_dir in (incremental, full)]
+    pd.testing.assert_frame_equal(*baselines, check_exact=False)
+
+
+def test_sheets_differing_in_header_case_share_a_layout(tmp_path):
+    transactions = pd.read_csv("tests/fixtures/sample_transactions.csv")
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    with pd.ExcelWriter(input_dir / "VendorA - 2024.xlsx") as writer:
+        transactions.iloc[:16].to_excel(writer, sheet_name="Jan", index=False)
+        transactions.iloc[16:].rename(columns=str.lower).to_excel(writer, sheet_name="Feb", index=False)
+
+    latest_run = _run_pipeline(input_dir, "test_header_case", tmp_path)
+    extracted = pd.read_csv(latest_run / "baseline_transactions.csv")
+    assert sorted(extracted["source_sheet"].unique()) == ["Feb", "Jan"]
+    assert len(extracted) == len(transactions)
+
+
+def test_repeated_run_reuses_outputs(tmp_path):
+    input_dir = _vendor_files(tmp_path, "VendorA_2024.csv")
+
+    def run(extra=()):
+        latest_run = _run_pipeline(input_dir, "test_memoized", tmp_path, *extra)
+        return latest_run, json.loads((latest_run / "manifest.json").read_text())
+
+    # The first run starts from empty memory and learns the mapping
+    first, manifest = run()
+    assert "reused_from" not in manifest
+    assert manifest["final_fingerprint"] != manifest["fingerprint"]
+
+    reused, manifest = run()
+    assert manifest["reused_from"] == first.name
+    assert manifest["fingerprint"] == json.loads((first / "manifest.json").read_text())["final_fingerprint"]
+    for name in manifest["outputs"].values():
+        assert (reused / name).samefile(first / name)
+
+    # Reusing leaves memory as it was, so later runs keep hitting
+    _, manifest = run()
+    assert manifest["reused_from"] == first.name
+    _, manifest = run(["--force"])
+    assert "reused_from" not in manifest
+
+
 if __name__ == "__main__":
     # If run directly, just run the test
+    import tempfile
     try:
-        test_full_pipeline_e2e()
+        with tempfile.TemporaryDirectory() as tmp:
+            test_full_pipeline_e2e(Path(tmp))
         print("E2E Test Passed!")
     except Exception as e:
         print(f"E2E Test Failed: {e}")
@@ -0,0 +1,80 @@
+import datetime
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from agents.reconciliation_agent import TAIL_ROWS, ReconciliationAgent
+from core.canonical_schema import CanonicalRecord
+
+
+def test_totals_are_found_in_summary_sheets_and_transaction_tails():
+    summary = pd.DataFrame([
+        ["Bill To:", "Acme Health", None],
+        ["Invoice Total", None, "$4,321.00"],
+        ["Amount due", 3, None],          # too small to be a total; wraps into the next row
+        [None, "12.50", "n/a"],
+    ])
+    n = TAIL_ROWS * 3
+    calls = pd.DataFrame({
+        "Language": ["Spanish"] * n,
+        "Minutes": np.arange(n, dtype=float),
+        "Note": ["Net amount adjusted"] + [""] * (n - 1),   # outside the tail: not a totals block
+    })
+    calls.loc[n] = ["Grand Total", 999.0, "$7,777.70"]
+
+    candidates = ReconciliationAgent().find_total_candidates({"Invoice": summary, "Calls": calls})
+    assert candidates == [(True, [4321.0, 12.5]), (True, [12.5]), (False, [999.0, 7777.7])]
+
+    agent = ReconciliationAgent()
+    agent.apply_total_candidates(candidates, "VendorA")
+    assert agent.billed_totals["VendorA"] == 999.0
+
+
+def test_sheets_without_text_have_no_totals():
+    numbers = pd.DataFrame({"a": [1.0, 2.0], "b": pd.to_datetime(["2024-01-01", "2024-01-02"])})
+    assert ReconciliationAgent().find_total_candidates({"Summary": numbers, "Empty": pd.DataFrame()}) == []
+
+
+def test_invoice_number_is_read_from_the_label_or_the_next_cell():
+    agent = ReconciliationAgent()
+    inline = pd.DataFrame([["Invoice #: INV-0042", None], ["Invoice Total", "$100.00"]])
+    beside = pd.DataFrame([["Invoice Number", None, 1207.0]])
+    assert agent.find_invoice_number({"Summary": inline}) == "INV-0042"
+    assert agent.find_invoice_number({"Invoice": beside}) == "1207"
+    assert agent.find_invoice_number({"Calls": inline}) is None  # not a summary sheet
+
+
+def _record(source_file, vendor, date, charge):
+    return CanonicalRecord(source_file=source_file, vendor=vendor, date=datetime.date.fromisoformat(date),
+                           minutes_billed=1.0, total_charge=charge)
+
+
+def test_invoices_are_reconciled_per_vendor_month_and_number():
+    agent = ReconciliationAgent()
+    agent.apply_file_totals({"candidates": [(True, [150.0])], "invoice": "A-1"}, "VendorA", "a-jan.xlsx")
+    agent.apply_file_totals({"candidates": [(True, [200.0])], "invoice": None}, "VendorA", "VendorA 2024-02.xlsx")
+    agent.apply_file_totals({"candidates": [(True, [80.0])], "invoice": None}, "VendorC", "c.xlsx")
+    records = [
+        _record("a-jan.xlsx", "VendorA", "2023-12-30", 50.0),   # counted in the invoice month (2024-01)
+        _record("a-jan.xlsx", "VendorA", "2024-01-05", 100.0),
+        _record("VendorA 2024-02.xlsx", "VendorA", "2024-02-01", 150.0),
+        _record("b.csv", "VendorB", "2024-01-09", 30.0),
+    ]
+    results = agent.run_reconciliation(records)
+
+    invoices = {(i["vendor"], i["month"], i["invoice"]): i for i in results["invoices"]}
+    assert invoices[("VendorA", "2024-01", "A-1")]["calculated"] == 150.0
+    assert invoices[("VendorA", "2024-01", "A-1")]["status"] == "MATCH"
+    assert invoices[("VendorA", "2024-02", None)]["variance"] == -50.0
+    assert invoices[("VendorA", "2024-02", None)]["status"] == "DISCREPANCY"
+    assert invoices[("VendorB", "2024-01", None)]["status"] == "NO_INVOICE_FOUND"
+    assert invoices[("VendorC", None, None)]["status"] == "NO_RECORDS"  # no records, no month in the name
+    assert results["invoices_with_discrepancy"] == 1
+
+    # A vendor is billed the sum of its invoices
+    assert results["vendors"]["VendorA"]["billed"] == 350.0
@@ -0,0 +1,74 @@
+import json
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.run_index import RunIndex, reuse_run, run_fingerprint
+
+
+def _completed_run(run_dir, fingerprint, final_fingerprint=None):
+    run_dir.mkdir(parents=True)
+    (run_dir / "baseline_v1_output.csv").write_text("Month,Vendor\n2024-01,VendorA\n")
+    (run_dir / "audit_logs.json").write_text("{}")
+    manifest = {
+        "client": "acme",
+        "timestamp": run_dir.name,
+        "fingerprint": fingerprint,
+        "final_fingerprint": final_fingerprint or fingerprint,
+        "outputs": {"baseline": "baseline_v1_output.csv", "audit_logs": "audit_logs.json"},
+        "status": "COMPLETE",
+    }
+    (run_dir / "manifest.json").write_text(json.dumps(manifest))
+
+
+def test_fingerprint_follows_input_bytes_and_options(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    (a / "VendorA.csv").write_text("Date,Minutes\n2024-01-02,5\n")
+    (b / "VendorA.csv").write_text("Date,Minutes\n2024-01-02,5\n")
+
+    # Same bytes under the same name: same fingerprint, wherever the directory is
+    fingerprint = run_fingerprint([str(a / "VendorA.csv")], {"stream": False})
+    assert run_fingerprint([str(b / "VendorA.csv")], {"stream": False}) == fingerprint
+    assert run_fingerprint([str(b / "VendorA.csv")], {"stream": True}) != fingerprint
+
+    (b / "VendorA.csv").write_text("Date,Minutes\n2024-01-02,6\n")
+    assert run_fingerprint([str(b / "VendorA.csv")], {"stream": False}) != fingerprint
+
+
+def test_reused_run_links_the_indexed_artifacts(tmp_path):
+    client_dir = tmp_path / "out" / "acme"
+    source = client_dir / "20240101_120000"
+    _completed_run(source, "f" * 64)
+    index = RunIndex(client_dir)
+    assert index.lookup("f" * 64) is None
+    index.record("f" * 64, source)
+    assert index.lookup("f" * 64) == source
+
+    target = client_dir / "20240102_090000"
+    manifest = reuse_run(source, target, timestamp=target.name)
+    assert manifest["reused_from"] == source.name
+    assert (target / "baseline_v1_output.csv").samefile(source / "baseline_v1_output.csv")
+    assert json.loads((target / "manifest.json").read_text())["timestamp"] == target.name
+
+    # A run whose outputs are gone is not offered again
+    (source / "audit_logs.json").unlink()
+    assert index.lookup("f" * 64) is None
+
+
+def test_run_is_found_by_the_memory_it_leaves(tmp_path):
+    client_dir = tmp_path / "out" / "acme"
+    run_dir = client_dir / "20240101_120000"
+    # The run learned a mapping: memory after it differs from memory before
+    _completed_run(run_dir, "a" * 64, final_fingerprint="b" * 64)
+    index = RunIndex(client_dir)
+    index.record("a" * 64, run_dir)
+    index.record("b" * 64, run_dir)
+    assert index.lookup("a" * 64) == run_dir
+    assert index.lookup("b" * 64) == run_dir
+    index.record("c" * 64, run_dir)
+    assert index.lookup("c" * 64) is None
@@ -0,0 +1,177 @@
+import sys
+from pathlib import Path
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from agents.schema_agent import SchemaAgent
+
+
+class CountingAI:
+    """Stands in for AIClient: records calls and never answers."""
+    enabled = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete_json(self, system_prompt, user_prompt):
+        self.calls += 1
+        return None
+
+
+def _agent(tmp_path):
+    agent = SchemaAgent()
+    agent._registry_path = tmp_path / "mapping_registry.json"
+    agent._mapping_registry = {}
+    agent.ai = CountingAI()
+    return agent
+
+
+def _sheet(extra=None):
+    df = pd.DataFrame({
+        "Service Date": ["2024-01-02", "2024-01-03", "2024-01-04"],
+        "Language": ["Spanish", "Arabic", "French"],
+        "Minutes": [10, 5, 3],
+        "Total Charge": ["$12.50", "$6.00", "$4.00"],
+    })
+    if extra:
+        df[extra] = ["x", "y", "z"]
+    return df
+
+
+def test_mapping_tiers_skip_ai_when_cheaper_tier_answers(tmp_path):
+    agent = _agent(tmp_path)
+    df = _sheet()
+    cols = list(df.columns)
+
+    # Clear headers: heuristics are confident, so the LLM is never asked
+    mapping = agent.infer_mapping(cols, df.iloc[0], vendor="VendorA", df=df)
+    assert agent.get_last_source() == "heuristic"
+    assert mapping["charge"] == "Total Charge"
+    assert agent.ai.calls == 0
+
+    conf = agent.assess_mapping(df, mapping)
+    assert agent.confirm_mapping(cols, mapping, "VendorA", conf["data_confidence"], conf["field_confidence"])
+
+    # Same layout again: exact registry hit
+    assert agent.infer_mapping(cols, df.iloc[0], vendor="VendorA", df=df) == mapping
+    assert agent.get_last_source() == "cache"
+    # Confirming it again does not rewrite the entry (source stays as first learned)
+    saved = {key: dict(entry) for key, entry in agent._mapping_registry.items()}
+    assert agent.confirm_mapping(cols, mapping, "VendorA", conf["data_confidence"], conf["field_confidence"])
+    assert agent._mapping_registry == saved
+    assert [entry["source"] for entry in saved.values()] == ["heuristic"]
+
+    # One extra column: near-identical layout of the same vendor
+    wider = _sheet(extra="Notes")
+    assert agent.infer_mapping(list(wider.columns), wider.iloc[0], vendor="VendorA", df=wider) == mapping
+    assert agent.get_last_source() == "registry_match"
+    # ...but not for another vendor
+    agent.infer_mapping(list(wider.columns), wider.iloc[0], vendor="VendorB", df=wider)
+    assert agent.get_last_source() == "heuristic"
+    assert agent.ai.calls == 0
+
+
+def test_ai_is_asked_only_when_heuristics_are_unsure(tmp_path):
+    agent = _agent(tmp_path)
+    df = pd.DataFrame({"Col A": ["foo", "bar"], "Col B": ["baz", "qux"]})
+    agent.infer_mapping(list(df.columns), df.iloc[0], vendor="VendorC", df=df)
+    # Mapping prompt, then the heuristic validation prompt
+    assert agent.ai.calls >= 1
+
+
+def test_renamed_column_reuses_registry_mapping(tmp_path):
+    agent = _agent(tmp_path)
+    df = _sheet(extra="Notes")
+    cols = list(df.columns)
+    mapping = agent.infer_mapping(cols, df.iloc[0], vendor="VendorA", df=df)
+    conf = agent.assess_mapping(df, mapping)
+    assert agent.confirm_mapping(cols, mapping, "VendorA", conf["data_confidence"], conf["field_confidence"])
+
+    renamed = df.rename(columns={"Total Charge": "Total Charge Amount"})
+    reused = agent.infer_mapping(list(renamed.columns), renamed.iloc[0], vendor="VendorA", df=renamed)
+    assert agent.get_last_source() == "registry_match"
+    assert reused["charge"] == "Total Charge Amount"
+    assert agent.ai.calls == 0
+
+
+def test_sheets_of_one_layout_share_a_key_and_a_pooled_sample(tmp_path):
+    agent = _agent(tmp_path)
+    jan, feb = _sheet(), _sheet()
+    feb["Language"] = ["Somali", "Tigrinya", "Dari"]
+    reordered = jan[list(reversed(jan.columns))]
+    assert agent.format_key(list(jan.columns), "VendorA") == agent.format_key(list(reordered.columns), "VendorA")
+    assert agent.format_key(list(jan.columns), "VendorA") != agent.format_key(list(jan.columns), "VendorB")
+
+    sample = agent.pooled_sample([jan, feb], max_rows=4)
+    # Interleaved, so the first rows already cover both sheets
+    assert list(sample["Language"]) == ["Spanish", "Somali", "Arabic", "Tigrinya"]
+    assert agent.pooled_sample([jan]) is jan
+
+
+def test_layout_mapping_follows_header_case_of_each_sheet(tmp_path):
+    agent = _agent(tmp_path)
+    jan = _sheet()
+    feb = _sheet().rename(columns=lambda c: f" {c.lower()}")
+    assert agent.format_key(list(jan.columns), "VendorA") == agent.format_key(list(feb.columns), "VendorA")
+
+    # The pooled sample uses the first sheet's headers rather than a union of both spellings
+    sample = agent.pooled_sample([jan, feb], max_rows=6)
+    assert list(sample.columns) == list(jan.columns)
+    assert sample.notna().all().all()
+
+    mapping = agent.infer_mapping(list(jan.columns), sample.iloc[0], vendor="VendorA", df=sample)
+    on_feb = agent.layout_mapping(mapping, list(jan.columns), list(feb.columns))
+    assert on_feb["date"] == " service date"
+    assert on_feb["charge"] == " total charge"
+    assert set(on_feb.values()) <= set(feb.columns)
+
+
+def test_column_parses_are_shared_across_phases(tmp_path, monkeypatch):
+    from core.type_inference import TypeInferenceEngine
+    agent = _agent(tmp_path)
+    df = _sheet()
+    df["Rate"] = ["$1.25", "$1.20", "$1.33"]
+
+    analyzed, parsed = [], []
+    analyze = TypeInferenceEngine.analyze_columns
+    monkeypatch.setattr(TypeInferenceEngine, "analyze_columns",
+                        lambda self, cols: analyzed.extend(c.name for c in cols) or analyze(self, cols))
+    to_datetime = agent._safe_to_datetime
+    monkeypatch.setattr(agent, "_safe_to_datetime", lambda s: parsed.append(s.name) or to_datetime(s))
+
+    mapping = agent.infer_mapping(list(df.columns), df.iloc[0], vendor="VendorA", df=df)
+    first = agent.assess_mapping(df, mapping)
+    # A rebuilt frame with the same rows reuses the profiles too
+    again = agent.assess_mapping(df.copy(), mapping)
+
+    assert sorted(analyzed) == sorted(df.columns)  # each column analyzed once
+    assert parsed == ["Service Date"]              # pruning and assessing share one parse
+    assert first == again
+
+    # Changed values are profiled afresh
+    df.loc[0, "Service Date"] = "not a date"
+    assert agent.assess_mapping(df, mapping)["data_confidence"] < first["data_confidence"]
+
+
+def test_profile_lookups_hash_a_fixed_sample_of_long_columns(monkeypatch):
+    from core.column_profile import ColumnProfileCache, sample_positions
+
+    hashed = []
+    hash_object = pd.util.hash_pandas_object
+    monkeypatch.setattr(pd.util, "hash_pandas_object", lambda obj, **kw: hashed.append(len(obj)) or hash_object(obj, **kw))
+
+    cache = ColumnProfileCache()
+    df = pd.DataFrame({"Minutes": [str(i) for i in range(200_000)]})
+    profile = cache.get(df, "Minutes")
+    # Same rows in another frame: a hit, and each lookup hashed only the sample
+    assert cache.get(df.copy(), "Minutes") is profile
+    assert hashed == [len(sample_positions(len(df)))] * 2 and hashed[0] <= 128
+
+    # A changed sampled row, or another length, is profiled afresh
+    changed = df.copy()
+    changed.loc[len(df) - 1, "Minutes"] = "x"
+    assert cache.get(changed, "Minutes") is not profile
+    assert cache.get(df.iloc[:-1], "Minutes") is not profile
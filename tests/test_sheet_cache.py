@@ -0,0 +1,49 @@
+import sys
+import os
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.sheet_cache import SheetCache
+
+
+def test_sheet_cache_round_trip(tmp_path):
+    cache = SheetCache(root=tmp_path, max_bytes=10 * 1024 ** 2)
+    frames = {
+        "Detail": pd.DataFrame({"Language": ["Spanish", np.nan], "Minutes": [10, "12:30"]}, index=[3, 5]),
+        "csv": pd.DataFrame({"Date": ["2024-01-01", "2024-01-02"], "Charge": [1.5, 2.0]}),
+    }
+    diagnostics = {"file": "a.xlsx", "sheets_analyzed": [], "best_sheet": "Detail"}
+
+    assert cache.get_sheets("abc") is None
+    cache.put_sheets("abc", frames, {"Detail": 2, "csv": 0}, diagnostics)
+    cached, cached_diag = cache.get_sheets("abc")
+
+    assert list(cached) == ["Detail", "csv"]
+    for name, df in frames.items():
+        pd.testing.assert_frame_equal(cached[name], df)
+    assert cached_diag == diagnostics
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.put_totals("abc", [(True, [1234.5])])
+    assert cache.get_totals("abc") == [[True, [1234.5]]]
+
+
+def test_sheet_cache_evicts_least_recently_used(tmp_path):
+    cache = SheetCache(root=tmp_path, max_bytes=1)
+    frame = {"s": pd.DataFrame({"x": range(1000)})}
+    cache.put_sheets("old", frame, {"s": 0}, {})
+    old_files = list(tmp_path.rglob("*.*"))
+    past = time.time() - 3600
+    for path in old_files:
+        os.utime(path, (past, past))
+
+    cache.put_sheets("new", frame, {"s": 0}, {})
+
+    assert cache.get_sheets("old") is None
+    assert cache.get_sheets("new") is not None
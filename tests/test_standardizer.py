@@ -32,10 +32,70 @@ def test_standardizer_basic():
     assert records[0].total_charge == 12.50
     assert records[0].date == datetime.date(2024, 1, 1)
 
+def test_date_column_parsing_matches_row_parser():
+    agent = StandardizerAgent()
+    values = pd.Series([
+        "01/05/2024", "1/6/2024 10:00", "2024-02", "2024-03-04", "5-Jan-24",
+        "2024-13", "Total", "", None, datetime.datetime(2024, 1, 7, 9, 0),
+        datetime.date(2024, 1, 8), 45000.0, "01/05/2024"
+    ], dtype=object)
+
+    assert agent.detect_date_format(values) == "%m/%d/%Y"
+    expected = [agent._parse_date(v) for v in values]
+    for hint in (None, "%m/%d/%Y", "%Y-%m-%d"):
+        parsed = agent._parse_dates(values, hint)
+        assert list(parsed.astype(object)) == expected
+
+def test_numeric_column_parsing_matches_row_parser():
+    agent = StandardizerAgent()
+    columns = [
+        pd.Series(["$1,234.50", "12 min", "5:30", "1:02:03", "1:2:3:4", " 7 ", "N/A", "", None, "1_000", "nan", "5:30"]),
+        pd.Series([10, 2.5, "3:15", True, None, float("nan"), "$4.00"], dtype=object),
+        pd.Series([1.5, float("nan"), -0.0]),
+    ]
+    for values in columns:
+        expected = [agent._parse_float(v) for v in values]
+        parsed = agent._parse_floats(values)
+        assert len(parsed) == len(expected)
+        for got, want in zip(parsed, expected):
+            assert (got == want) or (pd.isna(got) and pd.isna(want))
+
 if __name__ == "__main__":
     try:
         test_standardizer_basic()
+        test_date_column_parsing_matches_row_parser()
+        test_numeric_column_parsing_matches_row_parser()
         print("Standardizer Unit Test Passed!")
     except Exception as e:
         print(f"Standardizer Unit Test Failed: {e}")
         exit(1)
+
+def test_sheet_rows_resolve_to_raw_values_through_intake(tmp_path):
+    from agents.intake_agent import IntakeAgent
+    from core.sheet_cache import SheetCache
+
+    # Title and blank row above the header (row 3); a blank row inside the data
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    rows = [["Invoice 42", None, None, None], [None] * 4, ["Date", "Language", "Minutes", "Total Charge"]]
+    rows += [["2024-01-0%d" % d, "Spanish", d, d * 1.5] for d in (1, 2, 3)]
+    rows += [[None] * 4, ["2024-01-04", "French", 4, 6.0], ["bad date", "French", 5, 7.5], ["2024-01-06", "German", 6, 9.0]]
+    pd.DataFrame(rows).to_excel(data_dir / "VendorA.xlsx", sheet_name="Calls", header=False, index=False)
+    path = str(data_dir / "VendorA.xlsx")
+
+    intake = IntakeAgent(str(data_dir), sheet_cache=SheetCache(tmp_path / "cache"))
+    df = intake.load_clean_sheet(path)["Calls"]
+    header_row = intake.file_diagnostics[path]["sheets_analyzed"][0]["header_row"]
+    mapping = {"date": "Date", "language": "Language", "minutes": "Minutes", "charge": "Total Charge"}
+    batch = StandardizerAgent().process_dataframe_batch(
+        df, mapping, "VendorA.xlsx", "VendorA", "Calls", path, header_row=header_row
+    )
+    exported = batch.to_frame()
+    assert list(exported["source_sheet_row"]) == [4, 5, 6, 8, 10]
+    assert list(exported["source_row"]) == [0, 1, 2, 3, 5]
+
+    # A fresh agent resolves the export from the sheet cache
+    raw = IntakeAgent(str(data_dir), sheet_cache=SheetCache(tmp_path / "cache")).raw_rows(exported)
+    assert [r["Language"] for r in raw] == ["Spanish", "Spanish", "Spanish", "French", "German"]
+    assert raw[4]["Minutes"] == 6
+    assert IntakeAgent(str(data_dir)).raw_rows(exported.assign(source_file="gone.xlsx")) == [None] * 5
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.type_inference import TypeInferenceEngine
+
+
+def test_wide_sheet_is_scored_per_column():
+    df = pd.DataFrame({
+        "Date": ["2024-01-02", "01/03/2024 10:15", "Jan 4, 2024", None],
+        "Language": ["Spanish", "ARABIC", "Mandarin - Medical", "Klingon"],
+        "Minutes": ["12 min", "1,005", "7.5", "3"],
+        "Charge": ["$12.50", "$1,006.25", "$7.88", "USD 3.10"],
+        "Rate": [1.25] * 4,
+        "Empty": [None] * 4,
+        "When": pd.to_datetime(["2024-01-02"] * 4),
+    })
+    results = TypeInferenceEngine().analyze_all_columns(df)
+
+    assert results["Date"]["all_scores"]["date"] == 1.0  # the null is not sampled
+    assert results["Language"]["all_scores"]["language"] == (1 + 1 + 0.8) / 4
+    assert [results[c]["type"] for c in ("Date", "Language", "Charge", "When")] == \
+        ["date", "language", "charge", "date"]
+    assert results["Rate"]["all_scores"]["rate"] == 1.0
+    assert results["Minutes"]["all_scores"]["minutes"] > 0.7
+    assert results["Empty"] == {"type": "unknown", "confidence": 0.0, "all_scores": {}}
+
+    # Scoring columns together gives the same answers as one at a time
+    engine = TypeInferenceEngine(sample_size=3)
+    assert engine.analyze_all_columns(df) == {col: engine.analyze_column(df[col]) for col in df.columns}
+
+
+def test_sample_skips_leading_nulls():
+    series = pd.Series([np.nan] * 500 + [1.5] * 10)
+    result = TypeInferenceEngine(sample_size=5).analyze_column(series)
+    assert result["all_scores"]["rate"] > 0
@@ -0,0 +1,57 @@
+import sys
+import datetime
+from pathlib import Path
+import pandas as pd
+
+# Ensure src is in path
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR / "multi_agent_system" / "src"))
+
+from core.workbook import WorkbookSession
+
+
+def _write_workbook(path: Path) -> None:
+    detail = [["Call Detail Report", None, None, None], [None] * 4, ["Date", "Language", "Minutes", "Charges"]]
+    detail += [[datetime.datetime(2024, 1, 1 + i % 28), "Spanish", i if i != 7 else "12:30", 1.5 * i] for i in range(150)]
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["Invoice Total", None, "$1,234.50"]]).to_excel(writer, sheet_name="Invoice", header=False, index=False)
+        pd.DataFrame(detail).to_excel(writer, sheet_name="Detail", header=False, index=False)
+
+
+def test_session_matches_read_excel(tmp_path):
+    path = tmp_path / "vendor.xlsx"
+    _write_workbook(path)
+
+    with WorkbookSession(str(path)) as session:
+        assert session.sheet_names == ["Invoice", "Detail"]
+        for sheet in session.sheet_names:
+            pd.testing.assert_frame_equal(session.grid(sheet), pd.read_excel(path, sheet_name=sheet, header=None))
+            pd.testing.assert_frame_equal(session.preview(sheet), pd.read_excel(path, sheet_name=sheet, header=None, nrows=100))
+        pd.testing.assert_frame_equal(session.frame("Detail", 2), pd.read_excel(path, sheet_name="Detail", header=2))
+
+
+def test_session_parses_each_sheet_once(tmp_path, monkeypatch):
+    path = tmp_path / "vendor.xlsx"
+    _write_workbook(path)
+
+    calls = []
+    real_read_excel = pd.read_excel
+
+    def counting_read_excel(*args, **kwargs):
+        calls.append(kwargs.get("sheet_name"))
+        return real_read_excel(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_excel", counting_read_excel)
+    with WorkbookSession(str(path)) as session:
+        session.all_grids()
+        session.preview("Detail")
+        session.frame("Detail", 2)
+
+    assert sorted(calls) == ["Detail", "Invoice"]
+
+
+def test_csv_session_matches_read_csv():
+    path = BASE_DIR / "tests" / "fixtures" / "sample_transactions.csv"
+    with WorkbookSession(str(path)) as session:
+        assert session.is_csv
+        pd.testing.assert_frame_equal(session.frame("csv", 0), pd.read_csv(path))